@@ -5,6 +5,54 @@ AnythingLLM Python Client
 """
 
 from .client import AnythingLLMClient
+from .async_client import AsyncAnythingLLMClient
+from .balancer import LoadBalancer
+from .cache import CACHE_TTLS, ResponseCache
+from .circuit_breaker import CircuitBreaker
+from .coalescing import RequestCoalescer
+from .codec import JsonCodec, JsonItemParser, JsonStream
+from .compression import CompressionPolicy
+from .concurrency import ConcurrencyLimiter
+from .exceptions import (
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    DeadlineExceededError,
+    RateLimitError,
+)
+from .hedging import HedgePolicy
+from .loader import AsyncBatchLoader, BatchLoader
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .scheduler import RequestScheduler
+from .shared_limiter import SharedLimiter
+from .timeouts import TIMEOUT_PROFILES, Timeout, deadline
 
 __version__ = "0.1.0"
-__all__ = ["AnythingLLMClient"]
+__all__ = [
+    "AnythingLLMClient",
+    "AsyncAnythingLLMClient",
+    "AsyncBatchLoader",
+    "BatchLoader",
+    "CACHE_TTLS",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CompressionPolicy",
+    "ConcurrencyLimiter",
+    "ConcurrencyLimitError",
+    "DeadlineExceededError",
+    "HedgePolicy",
+    "JsonCodec",
+    "JsonItemParser",
+    "JsonStream",
+    "LoadBalancer",
+    "RateLimiter",
+    "RateLimitError",
+    "RequestCoalescer",
+    "RequestScheduler",
+    "ResponseCache",
+    "RetryPolicy",
+    "SharedLimiter",
+    "Timeout",
+    "TIMEOUT_PROFILES",
+    "deadline",
+]
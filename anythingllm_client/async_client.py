@@ -0,0 +1,220 @@
+"""
+AnythingLLM 异步客户端主类
+"""
+
+import os
+from typing import Optional, Dict, Any, Sequence, Union
+
+from .modules.auth import AuthModule
+from .modules.workspaces import WorkspacesModule
+from .modules.chat import ChatModule
+from .modules.system import SystemModule
+from .modules.users import UsersModule
+from .modules.embed import EmbedModule
+from .modules.admin import AdminModule
+from .modules.workspace_thread import WorkspaceThreadModule
+from .modules.async_modules import AsyncDocumentsModule, AsyncOpenAIModule
+from .async_http_client import AsyncHttpClient
+from .balancer import LoadBalancer
+from .cache import ResponseCache
+from .circuit_breaker import CircuitBreaker
+from .coalescing import RequestCoalescer
+from .codec import JsonCodec
+from .compression import CompressionPolicy
+from .concurrency import ConcurrencyLimiter
+from .hedging import HedgePolicy
+from .loader import AsyncBatchLoader
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .shared_limiter import SharedLimiter
+from .timeouts import Timeout
+
+
+class AsyncAnythingLLMClient:
+    """
+    AnythingLLM API 异步客户端主类
+
+    模块与 ``AnythingLLMClient`` 相同，但所有 API 方法都返回协程，需要 ``await``。
+    所有模块共享同一个连接池。
+    """
+
+    def __init__(
+        self,
+        base_url: Union[str, Sequence[str]] = "http://localhost:3001",
+        api_key: Optional[str] = None,
+        timeout: int = 60,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 5.0,
+        http2: bool = False,
+        http2_prior_knowledge: bool = False,
+        max_streams_per_connection: int = 100,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        shared_limiter: Optional[SharedLimiter] = None,
+        concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional[HedgePolicy] = None,
+        load_balancer: Optional[LoadBalancer] = None,
+        json_codec: Union[str, JsonCodec] = "auto",
+        compression: Optional[CompressionPolicy] = None,
+        coalescing: Optional[RequestCoalescer] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        初始化 AnythingLLM 异步客户端
+
+        Args:
+            base_url: AnythingLLM API 的基础 URL，也可以是 unix:///path/to.sock 形式的 Unix 域套接字；
+                有多个实例时传入基础 URL 的列表，请求在这些实例之间负载均衡
+            api_key: API 密钥，如果未提供，将尝试从环境变量 ANYTHINGLLM_API_KEY 获取
+            timeout: 请求超时时间（秒）
+            max_connections: 连接池最大连接数，None 表示不限制
+            max_keepalive_connections: 最多保留的空闲长连接数
+            keepalive_expiry: 空闲连接保留时间（秒）
+            http2: 是否启用 HTTP/2，服务端不支持时自动回退到 HTTP/1.1
+            http2_prior_knowledge: 明文连接是否直接使用 HTTP/2（h2c）
+            max_streams_per_connection: 启用 HTTP/2 时每个连接承载的并发流数量
+            retry: 重试策略，None 表示使用默认的 ``RetryPolicy()``，
+                ``RetryPolicy(total=0)`` 表示不重试
+            circuit_breaker: 按端点族统计的熔断器，None 表示不熔断，
+                状态可以通过 ``http_client.circuit_states()`` 查看
+            rate_limiter: 按端点族限流的令牌桶，None 表示不限流，
+                状态可以通过 ``http_client.rate_limit_states()`` 查看
+            shared_limiter: 同一主机上多个进程共享的速率和在途请求数预算，None 表示
+                不共享，所有指向同一个 ``base_url`` 的客户端共用一份预算
+            concurrency_limiter: 按端点族根据延迟自适应调整在途请求上限，None 表示
+                不限制，状态可以通过 ``http_client.concurrency_states()`` 查看
+            timeouts: 按端点族区分的连接、读取和总超时，例如 ``TIMEOUT_PROFILES``，
+                未配置的端点族使用 ``default`` 键或 ``timeout``
+            hedging: GET 请求的对冲策略，None 表示不对冲，统计可以通过
+                ``http_client.hedge_states()`` 查看
+            load_balancer: 多实例负载均衡器，``base_url`` 为列表且未指定时使用默认的
+                ``LoadBalancer()``，状态可以通过 ``http_client.balancer_states()`` 查看
+            json_codec: 编码请求体和解析响应的 JSON 编解码器，"auto" 在安装了 orjson
+                时使用 orjson，也可以指定 "json"、"orjson" 或 ``JsonCodec`` 实例
+            compression: 压缩策略，None 表示接受压缩的响应、不压缩请求体；
+                ``CompressionPolicy(request_threshold=64 * 1024)`` 压缩较大的 JSON 请求体，
+                字节数可以通过 ``http_client.compression_stats()`` 查看
+            coalescing: 合并同时进行的相同 GET 请求，None 表示不合并，统计可以通过
+                ``http_client.coalescing_states()`` 查看
+            cache: GET 响应缓存，None 表示不缓存；``ResponseCache()`` 缓存系统设置、模型
+                列表、提示词和工作区列表等变化较慢的接口，通过本客户端写入后相关缓存自动
+                失效，统计可以通过 ``http_client.cache_stats()`` 查看
+        """
+        if isinstance(base_url, str):
+            self.base_url = base_url.rstrip("/")
+        else:
+            self.base_url = [url.rstrip("/") for url in base_url]
+        self.api_key = api_key or os.environ.get("ANYTHINGLLM_API_KEY")
+
+        if not self.api_key:
+            raise ValueError(
+                "API 密钥必须提供，可以通过参数传递或设置环境变量 ANYTHINGLLM_API_KEY"
+            )
+
+        self.http_client = AsyncHttpClient(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=timeout,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+            http2_prior_knowledge=http2_prior_knowledge,
+            max_streams_per_connection=max_streams_per_connection,
+            retry=retry,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            shared_limiter=shared_limiter,
+            concurrency_limiter=concurrency_limiter,
+            timeouts=timeouts,
+            hedging=hedging,
+            load_balancer=load_balancer,
+            json_codec=json_codec,
+            compression=compression,
+            coalescing=coalescing,
+            cache=cache,
+        )
+
+        self._init_modules(self.http_client)
+
+    def _init_modules(self, http_client: Any) -> None:
+        """
+        初始化各个模块
+
+        Args:
+            http_client: 模块使用的 HTTP 客户端
+        """
+        self.http_client = http_client
+        self.auth = AuthModule(http_client)
+        self.workspaces = WorkspacesModule(http_client)
+        self.documents = AsyncDocumentsModule(http_client)
+        self.chat = ChatModule(http_client)
+        self.system = SystemModule(http_client)
+        self.users = UsersModule(http_client)
+        self.embed = EmbedModule(http_client)
+        self.admin = AdminModule(http_client)
+        self.openai = AsyncOpenAIModule(http_client)
+        self.workspace_thread = WorkspaceThreadModule(http_client)
+
+    def with_options(self, **options: Any) -> "AsyncAnythingLLMClient":
+        """
+        返回绑定了默认调用参数的客户端，与当前客户端共享连接池和配置
+
+        例如 ``client.with_options(retry=RetryPolicy(total=0)).chat.send_message(...)``
+        只对这一次调用关闭重试。
+
+        Args:
+            **options: 每次请求的默认参数，例如 ``retry``
+
+        Returns:
+            新的客户端对象，关闭它会同时关闭当前客户端的连接池
+        """
+        clone = object.__new__(AsyncAnythingLLMClient)
+        clone.base_url = self.base_url
+        clone.api_key = self.api_key
+        clone._init_modules(self.http_client.with_options(**options))
+        return clone
+
+    def batch_loader(
+        self,
+        window: float = 0.0,
+        bulk_threshold: int = 10,
+        documents_item_path: Optional[str] = None,
+    ) -> AsyncBatchLoader:
+        """
+        创建批量加载器，同一轮事件循环中按 ID 获取文档、工作区和用户的调用合并为
+        一个批次
+
+        Args:
+            window: 收集批次的秒数，0 表示收集同一轮事件循环中的调用
+            bulk_threshold: 批次中的 ID 数（加上本作用域中逐个获取的次数）达到该值时
+                改用列表请求
+            documents_item_path: 文档数组在 ``documents.list()`` 响应中的键路径，
+                None 表示第一个数组
+
+        Returns:
+            批量加载器
+        """
+        return AsyncBatchLoader(self, window, bulk_threshold, documents_item_path)
+
+    async def get_api_status(self) -> Dict[str, Any]:
+        """
+        获取 API 服务器状态
+
+        Returns:
+            包含 API 服务器状态信息的字典
+        """
+        return await self.http_client.get("/v1/system/health")
+
+    async def aclose(self) -> None:
+        """关闭客户端并释放所有连接"""
+        await self.http_client.aclose()
+
+    async def __aenter__(self) -> "AsyncAnythingLLMClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
@@ -0,0 +1,1185 @@
+"""
+异步 HTTP 客户端模块，基于 asyncio 与 AnythingLLM API 通信
+"""
+
+import asyncio
+import contextvars
+import time
+import warnings
+from typing import (
+    AsyncIterator, Awaitable, Callable, Dict, Any, Optional, Sequence, Set, Union, BinaryIO,
+)
+from urllib.parse import urljoin, urlsplit
+
+from .balancer import LoadBalancer
+from .cache import CacheLookup, ResponseCache
+from .circuit_breaker import CircuitBreaker
+from .coalescing import RequestCoalescer
+from .codec import JsonCodec, JsonItemParser, JsonStream, create_codec
+from .compression import _DECODE_ERRORS, CompressionPolicy, CompressionStats, create_decoder
+from .concurrency import ConcurrencyLimiter
+from .endpoints import affinity_key, endpoint_family
+from .exceptions import ApiError, DeadlineExceededError
+from .hedging import HedgePolicy
+from .http_client import (
+    _BoundHttpClient,
+    _HedgeSlots,
+    _StreamedBody,
+    _can_resend,
+    _encode_params,
+    _origin,
+    _queue,
+    parse_response,
+)
+from .rate_limiter import RateLimiter
+from .shared_limiter import SharedLimiter
+from .timeouts import (
+    Timeout,
+    budget_timeouts,
+    budget_wait,
+    request_deadline,
+    resolve_timeouts,
+    within_deadline,
+)
+from .retry import RetryPolicy, RetryStats, parse_retry_after
+from .transports import http2_available
+from .unix_socket import UNIX_HOST
+
+
+async def _queue_async(
+    acquire: Callable[[Optional[float]], Awaitable[Any]],
+    wait: Optional[float],
+    expires: Optional[float],
+    family: Optional[str],
+) -> Any:
+    """
+    ``_queue`` 的协程版本，在时间预算内等待在途名额
+
+    Args:
+        acquire: 以最长等待秒数为参数的排队协程函数
+        wait: 排队组件自身的最长等待秒数，None 表示不限制
+        expires: 请求的截止时间，None 表示没有截止时间
+        family: 端点族
+
+    Returns:
+        ``acquire`` 的返回值
+
+    Raises:
+        DeadlineExceededError: 剩余的时间预算不够排队时
+        ApiError: 超过排队组件自身的等待时间时，由 ``acquire`` 抛出
+    """
+    timeout, capped = budget_wait(wait, expires)
+    try:
+        return await acquire(timeout)
+    except ApiError as e:
+        if not capped:
+            raise
+        raise DeadlineExceededError(family) from e
+
+
+class _AsyncStreamedBody:
+    """
+    分块发送的请求体的异步包装，httpx 的异步客户端只接受异步迭代的请求体
+
+    每次遍历重新遍历被包装的请求体，因此可以在重试时重新发送。
+    """
+
+    def __init__(self, body: _StreamedBody):
+        self.body = body
+
+    @property
+    def resendable(self) -> bool:
+        return self.body.resendable
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in self.body:
+            yield chunk
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_GZIP_HEADERS = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+
+
+class AsyncHttpClient:
+    """
+    异步 HTTP 客户端类，接口与 ``HttpClient`` 一致，但所有请求方法都是协程
+
+    所有请求共享同一个 ``httpx.AsyncClient`` 连接池。超过 ``max_connections``
+    的请求会在客户端的信号量上排队等待空闲连接，而不是报错，因此单个进程可以
+    同时挂起数千个请求。排队放在 httpx 之外，是因为 httpx 连接池为每个排队请求
+    分配连接的开销随排队数量平方增长。
+
+    启用 ``http2`` 后，并发请求以多路复用的流共享少量连接，同时在途的请求数上限
+    变为 ``max_connections * max_streams_per_connection``。HTTP/2 的协商与回退
+    规则与 ``HttpxTransport`` 相同。
+
+    ``base_url`` 为 ``unix:///run/anythingllm.sock`` 形式时，所有请求都通过该
+    Unix 域套接字发送。
+
+    重试、熔断和限流规则与 ``HttpClient`` 相同；重试前的等待不占用连接池的并发额度。
+    多实例负载均衡的规则也与 ``HttpClient`` 相同，但不支持多个 Unix 域套接字。
+    """
+
+    def __init__(
+        self,
+        base_url: Union[str, Sequence[str]],
+        api_key: str,
+        timeout: int = 60,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 5.0,
+        http2: bool = False,
+        http2_prior_knowledge: bool = False,
+        max_streams_per_connection: int = 100,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        shared_limiter: Optional[SharedLimiter] = None,
+        concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional[HedgePolicy] = None,
+        load_balancer: Optional[LoadBalancer] = None,
+        json_codec: Union[str, JsonCodec] = "auto",
+        compression: Optional[CompressionPolicy] = None,
+        coalescing: Optional[RequestCoalescer] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        """
+        初始化异步 HTTP 客户端
+
+        Args:
+            base_url: API 的基础 URL，也可以是 unix:// 开头的 Unix 域套接字路径；
+                多个实例时为基础 URL 的列表
+            api_key: API 密钥
+            timeout: 请求超时时间（秒），不包括在连接池中排队等待的时间
+            max_connections: 连接池最大连接数，None 表示不限制
+            max_keepalive_connections: 最多保留的空闲长连接数
+            keepalive_expiry: 空闲连接保留时间（秒）
+            http2: 是否启用 HTTP/2
+            http2_prior_knowledge: 明文连接是否直接使用 HTTP/2（h2c）
+            max_streams_per_connection: 启用 HTTP/2 时每个连接承载的并发流数量
+            retry: 重试策略，None 表示使用默认的 ``RetryPolicy()``，
+                ``RetryPolicy(total=0)`` 表示不重试
+            circuit_breaker: 按端点族统计的熔断器，None 表示不熔断
+            rate_limiter: 按端点族限流的令牌桶，None 表示不限流，等待令牌时不阻塞事件循环
+            shared_limiter: 同一主机上多个进程共享的速率和在途请求数预算，
+                None 表示不共享
+            concurrency_limiter: 按端点族自适应调整在途请求上限的并发限制器，
+                None 表示不限制，排队时不阻塞事件循环
+            timeouts: 按端点族区分的超时配置，规则与 ``HttpClient`` 相同，
+                连接池排队时间不计入连接和读取超时
+            hedging: GET 请求的对冲策略，None 表示不对冲；落后的请求会被取消
+            load_balancer: 多实例负载均衡器，``base_url`` 为多个地址且未指定时使用
+                默认的 ``LoadBalancer()``
+            json_codec: JSON 编解码器名称或实例，规则与 ``HttpClient`` 相同
+            compression: 压缩策略，None 表示使用默认的 ``CompressionPolicy()``
+            coalescing: 合并同时进行的相同 GET 请求，None 表示不合并；等待时不阻塞
+                事件循环
+            cache: GET 响应缓存，None 表示不缓存，规则与 ``HttpClient`` 相同
+
+        Raises:
+            ImportError: 未安装 httpx 时
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "异步客户端需要 httpx，请运行 pip install anythingllm_client[async]"
+            ) from e
+
+        if http2 and not http2_available():
+            warnings.warn("未安装 h2，异步客户端将使用 HTTP/1.1", RuntimeWarning)
+            http2 = False
+
+        endpoints = [base_url] if isinstance(base_url, str) else list(base_url)
+        if not endpoints:
+            raise ValueError("base_url 不能为空")
+        if len(endpoints) > 1 and any(urlsplit(e).scheme == "unix" for e in endpoints):
+            raise ValueError("异步客户端的多实例负载均衡不支持 Unix 域套接字")
+        base_url = endpoints[0]
+
+        self._httpx = httpx
+        self.base_url = base_url
+        self.endpoints = endpoints
+        self.json_codec = create_codec(json_codec)
+        self.compression = compression if compression is not None else CompressionPolicy()
+        self._compression_stats = CompressionStats()
+        parts = urlsplit(base_url)
+        if parts.scheme == "unix":
+            self._socket_path: Optional[str] = parts.path
+            self._request_base = f"http://{UNIX_HOST}/"
+        else:
+            self._socket_path = None
+            self._request_base = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._timeouts = resolve_timeouts(timeout, timeouts)
+        self.http2 = http2
+        self.http2_prior_knowledge = http2 and http2_prior_knowledge
+        self.max_connections = max_connections
+        if max_connections is not None and http2:
+            self.max_in_flight = max_connections * max_streams_per_connection
+        else:
+            self.max_in_flight = max_connections
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.retry = retry if retry is not None else RetryPolicy()
+        self._retry_stats = RetryStats()
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.shared_limiter = shared_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.hedging = hedging
+        self.coalescing = coalescing
+        self.cache = cache
+        # 正在进行的后台刷新任务，保留引用避免被回收
+        self._refresh_tasks: Set["asyncio.Task[None]"] = set()
+        if shared_limiter is not None:
+            shared_limiter.attach(",".join(endpoint.rstrip("/") for endpoint in endpoints))
+        self._http2_confirmed = False
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._client = self._create_client(self.http2, self.http2_prior_knowledge)
+        self._origin = _origin(self._request_base)
+        if load_balancer is None and len(endpoints) > 1:
+            load_balancer = LoadBalancer()
+        self.load_balancer = load_balancer
+        # 健康检查在后台线程中进行，使用独立的同步 httpx 客户端
+        self._probe_client: Optional[Any] = None
+        if load_balancer is not None:
+            origins = [_origin(endpoint) for endpoint in endpoints]
+            load_balancer.attach(origins if self._socket_path is None else [self._origin], self._probe)
+
+    def _create_client(self, http2: bool, prior_knowledge: bool) -> Any:
+        """
+        创建 httpx 异步客户端
+
+        Args:
+            http2: 是否启用 HTTP/2
+            prior_knowledge: 是否禁用 HTTP/1.1 直接使用 HTTP/2
+
+        Returns:
+            httpx.AsyncClient 实例
+        """
+        transport = self._httpx.AsyncHTTPTransport(
+            http1=not prior_knowledge,
+            http2=http2,
+            uds=self._socket_path,
+            limits=self._limits,
+        )
+        return self._httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "X-API-Key": self.api_key,
+                "Accept-Encoding": self.compression.accept_encoding(),
+            },
+            timeout=self._httpx.Timeout(self.timeout, pool=None),
+            transport=transport,
+        )
+
+    @staticmethod
+    async def _call(client: Any, method: str, url: str, stream: bool, kwargs: Dict[str, Any]) -> Any:
+        """通过 httpx 客户端发送请求，``stream`` 为 True 时不读取响应体"""
+        if stream:
+            return await client.send(client.build_request(method, url, **kwargs), stream=True)
+        return await client.request(method, url, **kwargs)
+
+    async def _send(self, method: str, url: str, stream: bool = False, **kwargs: Any) -> Any:
+        """
+        发送请求，服务端在确认支持 HTTP/2 之前断开或返回协议错误时回退到 HTTP/1.1
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            stream: 是否只读取响应头，响应体由调用方读取
+            **kwargs: 传递给 httpx 的其他参数
+
+        Returns:
+            httpx 响应对象
+        """
+        client = self._client
+        try:
+            response = await self._call(client, method, url, stream, kwargs)
+        except (
+            self._httpx.ProtocolError,
+            self._httpx.ReadError,
+            self._httpx.WriteError,
+        ):
+            if self._client is client and (
+                not self.http2_prior_knowledge or self._http2_confirmed
+            ):
+                raise
+            if self._client is client:
+                self._client = self._create_client(http2=False, prior_knowledge=False)
+                self.http2_prior_knowledge = False
+                await client.aclose()
+            response = await self._call(self._client, method, url, stream, kwargs)
+
+        if not self._http2_confirmed and response.http_version == "HTTP/2":
+            self._http2_confirmed = True
+        return response
+
+    def with_options(self, **options: Any) -> _BoundHttpClient:
+        """
+        返回绑定了默认调用参数的客户端视图，与当前客户端共享连接池和配置
+
+        Args:
+            **options: 每次请求的默认参数，例如 ``retry``
+
+        Returns:
+            客户端视图，接口与 ``AsyncHttpClient`` 相同
+        """
+        return _BoundHttpClient(self, options)
+
+    def retry_stats(self) -> Dict[str, Any]:
+        """
+        获取重试统计信息
+
+        Returns:
+            包含重试过的请求数、重试总次数、重试后仍失败的请求数以及按原因统计的字典
+        """
+        return self._retry_stats.snapshot()
+
+    def compression_stats(self) -> Dict[str, Any]:
+        """
+        获取请求体和响应体压缩前后的字节数
+
+        Returns:
+            包含请求和响应的数量、压缩前字节数、实际传输字节数以及节省比例的字典；
+            请求只统计 JSON 请求体：普通请求体在编码时统计一次，
+            分块请求体（``JsonStream``）每次发送统计一次
+        """
+        return self._compression_stats.snapshot()
+
+    def circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的熔断状态
+
+        Returns:
+            以端点族为键的状态字典，未启用熔断器时返回空字典
+        """
+        if self.circuit_breaker is None:
+            return {}
+        return self.circuit_breaker.states()
+
+    def rate_limit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的限流状态
+
+        Returns:
+            以端点族为键的状态字典，未启用限流器时返回空字典
+        """
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.states()
+
+    def concurrency_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的并发状态
+
+        Returns:
+            以端点族为键的状态字典，未启用并发限制器时返回空字典
+        """
+        if self.concurrency_limiter is None:
+            return {}
+        return self.concurrency_limiter.states()
+
+    def hedge_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的对冲统计
+
+        Returns:
+            以端点族为键的字典，包含对冲率和对冲胜出率等，未启用对冲时为空字典
+        """
+        if self.hedging is None:
+            return {}
+        return self.hedging.states()
+
+    def coalescing_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的请求合并统计
+
+        Returns:
+            以端点族为键的字典，包含请求数、实际发送的请求数、被合并的请求数以及合并率，
+            未启用合并时为空字典
+        """
+        if self.coalescing is None:
+            return {}
+        return self.coalescing.states()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        获取响应缓存的统计
+
+        Returns:
+            键见 ``ResponseCache.stats``，未启用缓存时为空字典
+        """
+        if self.cache is None:
+            return {}
+        return self.cache.stats()
+
+    def balancer_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各实例的负载均衡状态
+
+        Returns:
+            以实例源地址为键的状态字典，未启用负载均衡时返回空字典
+        """
+        if self.load_balancer is None:
+            return {}
+        return self.load_balancer.states()
+
+    def _probe(self, origin: str) -> bool:
+        """
+        检查实例是否健康，由负载均衡器的健康检查线程调用
+
+        Args:
+            origin: 实例的源地址
+
+        Returns:
+            健康检查接口返回 5xx 以外的状态码时返回 True
+        """
+        if self._probe_client is None:
+            self._probe_client = self._httpx.Client(
+                headers=dict(self._client.headers),
+                timeout=self.load_balancer.probe_timeout,
+                transport=self._httpx.HTTPTransport(uds=self._socket_path),
+            )
+        try:
+            response = self._probe_client.get(origin + "/v1/system/health")
+        except self._httpx.TransportError:
+            return False
+        return response.status_code < 500
+
+    def shared_limit_state(self) -> Dict[str, Any]:
+        """
+        获取跨进程共享预算的当前状态
+
+        Returns:
+            包含剩余令牌数、在途请求数及其上限的字典，未启用共享限流时返回空字典
+        """
+        if self.shared_limiter is None:
+            return {}
+        return self.shared_limiter.state()
+
+    async def aclose(self) -> None:
+        """关闭客户端并释放连接池中的所有连接，取消正在进行的后台刷新"""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self.load_balancer is not None:
+            self.load_balancer.close()
+        if self._probe_client is not None:
+            self._probe_client.close()
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def _send_in_slot(self, method: str, url: str, stream: bool = False, **kwargs: Any) -> Any:
+        """
+        在连接池容量内发送请求
+
+        流式响应在收到响应头后即归还名额，读取响应体期间占用的连接不计入。
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            stream: 是否只读取响应头
+            **kwargs: 传递给 httpx 的其他参数
+
+        Returns:
+            httpx 响应对象
+        """
+        if self.max_in_flight is None:
+            return await self._send(method, url, stream, **kwargs)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        async with self._slots:
+            return await self._send(method, url, stream, **kwargs)
+
+    async def _send_timed(
+        self,
+        hedging: HedgePolicy,
+        family: str,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+        avoid: Optional[str] = None,
+    ) -> Any:
+        """
+        发送一次请求，并把成功返回的延迟记录到对冲策略
+
+        ``avoid`` 不为 None 时，请求由负载均衡器改发到该实例以外的实例。
+        """
+        origin = None
+        if avoid is not None:
+            origin = self.load_balancer.pick(exclude=avoid)
+            url = origin + url[len(avoid):]
+        started = time.monotonic()
+        failed = None
+        try:
+            response = await self._send_in_slot(method, url, **kwargs)
+            failed = response.status_code >= 500
+        except self._httpx.TransportError:
+            failed = True
+            raise
+        finally:
+            if origin is not None:
+                self.load_balancer.finish(
+                    origin, None if failed is None else time.monotonic() - started, bool(failed)
+                )
+        if not failed:
+            hedging.record(family, time.monotonic() - started)
+        return response
+
+    async def _send_hedged(
+        self,
+        hedging: HedgePolicy,
+        family: str,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+        origin: Optional[str] = None,
+    ) -> Any:
+        """
+        发送可以对冲的请求：超过对冲等待时间仍未返回时再发送一份，采用先返回的
+        响应并取消另一个；``origin`` 为原请求所在的实例，对冲请求发往其他实例
+
+        对冲请求不排队地占用并发限制器和共享限流器的名额，没有空闲名额时不对冲；
+        名额在对冲请求结束或被取消时归还。
+
+        Returns:
+            先返回的 httpx 响应对象
+
+        Raises:
+            httpx.TransportError: 所有请求都失败时，抛出原请求的错误
+        """
+        delay = hedging.delay(family)
+        if delay is None:
+            return await self._send_timed(hedging, family, method, url, kwargs)
+
+        primary = asyncio.ensure_future(self._send_timed(hedging, family, method, url, kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                slots = _HedgeSlots.acquire(
+                    self.concurrency_limiter, None, self.shared_limiter, family
+                )
+                if slots is None:
+                    hedging.record_skipped(family)
+                elif not hedging.try_hedge(family):
+                    slots.release()
+                else:
+                    hedge = asyncio.ensure_future(
+                        self._send_timed(hedging, family, method, url, kwargs, origin)
+                    )
+                    hedge.add_done_callback(slots.release)
+                    pending.add(hedge)
+            hedged = len(pending) > 1
+
+            errors: Dict[asyncio.Future, BaseException] = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        errors[task] = error
+                        continue
+                    if hedged and task is not primary:
+                        hedging.record_win(family)
+                    return task.result()
+            raise errors.get(primary) or next(iter(errors.values()))
+        finally:
+            # 包括调用方被取消：取消仍在进行的请求
+            for task in pending:
+                task.cancel()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        stream: bool = False,
+        lookup: Optional[CacheLookup] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        发送请求并解析响应，按重试策略重试失败的请求
+
+        Args:
+            method: HTTP 方法
+            path: API 路径
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 等待限流令牌的最长秒数，None 表示使用限流器的设置
+            stream: 是否不对冲，并在收到成功响应的响应头后返回未读取响应体的 httpx
+                响应和完成回调，错误响应仍然完整读取后按重试策略处理。在途名额一直
+                占用到调用方读完或放弃响应体后调用完成回调，延迟和熔断结果也在此时
+                记录，回调参数为读取响应体是否失败，None 表示没有读完就关闭
+            lookup: 可缓存的 GET 请求的缓存查找结果，None 表示不缓存
+            **kwargs: 传递给 httpx 的其他参数
+
+        Returns:
+            解析后的响应数据，``stream`` 为 True 时为 httpx 响应对象和完成回调
+        """
+        url = urljoin(self._request_base, path)
+        policy = retry if retry is not None else self.retry
+        breaker = self.circuit_breaker
+        limiter = self.rate_limiter
+        shared = self.shared_limiter
+        concurrency = self.concurrency_limiter
+        hedging = self.hedging
+        timeouts = self._timeouts
+        family = None
+        if (
+            breaker is not None or limiter is not None or concurrency is not None
+            or hedging is not None or len(timeouts) > 1
+        ):
+            family = endpoint_family(url)
+        if hedging is not None and (stream or not hedging.applies(method, family)):
+            hedging = None
+        balancer = self.load_balancer
+        if balancer is not None:
+            if url.startswith(self._origin):
+                suffix = url[len(self._origin):]
+                key = affinity_key(url) if balancer.sticky_threads else None
+            else:
+                balancer = None
+        connect_timeout, read_timeout, total = timeouts.get(family, timeouts["default"])
+        expires = request_deadline(total)
+        files = kwargs.get("files")
+        retries = 0
+        # 上一次失败的实例，重试时尽量避开
+        avoid = None
+        while True:
+            if files and retries:
+                # 上传的文件对象已被读到末尾，重试前回到开头
+                for value in files.values():
+                    file_obj = value[1] if isinstance(value, (tuple, list)) else value
+                    if hasattr(file_obj, "seek"):
+                        file_obj.seek(0)
+
+            slot = None
+            entered = False
+            try:
+                # 排队的时间不超过剩余的时间预算
+                if limiter is not None:
+                    wait = _queue(
+                        lambda wait: limiter.reserve(family, wait),
+                        limiter.max_wait if rate_limit_wait is None else rate_limit_wait,
+                        expires,
+                        family,
+                    )
+                    if wait > 0:
+                        try:
+                            await asyncio.sleep(wait)
+                        except asyncio.CancelledError:
+                            # 令牌已经扣除但请求没有发出
+                            limiter.refund(family)
+                            raise
+                if concurrency is not None:
+                    await _queue_async(
+                        lambda wait: concurrency.acquire_async(family, wait),
+                        concurrency.queue_timeout,
+                        expires,
+                        family,
+                    )
+                    entered = True
+                if shared is not None:
+                    slot = await _queue_async(
+                        shared.acquire_async,
+                        shared.max_wait if rate_limit_wait is None else rate_limit_wait,
+                        expires,
+                        family,
+                    )
+                budget = budget_timeouts(connect_timeout, read_timeout, expires)
+                if budget is None:
+                    raise DeadlineExceededError(family)
+                if breaker is not None:
+                    breaker.before_call(family)
+            except BaseException as e:
+                # 包括任务被取消：归还已经占用的名额
+                if shared is not None:
+                    shared.release(slot)
+                if entered:
+                    concurrency.release(family)
+                if isinstance(e, Exception):
+                    self._give_up(e, retries)
+                raise
+            origin = target = None
+            if balancer is not None:
+                origin = balancer.pick(key, avoid)
+                target = origin + suffix
+            started = time.monotonic()
+            # 是否出现过载信号，None 表示请求没有结果
+            overloaded = None
+            failed = False
+            # 流式响应的名额和结果留到响应体读完后处理
+            deferred = False
+            try:
+                try:
+                    kwargs["timeout"] = self._httpx.Timeout(budget[1], connect=budget[0], pool=None)
+                    if hedging is not None:
+                        response = await self._send_hedged(
+                            hedging, family, method, target or url, kwargs, origin
+                        )
+                    else:
+                        response = await self._send_in_slot(method, target or url, stream, **kwargs)
+                        if stream and response.status_code >= 400:
+                            try:
+                                await response.aread()
+                            except BaseException:
+                                await response.aclose()
+                                raise
+                        deferred = stream and response.status_code < 400
+                    failed = response.status_code >= 500
+                    overloaded = failed or response.status_code == 429
+                except self._httpx.TransportError:
+                    overloaded = failed = True
+                    raise
+                finally:
+                    avoid = origin if failed else None
+                    if not deferred:
+                        self._release_slots(family, origin, slot, started, overloaded, failed)
+            except self._httpx.TransportError as e:
+                if breaker is not None:
+                    breaker.record(family, True, time.monotonic() - started)
+                not_sent = isinstance(
+                    e,
+                    (
+                        self._httpx.ConnectError,
+                        self._httpx.ConnectTimeout,
+                        self._httpx.PoolTimeout,
+                    ),
+                )
+                delay = policy.delay_for_error(method, not not_sent, retries + 1)
+                if not _can_resend(kwargs.get("content")):
+                    delay = None
+                if expires is not None and (
+                    time.monotonic() >= expires
+                    or (delay is not None and within_deadline(delay, expires) is None)
+                ):
+                    # 时间预算已经用完，或者剩余的预算不够等待下一次重试
+                    error = DeadlineExceededError(family)
+                    self._give_up(error, retries)
+                    raise error from e
+                if delay is None:
+                    self._give_up(e, retries)
+                    raise
+                reason = e.__class__.__name__
+            except BaseException:
+                # 包括任务被取消：释放半开状态下占用的探测名额
+                if breaker is not None:
+                    breaker.release(family)
+                raise
+            else:
+                if breaker is not None and not deferred:
+                    breaker.record(
+                        family, response.status_code >= 500, time.monotonic() - started
+                    )
+                if limiter is not None and response.status_code >= 400:
+                    limiter.on_response(
+                        family,
+                        response.status_code,
+                        parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                delay = None
+                if response.status_code >= 400 and _can_resend(kwargs.get("content")):
+                    delay = within_deadline(
+                        policy.delay_for_status(
+                            method, response.status_code, response.headers, retries + 1
+                        ),
+                        expires,
+                    )
+                if delay is None:
+                    if deferred:
+                        return response, self._stream_done(family, origin, slot, started)
+                    try:
+                        return self._handle_response(response, lookup)
+                    except Exception as e:
+                        self._give_up(e, retries)
+                        raise
+                reason = str(response.status_code)
+
+            retries += 1
+            self._retry_stats.record_retry(retries, reason)
+            await asyncio.sleep(delay)
+
+    def _release_slots(
+        self,
+        family: Optional[str],
+        origin: Optional[str],
+        slot: Optional[int],
+        started: float,
+        overloaded: Optional[bool],
+        failed: bool,
+    ) -> None:
+        """
+        归还一次请求占用的在途名额，并把结果记录到负载均衡器和并发限制器
+
+        Args:
+            family: 端点族
+            origin: 负载均衡器选择的实例，None 表示没有经过负载均衡器
+            slot: 共享限流器的在途名额序号
+            started: 请求开始的时间（``time.monotonic``）
+            overloaded: 是否出现过载信号，None 表示请求没有结果
+            failed: 请求是否失败
+        """
+        duration = None if overloaded is None else time.monotonic() - started
+        if origin is not None:
+            self.load_balancer.finish(origin, duration, failed)
+        if self.shared_limiter is not None:
+            self.shared_limiter.release(slot)
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(family, duration, bool(overloaded))
+
+    def _stream_done(
+        self, family: Optional[str], origin: Optional[str], slot: Optional[int], started: float
+    ) -> Callable[[Optional[bool]], None]:
+        """
+        创建流式响应的完成回调：归还在途名额并记录延迟和熔断结果
+
+        Returns:
+            完成回调，参数为读取响应体是否失败，None 表示没有读完就关闭（不记录
+            延迟样本，熔断器按成功处理）
+        """
+
+        def done(failed: Optional[bool]) -> None:
+            self._release_slots(family, origin, slot, started, failed, bool(failed))
+            breaker = self.circuit_breaker
+            if breaker is not None:
+                breaker.record(family, bool(failed), time.monotonic() - started)
+
+        return done
+
+    def _give_up(self, error: Exception, retries: int) -> None:
+        """
+        记录放弃重试的请求
+
+        Args:
+            error: 最终抛出的异常
+            retries: 已经重试的次数
+        """
+        error.attempts = retries + 1
+        if retries:
+            self._retry_stats.record_exhausted()
+
+    def _handle_response(self, response: Any, lookup: Optional[CacheLookup] = None) -> Any:
+        """
+        处理 API 响应
+
+        Args:
+            response: httpx 响应对象
+            lookup: 可缓存的 GET 请求的缓存查找结果，用于写入缓存和处理 304 响应
+
+        Returns:
+            解析后的响应数据
+
+        Raises:
+            ApiError: 当 API 返回错误时
+        """
+        # httpx 边读取边解压，num_bytes_downloaded 是从连接读取的原始字节数
+        self._compression_stats.record_response(
+            len(response.content), response.num_bytes_downloaded
+        )
+        if lookup is not None:
+            cached = self.cache.complete(
+                lookup, response.status_code, response.headers, response.content
+            )
+            if cached is not None:
+                return parse_response(
+                    200, response.reason_phrase, cached, None, self.json_codec
+                )
+        return parse_response(
+            response.status_code, response.reason_phrase, response.content, response.headers,
+            self.json_codec,
+        )
+
+    def _json_body(self, json_data: Any) -> Dict[str, Any]:
+        """
+        用客户端的编解码器编码 JSON 请求体，达到压缩阈值时用 gzip 压缩
+
+        Args:
+            json_data: JSON 数据或 ``JsonStream``
+
+        Returns:
+            传递给 httpx 的 ``content`` 和 ``headers`` 参数
+        """
+        if isinstance(json_data, JsonStream):
+            compression = self.compression
+            level = compression.level if compression.request_threshold is not None else None
+            return {
+                "content": _AsyncStreamedBody(
+                    _StreamedBody(json_data, self.json_codec, level, self._compression_stats)
+                ),
+                "headers": _JSON_HEADERS if level is None else _GZIP_HEADERS,
+            }
+        body = self.json_codec.dumps(json_data)
+        compressed = self.compression.compress(body)
+        if compressed is None:
+            self._compression_stats.record_request(len(body), len(body))
+            return {"content": body, "headers": _JSON_HEADERS}
+        self._compression_stats.record_request(len(body), len(compressed))
+        return {"content": compressed, "headers": _GZIP_HEADERS}
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+    ) -> Any:
+        """
+        发送 GET 请求
+
+        启用响应缓存时，缓存期内的接口直接返回缓存的结果，过期后带上条件请求头重新
+        验证；需要后台刷新时在独立的任务中发送刷新请求。启用请求合并时，与正在进行的
+        相同请求共享结果，``retry`` 等参数以先发出的请求为准。
+
+        Args:
+            path: API 路径
+            params: 查询参数
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+
+        Returns:
+            解析后的响应数据
+        """
+        cache = self.cache
+        coalescing = self.coalescing
+        if cache is None and coalescing is None:
+            return await self._request("GET", path, retry, rate_limit_wait, params=params)
+        url = urljoin(self._request_base, path)
+        query = _encode_params(params) if params else ""
+        options: Dict[str, Any] = {"params": params}
+        if cache is not None:
+            lookup = cache.lookup(f"{url}?{query}" if query else url, self.api_key)
+            if lookup is not None:
+                if lookup.fresh:
+                    if lookup.refresh:
+                        self._refresh(path, params, lookup)
+                    return parse_response(200, "OK", lookup.entry.content, None, self.json_codec)
+                options["lookup"] = lookup
+                if lookup.headers:
+                    options["headers"] = lookup.headers
+        if coalescing is not None:
+            family = endpoint_family(url)
+            if coalescing.applies(family):
+                return await coalescing.do_async(
+                    ("GET", url, query, self.api_key),
+                    family,
+                    lambda: self._request("GET", path, retry, rate_limit_wait, **options),
+                )
+        return await self._request("GET", path, retry, rate_limit_wait, **options)
+
+    def _refresh(
+        self, path: str, params: Optional[Dict[str, Any]], lookup: CacheLookup
+    ) -> None:
+        """
+        在独立的任务中刷新缓存的响应，调用方不等待
+
+        Args:
+            path: API 路径
+            params: 查询参数
+            lookup: 触发刷新的缓存查找结果
+        """
+        options: Dict[str, Any] = {"params": params, "lookup": lookup}
+        if lookup.headers:
+            options["headers"] = lookup.headers
+
+        async def refresh() -> None:
+            error: Optional[BaseException] = None
+            try:
+                await self._request("GET", path, **options)
+            except BaseException as e:
+                error = e
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                self.cache.refresh_done(lookup, error)
+
+        # 在空的上下文中创建任务，刷新请求不受调用方 deadline 的限制
+        task = contextvars.Context().run(asyncio.ensure_future, refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _write(
+        self,
+        method: str,
+        path: str,
+        retry: Optional[RetryPolicy],
+        rate_limit_wait: Optional[float],
+        **kwargs: Any,
+    ) -> Any:
+        """
+        发送写入请求，完成后（无论成功与否）使相关资源的响应缓存失效
+
+        Args:
+            method: HTTP 方法
+            path: API 路径
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            **kwargs: 传递给 httpx 的其他参数
+
+        Returns:
+            解析后的响应数据
+        """
+        try:
+            return await self._request(method, path, retry, rate_limit_wait, **kwargs)
+        finally:
+            # 失败或被取消的请求也可能已经在服务端生效
+            cache = self.cache
+            if cache is not None:
+                url = urljoin(self._request_base, path)
+                if cache.invalidates(method, url):
+                    cache.invalidate(url)
+
+    async def post(
+        self,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        json_data: Union[None, Dict[str, Any], JsonStream] = None,
+        files: Optional[Dict[str, BinaryIO]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+    ) -> Any:
+        """
+        发送 POST 请求
+
+        POST 默认只在请求确定没有发出（建立连接失败）时重试。
+
+        Args:
+            path: API 路径
+            data: 表单数据
+            json_data: JSON 数据，``JsonStream`` 以分块传输发送
+            files: 文件数据
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+
+        Returns:
+            解析后的响应数据
+        """
+        if files or data or json_data is None:
+            return await self._write(
+                "POST", path, retry, rate_limit_wait, data=data, files=files
+            )
+        return await self._write(
+            "POST", path, retry, rate_limit_wait, **self._json_body(json_data)
+        )
+
+    async def put(
+        self,
+        path: str,
+        json_data: Dict[str, Any],
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+    ) -> Any:
+        """
+        发送 PUT 请求
+
+        Args:
+            path: API 路径
+            json_data: JSON 数据
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+
+        Returns:
+            解析后的响应数据
+        """
+        return await self._write(
+            "PUT", path, retry, rate_limit_wait, **self._json_body(json_data)
+        )
+
+    async def delete(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+    ) -> Any:
+        """
+        发送 DELETE 请求
+
+        Args:
+            path: API 路径
+            params: 查询参数
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+
+        Returns:
+            解析后的响应数据
+        """
+        return await self._write(
+            "DELETE", path, retry, rate_limit_wait, params=params
+        )
+
+    async def iter_items(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        item_path: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        发送 GET 请求，边接收响应体边逐个返回其中 JSON 数组的元素
+
+        规则与 ``HttpClient.iter_items`` 相同，用 ``async for`` 遍历。
+
+        Args:
+            path: API 路径
+            params: 查询参数
+            item_path: 目标数组的键路径，None 表示响应中的第一个数组
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+
+        Returns:
+            数组元素的异步迭代器
+
+        Raises:
+            ApiError: 当 API 返回错误时
+            httpx.TransportError: 当读取响应体失败时
+            ValueError: 当响应体无法解压或不是合法的 JSON 时
+        """
+        response, done = await self._request(
+            "GET", path, retry, rate_limit_wait, stream=True, params=params
+        )
+        # 与同步传输层相同，读取原始数据自行分段解压，限制高压缩比响应的内存占用
+        decoder = create_decoder(response.headers.get("Content-Encoding"))
+        parser = JsonItemParser(item_path)
+        size = 0
+        # 读取响应体是否失败，None 表示没有读完
+        failed = None
+        try:
+            try:
+                async for chunk in response.aiter_raw():
+                    pieces = (chunk,) if decoder is None else decoder.iter_decompress(chunk)
+                    for piece in pieces:
+                        size += len(piece)
+                        for item in parser.feed(piece):
+                            yield item
+            except self._httpx.TransportError:
+                failed = True
+                raise
+            failed = False
+            tail = decoder.flush() if decoder is not None else b""
+            size += len(tail)
+            for item in parser.feed(tail) + parser.close():
+                yield item
+        except _DECODE_ERRORS as e:
+            # 与同步传输层把解压失败当作 TransportError 一致，计为失败
+            failed = True
+            raise ValueError(f"无法解压响应体: {e}") from e
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                done(failed)
+        self._compression_stats.record_response(size, response.num_bytes_downloaded)
@@ -0,0 +1,279 @@
+"""
+多实例负载均衡模块
+
+``LoadBalancer`` 在多个 AnythingLLM 实例之间分配请求，不需要额外的负载均衡器：
+
+- 选择策略：``least_outstanding`` 选择在途请求最少的实例；``ewma`` 选择
+  ``延迟 EWMA * (在途请求数 + 1)`` 最小的实例，延迟较高或正在处理较多请求的实例
+  分到的请求更少
+- 健康检查：后台线程定期请求每个实例的 ``/v1/system/health``，连续失败
+  ``unhealthy_threshold`` 次的实例被摘除，之后连续成功 ``healthy_threshold`` 次
+  重新加入；启用健康检查时，请求连续 ``max_failures`` 次连接失败或返回 5xx 的
+  实例同样被摘除
+- 线程亲和：同一个工作区线程的请求（见 ``endpoints.affinity_key``）按最高随机
+  权重哈希（rendezvous hashing）固定发往同一个实例，以利用该实例的缓存；该实例
+  被摘除时只有它上面的线程改发到其他实例
+
+所有实例都被摘除时仍然在全部实例之间选择，而不是拒绝请求。
+"""
+
+import threading
+import weakref
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+STRATEGIES = ("least_outstanding", "ewma")
+
+
+class _Node:
+    """
+    单个实例的状态，由 ``LoadBalancer`` 的锁保护
+    """
+
+    __slots__ = (
+        "origin", "healthy", "outstanding", "ewma", "requests", "failures",
+        "consecutive_failures", "probe_successes", "probe_failures", "ejections",
+    )
+
+    def __init__(self, origin: str):
+        self.origin = origin
+        self.healthy = True
+        self.outstanding = 0
+        self.ewma = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.probe_successes = 0
+        self.probe_failures = 0
+        self.ejections = 0
+
+
+class LoadBalancer:
+    """
+    多实例负载均衡器，由一个客户端独占
+    """
+
+    def __init__(
+        self,
+        strategy: str = "least_outstanding",
+        probe_interval: Optional[float] = 10.0,
+        probe_timeout: float = 3.0,
+        healthy_threshold: int = 2,
+        unhealthy_threshold: int = 2,
+        max_failures: int = 5,
+        smoothing: float = 0.3,
+        sticky_threads: bool = True,
+    ):
+        """
+        初始化负载均衡器
+
+        Args:
+            strategy: 选择策略，``least_outstanding`` 或 ``ewma``
+            probe_interval: 健康检查的间隔秒数，None 表示不做主动健康检查
+            probe_timeout: 单次健康检查的超时时间（秒）
+            healthy_threshold: 被摘除的实例连续通过该次数的健康检查后重新加入
+            unhealthy_threshold: 实例连续该次数健康检查失败后被摘除
+            max_failures: 实例的请求连续该次数连接失败或返回 5xx 后被摘除，
+                只在启用健康检查时生效（摘除的实例靠健康检查重新加入）
+            smoothing: 延迟 EWMA 中最新样本的权重，0 到 1 之间
+            sticky_threads: 是否把同一个工作区线程的请求固定发往同一个实例
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的负载均衡策略: {strategy}，可选值: {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.healthy_threshold = healthy_threshold
+        self.unhealthy_threshold = unhealthy_threshold
+        self.max_failures = max_failures
+        self.smoothing = smoothing
+        self.sticky_threads = sticky_threads
+        self._lock = threading.Lock()
+        self._nodes: List[_Node] = []
+        self._next = 0
+        self._probe: Optional[Callable[[], Optional[Callable[[str], bool]]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, origins: Sequence[str], probe: Callable[[str], bool]) -> None:
+        """
+        绑定实例列表并启动健康检查，由客户端在初始化时调用
+
+        Args:
+            origins: 各实例的源地址
+            probe: 健康检查函数，参数为源地址，实例健康时返回 True；
+                负载均衡器只保存它的弱引用，客户端被回收后健康检查线程随之退出
+
+        Raises:
+            ValueError: 实例列表为空或负载均衡器已经绑定到其他客户端时
+        """
+        if not origins:
+            raise ValueError("至少需要一个实例")
+        if self._nodes:
+            raise ValueError("负载均衡器已经绑定到其他客户端")
+        self._nodes = [_Node(origin) for origin in origins]
+        if hasattr(probe, "__self__"):
+            self._probe = weakref.WeakMethod(probe)
+        else:
+            self._probe = lambda: probe
+        self._start()
+
+    def _start(self) -> None:
+        """启动健康检查线程"""
+        if self.probe_interval is None or self._probe is None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._probe_loop,
+            args=(self._stop,),
+            name="anythingllm-health-probe",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _probe_loop(self, stop: threading.Event) -> None:
+        """定期检查所有实例，客户端关闭或被回收时退出"""
+        while not stop.wait(self.probe_interval):
+            probe = self._probe()
+            if probe is None:
+                return
+            for node in self._nodes:
+                try:
+                    healthy = bool(probe(node.origin))
+                except Exception:
+                    healthy = False
+                if stop.is_set():
+                    return
+                self.record_probe(node.origin, healthy)
+            del probe
+
+    def record_probe(self, origin: str, healthy: bool) -> None:
+        """
+        记录一次健康检查结果
+
+        Args:
+            origin: 实例的源地址
+            healthy: 是否通过健康检查
+        """
+        with self._lock:
+            node = self._find(origin)
+            if healthy:
+                node.probe_failures = 0
+                node.probe_successes += 1
+                if not node.healthy and node.probe_successes >= self.healthy_threshold:
+                    node.healthy = True
+                    node.consecutive_failures = 0
+            else:
+                node.probe_successes = 0
+                node.probe_failures += 1
+                if node.healthy and node.probe_failures >= self.unhealthy_threshold:
+                    self._eject(node)
+
+    def _find(self, origin: str) -> _Node:
+        """按源地址查找实例，调用方需持有锁"""
+        for node in self._nodes:
+            if node.origin == origin:
+                return node
+        raise KeyError(origin)
+
+    def _eject(self, node: _Node) -> None:
+        """摘除实例，调用方需持有锁"""
+        node.healthy = False
+        node.probe_successes = 0
+        node.ejections += 1
+
+    def pick(self, key: Optional[str] = None, exclude: Optional[str] = None) -> str:
+        """
+        为一次请求选择实例，并计入该实例的在途请求
+
+        Args:
+            key: 亲和键，不为 None 且启用了 ``sticky_threads`` 时按键固定选择实例
+            exclude: 尽量避开的实例源地址，例如上一次失败的实例或对冲请求的原实例
+
+        Returns:
+            选中实例的源地址，请求结束后必须调用 ``finish``
+        """
+        with self._lock:
+            candidates = [node for node in self._nodes if node.healthy]
+            if not candidates:
+                candidates = self._nodes
+            if exclude is not None and len(candidates) > 1:
+                candidates = [node for node in candidates if node.origin != exclude]
+
+            if key is not None and self.sticky_threads:
+                node = max(candidates, key=lambda n: zlib.crc32(f"{key}|{n.origin}".encode()))
+            elif self.strategy == "ewma":
+                node = min(candidates, key=lambda n: n.ewma * (n.outstanding + 1))
+            else:
+                # 在途请求数相同的实例之间轮流选择
+                self._next += 1
+                count = len(candidates)
+                node = min(
+                    (candidates[(self._next + i) % count] for i in range(count)),
+                    key=lambda n: n.outstanding,
+                )
+            node.outstanding += 1
+            node.requests += 1
+            return node.origin
+
+    def finish(self, origin: str, latency: Optional[float], failed: bool) -> None:
+        """
+        记录请求结果并扣除在途请求
+
+        Args:
+            origin: ``pick`` 返回的源地址
+            latency: 请求耗时（秒），None 表示请求没有结果（例如被取消）
+            failed: 是否连接失败或返回 5xx
+        """
+        with self._lock:
+            node = self._find(origin)
+            node.outstanding -= 1
+            if latency is None:
+                return
+            if failed:
+                node.failures += 1
+                node.consecutive_failures += 1
+                if (
+                    self.probe_interval is not None
+                    and node.healthy
+                    and node.consecutive_failures >= self.max_failures
+                ):
+                    self._eject(node)
+                return
+            node.consecutive_failures = 0
+            if node.ewma == 0:
+                node.ewma = latency
+            else:
+                node.ewma += (latency - node.ewma) * self.smoothing
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁、清空在途请求并重新启动健康检查线程"""
+        self._lock = threading.Lock()
+        for node in self._nodes:
+            node.outstanding = 0
+        self._start()
+
+    def close(self) -> None:
+        """停止健康检查线程"""
+        self._stop.set()
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各实例的状态
+
+        Returns:
+            以源地址为键的字典，包含是否健康、在途请求数、延迟 EWMA、请求数、
+            失败次数以及被摘除的次数
+        """
+        with self._lock:
+            return {
+                node.origin: {
+                    "healthy": node.healthy,
+                    "outstanding": node.outstanding,
+                    "ewma": node.ewma,
+                    "requests": node.requests,
+                    "failures": node.failures,
+                    "ejections": node.ejections,
+                }
+                for node in self._nodes
+            }
@@ -0,0 +1,443 @@
+"""
+响应缓存模块
+
+系统设置、模型列表、提示词和工作区列表等接口变化很慢，却常常在每次调用时重新
+获取。启用 ``ResponseCache`` 后，匹配 ``ttls`` 中路径模式的 GET 请求的成功响应
+按路径设置的秒数缓存，缓存期内直接返回；过期后如果服务端返回过 ``ETag`` 或
+``Last-Modified``，带上 ``If-None-Match`` / ``If-Modified-Since`` 重新验证，服务端
+返回 304 时继续使用缓存的响应体。
+
+设置 ``stale_while_revalidate`` 后，缓存时间是软过期时间：过期后的一段时间内调用方
+立即得到旧的响应，同时在后台发送一个刷新请求；超过这段时间（硬过期）后调用方才
+等待请求完成。设置 ``refresh_ahead`` 后，缓存期的最后一段时间内仍被读取的热点条目
+在过期之前就在后台刷新。刷新失败时继续返回旧的响应，失败次数记录在统计中。
+
+通过同一个客户端发送的 POST、PUT 和 DELETE 请求（对话和嵌入请求除外）完成后，
+使同一资源（``/v1/`` 之后的第一段路径，例如 ``system``、``workspaces``）以及
+``invalidations`` 中关联资源的缓存失效，调用方总能读到自己的写入。
+"""
+
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .endpoints import endpoint_family
+
+# 默认缓存的接口及缓存秒数，键为 API 路径，可以使用 fnmatch 通配符
+CACHE_TTLS: Dict[str, float] = {
+    "/v1/system/settings": 30.0,
+    "/v1/system/llm-models": 300.0,
+    "/v1/system/embedding-models": 300.0,
+    "/v1/system/vector-databases": 300.0,
+    "/v1/system/accepted-document-types": 3600.0,
+    "/v1/system/prompts": 60.0,
+    "/v1/workspaces": 30.0,
+    "/v1/openai/models": 60.0,
+}
+
+# 写入某个资源时额外失效的资源
+CACHE_INVALIDATIONS: Dict[str, Tuple[str, ...]] = {
+    # OpenAI 兼容接口的模型列表就是工作区列表
+    "workspaces": ("openai",),
+    # 管理员的系统偏好设置会改变系统设置
+    "admin": ("system",),
+}
+
+# 单数形式的路径前缀与复数形式属于同一资源
+_RESOURCE_ALIASES = {"workspace": "workspaces", "document": "documents"}
+
+# 不修改服务端数据的 POST 请求所属的端点族
+_READ_ONLY_FAMILIES = frozenset({"chat", "embed"})
+
+
+@lru_cache(maxsize=4096)
+def _api_path(url: str) -> str:
+    """从完整 URL 或 API 路径中取出以 /v1/ 开头、不含查询参数的路径"""
+    path = url.split("?", 1)[0]
+    start = path.find("/v1/")
+    if start != -1:
+        return path[start:]
+    return urlsplit(path).path if "://" in path else path
+
+
+def _resource(path: str) -> str:
+    """API 路径所属的资源，即 /v1/ 之后的第一段"""
+    segment = path[4:].split("/", 1)[0] if path.startswith("/v1/") else ""
+    return _RESOURCE_ALIASES.get(segment, segment)
+
+
+class _Entry:
+    """
+    缓存的成功响应，由 ``ResponseCache`` 的锁保护
+    """
+
+    __slots__ = (
+        "content", "etag", "last_modified", "expires", "stale_until", "refresh_at",
+        "refreshing", "resource", "size",
+    )
+
+    def __init__(
+        self,
+        content: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        resource: str,
+    ):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        # 软过期时间、硬过期时间和提前刷新的时间，由 ResponseCache._renew 设置
+        self.expires = 0.0
+        self.stale_until = 0.0
+        self.refresh_at: Optional[float] = None
+        # 是否有后台刷新正在进行
+        self.refreshing = False
+        self.resource = resource
+        self.size = len(content)
+
+
+class CacheLookup:
+    """
+    一次可缓存的 GET 请求的查找结果，由 ``ResponseCache.lookup`` 创建
+
+    ``fresh`` 为 True 时直接使用 ``entry`` 的响应体，``refresh`` 同时为 True 时还需要
+    在后台发送刷新请求，完成后调用 ``ResponseCache.refresh_done``；``fresh`` 为 False
+    时发送请求。发送的请求带上 ``headers`` 中的条件请求头，收到响应后交给
+    ``ResponseCache.complete``。
+    """
+
+    __slots__ = (
+        "key", "ttl", "entry", "fresh", "refresh", "headers", "generation", "resource",
+    )
+
+    def __init__(
+        self,
+        key: Hashable,
+        ttl: float,
+        entry: Optional[_Entry],
+        fresh: bool,
+        refresh: bool,
+        headers: Dict[str, str],
+        generation: int,
+        resource: str,
+    ):
+        self.key = key
+        self.ttl = ttl
+        self.entry = entry
+        self.fresh = fresh
+        self.refresh = refresh
+        self.headers = headers
+        self.generation = generation
+        self.resource = resource
+
+
+class ResponseCache:
+    """
+    按接口设置缓存时间的 GET 响应缓存，可以被多个线程和多个客户端共享
+
+    缓存的是响应体的原始字节，每次命中都重新解析，调用方修改返回值不影响缓存。
+    条目数和响应体总字节数超过上限时淘汰最久未使用的条目。缓存键包含完整 URL
+    （含查询参数）和 API 密钥，不同凭据的响应互不共享；写入请求使所有凭据下
+    相关资源的缓存失效。
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        max_entries: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+        invalidations: Optional[Mapping[str, Iterable[str]]] = None,
+        stale_while_revalidate: float = 0.0,
+        refresh_ahead: Optional[float] = None,
+    ):
+        """
+        初始化响应缓存
+
+        Args:
+            ttls: 缓存的接口及缓存秒数，键为 API 路径（例如 ``/v1/system/settings``），
+                可以使用 fnmatch 通配符；None 表示使用 ``CACHE_TTLS``；缓存秒数为 0
+                表示每次都向服务端重新验证
+            max_entries: 最多缓存的响应数
+            max_bytes: 缓存的响应体总字节数上限，单个响应超过上限时不缓存
+            invalidations: 写入某个资源时额外失效的资源，None 表示使用
+                ``CACHE_INVALIDATIONS``
+            stale_while_revalidate: 软过期后继续返回旧响应并在后台刷新的秒数，软过期
+                时间加上该秒数即为硬过期时间；0 表示过期后调用方等待请求完成
+            refresh_ahead: 提前刷新的位置，为缓存时间的比例，例如 0.8 表示缓存期的
+                最后 20% 内被读取的条目在后台刷新；None 表示不提前刷新
+
+        Raises:
+            ValueError: 当缓存秒数为负数、容量上限小于 1 或 ``refresh_ahead`` 不在
+                0 和 1 之间时
+        """
+        ttls = dict(CACHE_TTLS if ttls is None else ttls)
+        if any(ttl < 0 for ttl in ttls.values()):
+            raise ValueError("缓存秒数不能为负数")
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("max_entries 和 max_bytes 必须大于 0")
+        if stale_while_revalidate < 0:
+            raise ValueError("stale_while_revalidate 不能为负数")
+        if refresh_ahead is not None and not 0 < refresh_ahead < 1:
+            raise ValueError("refresh_ahead 必须在 0 和 1 之间")
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self.refresh_ahead = refresh_ahead
+        self.invalidations = {
+            resource: tuple(related)
+            for resource, related in (
+                CACHE_INVALIDATIONS if invalidations is None else invalidations
+            ).items()
+        }
+        self._exact = {
+            path: ttl for path, ttl in ttls.items() if not any(c in path for c in "*?[")
+        }
+        self._patterns = [(path, ttl) for path, ttl in ttls.items() if path not in self._exact]
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空缓存和计数"""
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # 每次失效加一，请求期间发生过失效的响应不写入缓存
+        self._generation = 0
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._not_modified = 0
+        self._stores = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._last_refresh_error: Optional[str] = None
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """
+        获取接口的缓存秒数
+
+        Args:
+            url: 完整 URL 或 API 路径
+
+        Returns:
+            缓存秒数，不缓存的接口返回 None
+        """
+        path = _api_path(url)
+        ttl = self._exact.get(path)
+        if ttl is None:
+            for pattern, pattern_ttl in self._patterns:
+                if fnmatch.fnmatchcase(path, pattern):
+                    return pattern_ttl
+        return ttl
+
+    def lookup(self, url: str, api_key: str) -> Optional[CacheLookup]:
+        """
+        查找 GET 请求的缓存
+
+        Args:
+            url: 完整 URL，包含查询参数
+            api_key: 请求使用的 API 密钥
+
+        Returns:
+            查找结果，不缓存的接口返回 None
+        """
+        ttl = self.ttl_for(url)
+        if ttl is None:
+            return None
+        key = (url, api_key)
+        now = time.monotonic()
+        headers: Dict[str, str] = {}
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and now < entry.stale_until
+            if entry is None:
+                self._misses += 1
+            elif fresh:
+                self._entries.move_to_end(key)
+                if now < entry.expires:
+                    self._hits += 1
+                    # 缓存期的最后一段时间内仍被读取，提前刷新
+                    due = entry.refresh_at is not None and now >= entry.refresh_at
+                else:
+                    self._stale_hits += 1
+                    due = True
+                if due and not entry.refreshing:
+                    entry.refreshing = refresh = True
+            if entry is not None and (refresh or not fresh):
+                if entry.etag is not None:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified is not None:
+                    headers["If-Modified-Since"] = entry.last_modified
+                if not fresh:
+                    if headers:
+                        self._revalidations += 1
+                    else:
+                        self._misses += 1
+            generation = self._generation
+        return CacheLookup(
+            key, ttl, entry, fresh, refresh, headers, generation, _resource(_api_path(url))
+        )
+
+    def _renew(self, entry: _Entry, ttl: float) -> None:
+        """从现在开始重新计算条目的有效期"""
+        now = time.monotonic()
+        entry.expires = now + ttl
+        entry.stale_until = entry.expires + self.stale_while_revalidate
+        entry.refresh_at = now + ttl * self.refresh_ahead if self.refresh_ahead else None
+
+    def complete(
+        self,
+        lookup: CacheLookup,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+    ) -> Optional[bytes]:
+        """
+        根据响应更新缓存
+
+        Args:
+            lookup: 发送请求前 ``lookup`` 返回的查找结果
+            status_code: HTTP 状态码
+            headers: 响应头
+            content: 解压后的响应体
+
+        Returns:
+            服务端返回 304 时为缓存的响应体，调用方用它代替空的响应体；
+            其他情况返回 None
+        """
+        entry = lookup.entry
+        if status_code == 304 and entry is not None:
+            with self._lock:
+                self._not_modified += 1
+                # 请求期间缓存没有失效时才延长有效期
+                if self._generation == lookup.generation and self._entries.get(lookup.key) is entry:
+                    self._renew(entry, lookup.ttl)
+                    self._entries.move_to_end(lookup.key)
+            return entry.content
+        if status_code != 200 or len(content) > self.max_bytes:
+            return None
+        if "no-store" in (headers.get("Cache-Control") or "").lower():
+            return None
+        entry = _Entry(content, headers.get("ETag"), headers.get("Last-Modified"), lookup.resource)
+        self._renew(entry, lookup.ttl)
+        with self._lock:
+            if self._generation != lookup.generation:
+                return None
+            previous = self._entries.pop(lookup.key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[lookup.key] = entry
+            self._bytes += entry.size
+            self._stores += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._evictions += 1
+        return None
+
+    def refresh_done(self, lookup: CacheLookup, error: Optional[BaseException] = None) -> None:
+        """
+        记录后台刷新的结果，之后的读取可以再次触发刷新
+
+        刷新失败时缓存保持不变，硬过期之前继续返回旧的响应。
+
+        Args:
+            lookup: 触发刷新的查找结果
+            error: 刷新失败时的异常，None 表示成功
+        """
+        with self._lock:
+            lookup.entry.refreshing = False
+            if error is None:
+                self._refreshes += 1
+            else:
+                self._refresh_failures += 1
+                self._last_refresh_error = f"{error.__class__.__name__}: {error}"
+
+    def invalidates(self, method: str, url: str) -> bool:
+        """
+        判断请求完成后是否需要使缓存失效
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL 或 API 路径
+
+        Returns:
+            写入请求返回 True，GET 请求以及对话、嵌入请求返回 False
+        """
+        return method != "GET" and endpoint_family(url) not in _READ_ONLY_FAMILIES
+
+    def invalidate(self, url: str) -> int:
+        """
+        使写入的资源及其关联资源的缓存失效
+
+        客户端在写入请求完成后（无论成功与否）自动调用，也可以在通过其他途径修改了
+        服务端数据后手动调用。
+
+        Args:
+            url: 写入请求的完整 URL 或 API 路径，例如 ``/v1/system/prompts/3``
+
+        Returns:
+            移除的缓存条目数
+        """
+        resource = _resource(_api_path(url))
+        resources = {resource, *self.invalidations.get(resource, ())}
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if entry.resource in resources]
+            for key in stale:
+                self._bytes -= self._entries.pop(key).size
+            self._invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        """清空缓存，计数保留"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁，清空缓存和计数"""
+        self._reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            包含以下键的字典：``hits``（缓存期内直接返回）、``stale_hits``（软过期后
+            返回旧响应）、``misses``（没有可用的缓存）、``revalidations``（调用方等待
+            条件请求）、``not_modified``（服务端返回 304）、``stores``、``evictions``
+            （因容量上限淘汰）、``invalidations``（因写入失效）、``refreshes`` 和
+            ``refresh_failures``（后台刷新成功和失败的次数）、``last_refresh_error``
+            （最近一次刷新失败的原因）、``entries``、``bytes`` 以及 ``hit_ratio``
+            （直接返回、返回旧响应和 304 占所有查找的比例）
+        """
+        with self._lock:
+            stats = {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "not_modified": self._not_modified,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "refreshes": self._refreshes,
+                "refresh_failures": self._refresh_failures,
+                "last_refresh_error": self._last_refresh_error,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["revalidations"]
+        served = stats["hits"] + stats["stale_hits"] + stats["not_modified"]
+        stats["hit_ratio"] = served / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,239 @@
+"""
+熔断器模块
+
+``CircuitBreaker`` 按端点族（见 ``endpoints.endpoint_family``）分别统计最近的调用
+结果。某个端点族的失败率或慢调用率超过阈值时熔断器打开，该端点族的请求直接抛出
+``CircuitOpenError`` 而不再等待超时；打开一段时间后进入半开状态，放行少量探测
+请求，探测全部成功则关闭，否则重新打开。其他端点族不受影响。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    """
+    单个端点族的熔断状态，由 ``CircuitBreaker`` 的锁保护
+    """
+
+    __slots__ = (
+        "state", "calls", "opened_at", "probes", "probe_successes",
+        "times_opened", "rejected",
+    )
+
+    def __init__(self, window: int):
+        self.state = CLOSED
+        # 最近调用的 (是否失败, 是否慢调用)
+        self.calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    按端点族统计的熔断器，可以被多个线程和多个客户端共享
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_duration: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        window: int = 20,
+        minimum_calls: int = 10,
+        open_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            failure_rate_threshold: 最近调用中失败的比例达到该值时打开
+            slow_call_duration: 耗时超过该秒数的调用记为慢调用，None 表示不统计
+            slow_call_rate_threshold: 最近调用中慢调用的比例达到该值时打开
+            window: 统计最近多少次调用
+            minimum_calls: 窗口内至少有这么多次调用才会打开
+            open_timeout: 打开后经过该秒数进入半开状态
+            half_open_max_calls: 半开状态下放行的探测请求数
+            overrides: 按端点族覆盖以上参数，例如 ``{"chat": {"slow_call_duration": 45}}``
+        """
+        self._defaults = {
+            "failure_rate_threshold": failure_rate_threshold,
+            "slow_call_duration": slow_call_duration,
+            "slow_call_rate_threshold": slow_call_rate_threshold,
+            "window": window,
+            "minimum_calls": minimum_calls,
+            "open_timeout": open_timeout,
+            "half_open_max_calls": half_open_max_calls,
+        }
+        self._overrides = overrides or {}
+        for family, options in self._overrides.items():
+            unknown = set(options) - set(self._defaults)
+            if unknown:
+                raise ValueError(f"端点族 {family} 的熔断参数无效: {', '.join(sorted(unknown))}")
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _config(self, family: str) -> Dict[str, Any]:
+        """获取端点族的熔断参数，调用方需持有锁"""
+        config = self._configs.get(family)
+        if config is None:
+            config = dict(self._defaults, **self._overrides.get(family, {}))
+            self._configs[family] = config
+        return config
+
+    def _circuit(self, family: str) -> _Circuit:
+        """获取端点族的熔断状态，调用方需持有锁"""
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            circuit = self._circuits[family] = _Circuit(self._config(family)["window"])
+        return circuit
+
+    def before_call(self, family: str) -> None:
+        """
+        请求发出前检查熔断状态
+
+        Args:
+            family: 端点族
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下探测请求数已满时
+        """
+        with self._lock:
+            circuit = self._circuit(family)
+            if circuit.state == CLOSED:
+                return
+            config = self._config(family)
+            now = time.monotonic()
+            if circuit.state == OPEN:
+                remaining = circuit.opened_at + config["open_timeout"] - now
+                if remaining > 0:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(family, remaining)
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+                circuit.probe_successes = 0
+            if circuit.probes >= config["half_open_max_calls"]:
+                circuit.rejected += 1
+                raise CircuitOpenError(family, None)
+            circuit.probes += 1
+
+    def record(self, family: str, failed: bool, duration: float) -> None:
+        """
+        记录一次调用结果
+
+        Args:
+            family: 端点族
+            failed: 调用是否失败（传输层错误或 5xx 响应）
+            duration: 调用耗时（秒）
+        """
+        with self._lock:
+            circuit = self._circuit(family)
+            config = self._config(family)
+            slow_after = config["slow_call_duration"]
+            slow = slow_after is not None and duration >= slow_after
+
+            if circuit.state == HALF_OPEN:
+                if failed or slow:
+                    self._open(circuit)
+                    return
+                circuit.probe_successes += 1
+                if circuit.probe_successes >= config["half_open_max_calls"]:
+                    circuit.state = CLOSED
+                    circuit.calls.clear()
+                return
+            if circuit.state == OPEN:
+                # 打开之前已经发出的请求，结果不再影响状态
+                return
+
+            circuit.calls.append((failed, slow))
+            count = len(circuit.calls)
+            if count < config["minimum_calls"]:
+                return
+            failures = sum(1 for f, _ in circuit.calls if f)
+            slow_calls = sum(1 for _, s in circuit.calls if s)
+            if (
+                failures / count >= config["failure_rate_threshold"]
+                or (slow_after is not None and slow_calls / count >= config["slow_call_rate_threshold"])
+            ):
+                self._open(circuit)
+
+    def release(self, family: str) -> None:
+        """
+        放弃一次已经通过 ``before_call`` 但没有结果的调用（例如请求被取消）
+
+        Args:
+            family: 端点族
+        """
+        with self._lock:
+            circuit = self._circuits.get(family)
+            if circuit is not None and circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    @staticmethod
+    def _open(circuit: _Circuit) -> None:
+        """打开熔断器，调用方需持有锁"""
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+        circuit.times_opened += 1
+        circuit.calls.clear()
+
+    def reset(self, family: Optional[str] = None) -> None:
+        """
+        手动关闭熔断器并清空统计
+
+        Args:
+            family: 端点族，None 表示所有端点族
+        """
+        with self._lock:
+            if family is None:
+                self._circuits = {}
+            else:
+                self._circuits.pop(family, None)
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁，熔断状态保持不变"""
+        self._lock = threading.Lock()
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的熔断状态
+
+        Returns:
+            以端点族为键的字典，包含状态、窗口内的调用数、失败数、慢调用数、
+            打开次数、被拒绝的请求数以及距离进入半开状态的剩余秒数
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = {}
+            for family, circuit in self._circuits.items():
+                config = self._config(family)
+                state = circuit.state
+                retry_in = None
+                if state == OPEN:
+                    retry_in = max(0.0, circuit.opened_at + config["open_timeout"] - now)
+                    if retry_in == 0:
+                        state = HALF_OPEN
+                states[family] = {
+                    "state": state,
+                    "calls": len(circuit.calls),
+                    "failures": sum(1 for f, _ in circuit.calls if f),
+                    "slow_calls": sum(1 for _, s in circuit.calls if s),
+                    "times_opened": circuit.times_opened,
+                    "rejected": circuit.rejected,
+                    "retry_in": retry_in,
+                }
+            return states
@@ -3,7 +3,7 @@ AnythingLLM 客户端主类
 """
 
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Union
 
 from .modules.auth import AuthModule
 from .modules.workspaces import WorkspacesModule
@@ -16,6 +16,27 @@ from .modules.admin import AdminModule
 from .modules.openai import OpenAIModule
 from .modules.workspace_thread import WorkspaceThreadModule
 from .http_client import HttpClient
+from .balancer import LoadBalancer
+from .cache import ResponseCache
+from .circuit_breaker import CircuitBreaker
+from .coalescing import RequestCoalescer
+from .codec import JsonCodec
+from .compression import CompressionPolicy
+from .concurrency import ConcurrencyLimiter
+from .hedging import HedgePolicy
+from .loader import BatchLoader
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .scheduler import RequestScheduler
+from .shared_limiter import SharedLimiter
+from .timeouts import Timeout
+from .transports import Transport
+
+# 可以通过 module_priorities 配置默认优先级的模块
+_MODULE_NAMES = (
+    "auth", "workspaces", "documents", "chat", "system", "users",
+    "embed", "admin", "openai", "workspace_thread",
+)
 
 
 class AnythingLLMClient:
@@ -23,23 +44,89 @@ class AnythingLLMClient:
     AnythingLLM API 客户端主类
 
     提供对 AnythingLLM API 的所有功能的访问。
+
+    各个模块只保存对 ``HttpClient`` 的引用，不保存状态，因此一个客户端实例可以在
+    多个线程之间共享。
     """
 
     def __init__(
         self,
-        base_url: str = "http://localhost:3001",
+        base_url: Union[str, Sequence[str]] = "http://localhost:3001",
         api_key: Optional[str] = None,
         timeout: int = 60,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        pool_idle_timeout: Optional[float] = None,
+        transport: Union[str, Transport] = "requests",
+        warmup: int = 0,
+        dns_ttl: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        shared_limiter: Optional[SharedLimiter] = None,
+        concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        module_priorities: Optional[Dict[str, str]] = None,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional[HedgePolicy] = None,
+        load_balancer: Optional[LoadBalancer] = None,
+        json_codec: Union[str, JsonCodec] = "auto",
+        compression: Optional[CompressionPolicy] = None,
+        coalescing: Optional[RequestCoalescer] = None,
+        cache: Optional[ResponseCache] = None,
     ):
         """
         初始化 AnythingLLM 客户端
 
         Args:
-            base_url: AnythingLLM API 的基础 URL
+            base_url: AnythingLLM API 的基础 URL，也可以是 unix:///path/to.sock 形式的 Unix 域套接字；
+                有多个实例时传入基础 URL 的列表，请求在这些实例之间负载均衡
             api_key: API 密钥，如果未提供，将尝试从环境变量 ANYTHINGLLM_API_KEY 获取
             timeout: 请求超时时间（秒）
+            pool_connections: 连接池缓存的主机数量
+            pool_maxsize: 每个主机最多保留的连接数
+            keep_alive: 是否复用连接
+            pool_idle_timeout: 连接空闲超过该秒数后回收，None 表示不回收
+            transport: 传输层名称（"requests"、"http.client" 或 "http2"）或传输层实例
+            warmup: 大于 0 时在后台预先建立该数量的连接并请求一次健康检查接口
+            dns_ttl: DNS 解析结果的缓存时间（秒），None 表示不缓存
+            retry: 重试策略，None 表示使用默认的 ``RetryPolicy()``，
+                ``RetryPolicy(total=0)`` 表示不重试
+            circuit_breaker: 按端点族统计的熔断器，None 表示不熔断，
+                状态可以通过 ``http_client.circuit_states()`` 查看
+            rate_limiter: 按端点族限流的令牌桶，None 表示不限流，
+                状态可以通过 ``http_client.rate_limit_states()`` 查看
+            shared_limiter: 同一主机上多个进程共享的速率和在途请求数预算，None 表示
+                不共享，所有指向同一个 ``base_url`` 的客户端共用一份预算
+            concurrency_limiter: 按端点族根据延迟自适应调整在途请求上限，None 表示
+                不限制，状态可以通过 ``http_client.concurrency_states()`` 查看
+            scheduler: 按优先级通道（``interactive``、``default``、``bulk``）分配在途名额
+                的请求调度器，None 表示不调度
+            module_priorities: 各模块请求的默认优先级，例如
+                ``{"chat": "interactive", "documents": "bulk"}``，可以被
+                ``with_options(priority=...)`` 和单次调用的 ``priority`` 参数覆盖
+            timeouts: 按端点族区分的连接、读取和总超时，例如 ``TIMEOUT_PROFILES``，
+                未配置的端点族使用 ``default`` 键或 ``timeout``
+            hedging: GET 请求的对冲策略，None 表示不对冲，统计可以通过
+                ``http_client.hedge_states()`` 查看
+            load_balancer: 多实例负载均衡器，``base_url`` 为列表且未指定时使用默认的
+                ``LoadBalancer()``，状态可以通过 ``http_client.balancer_states()`` 查看
+            json_codec: 编码请求体和解析响应的 JSON 编解码器，"auto" 在安装了 orjson
+                时使用 orjson，也可以指定 "json"、"orjson" 或 ``JsonCodec`` 实例
+            compression: 压缩策略，None 表示接受压缩的响应、不压缩请求体；
+                ``CompressionPolicy(request_threshold=64 * 1024)`` 压缩较大的 JSON 请求体，
+                字节数可以通过 ``http_client.compression_stats()`` 查看
+            coalescing: 合并同时进行的相同 GET 请求，None 表示不合并，统计可以通过
+                ``http_client.coalescing_states()`` 查看
+            cache: GET 响应缓存，None 表示不缓存；``ResponseCache()`` 缓存系统设置、模型
+                列表、提示词和工作区列表等变化较慢的接口，通过本客户端写入后相关缓存自动
+                失效，统计可以通过 ``http_client.cache_stats()`` 查看
         """
-        self.base_url = base_url.rstrip("/")
+        if isinstance(base_url, str):
+            self.base_url = base_url.rstrip("/")
+        else:
+            self.base_url = [url.rstrip("/") for url in base_url]
         self.api_key = api_key or os.environ.get("ANYTHINGLLM_API_KEY")
 
         if not self.api_key:
@@ -47,23 +134,121 @@ class AnythingLLMClient:
                 "API 密钥必须提供，可以通过参数传递或设置环境变量 ANYTHINGLLM_API_KEY"
             )
 
+        self._module_priorities = dict(module_priorities or {})
+        unknown = set(self._module_priorities) - set(_MODULE_NAMES)
+        if unknown:
+            raise ValueError(f"未知的模块: {', '.join(sorted(unknown))}")
+
         self.http_client = HttpClient(
             base_url=self.base_url,
             api_key=self.api_key,
-            timeout=timeout
+            timeout=timeout,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            pool_idle_timeout=pool_idle_timeout,
+            transport=transport,
+            dns_ttl=dns_ttl,
+            retry=retry,
+            circuit_breaker=circuit_breaker,
+            rate_limiter=rate_limiter,
+            shared_limiter=shared_limiter,
+            concurrency_limiter=concurrency_limiter,
+            scheduler=scheduler,
+            timeouts=timeouts,
+            hedging=hedging,
+            load_balancer=load_balancer,
+            json_codec=json_codec,
+            compression=compression,
+            coalescing=coalescing,
+            cache=cache,
         )
 
-        # 初始化各个模块
-        self.auth = AuthModule(self.http_client)
-        self.workspaces = WorkspacesModule(self.http_client)
-        self.documents = DocumentsModule(self.http_client)
-        self.chat = ChatModule(self.http_client)
-        self.system = SystemModule(self.http_client)
-        self.users = UsersModule(self.http_client)
-        self.embed = EmbedModule(self.http_client)
-        self.admin = AdminModule(self.http_client)
-        self.openai = OpenAIModule(self.http_client)
-        self.workspace_thread = WorkspaceThreadModule(self.http_client)
+        self._init_modules(self.http_client)
+
+        if warmup > 0:
+            self.http_client.warmup(warmup, background=True)
+
+    def _init_modules(self, http_client: Any) -> None:
+        """
+        初始化各个模块
+
+        Args:
+            http_client: 模块使用的 HTTP 客户端
+        """
+        self.http_client = http_client
+        self.auth = AuthModule(self._module_client(http_client, "auth"))
+        self.workspaces = WorkspacesModule(self._module_client(http_client, "workspaces"))
+        self.documents = DocumentsModule(self._module_client(http_client, "documents"))
+        self.chat = ChatModule(self._module_client(http_client, "chat"))
+        self.system = SystemModule(self._module_client(http_client, "system"))
+        self.users = UsersModule(self._module_client(http_client, "users"))
+        self.embed = EmbedModule(self._module_client(http_client, "embed"))
+        self.admin = AdminModule(self._module_client(http_client, "admin"))
+        self.openai = OpenAIModule(self._module_client(http_client, "openai"))
+        self.workspace_thread = WorkspaceThreadModule(
+            self._module_client(http_client, "workspace_thread")
+        )
+
+    def _module_client(self, http_client: Any, name: str) -> Any:
+        """
+        获取模块使用的 HTTP 客户端，配置了模块优先级时绑定为默认的 ``priority``
+
+        Args:
+            http_client: 客户端使用的 HTTP 客户端
+            name: 模块属性名
+
+        Returns:
+            模块使用的 HTTP 客户端
+        """
+        priority = self._module_priorities.get(name)
+        if priority is None:
+            return http_client
+        return http_client.with_defaults(priority=priority)
+
+    def with_options(self, **options: Any) -> "AnythingLLMClient":
+        """
+        返回绑定了默认调用参数的客户端，与当前客户端共享连接池和配置
+
+        例如 ``client.with_options(retry=RetryPolicy(total=0)).chat.send_message(...)``
+        只对这一次调用关闭重试。
+
+        Args:
+            **options: 每次请求的默认参数，例如 ``retry``
+
+        Returns:
+            新的客户端对象，关闭它会同时关闭当前客户端的连接池
+        """
+        clone = object.__new__(AnythingLLMClient)
+        clone.base_url = self.base_url
+        clone.api_key = self.api_key
+        clone._module_priorities = self._module_priorities
+        clone._init_modules(self.http_client.with_options(**options))
+        return clone
+
+    def batch_loader(
+        self,
+        window: float = 0.002,
+        bulk_threshold: int = 10,
+        documents_item_path: Optional[str] = None,
+    ) -> BatchLoader:
+        """
+        创建批量加载器，按 ID 获取文档、工作区和用户时合并为列表请求
+
+        加载器就是缓存的作用域，通常为每个业务请求创建一个，例如
+        ``with client.batch_loader() as loader: loader.documents.get_many(ids)``。
+
+        Args:
+            window: 单个 ``get`` 等待其他线程加入批次的秒数，0 表示不等待
+            bulk_threshold: 批次中的 ID 数（加上本作用域中逐个获取的次数）达到该值时
+                改用列表请求
+            documents_item_path: 文档数组在 ``documents.list()`` 响应中的键路径，
+                None 表示第一个数组
+
+        Returns:
+            批量加载器
+        """
+        return BatchLoader(self, window, bulk_threshold, documents_item_path)
 
     def get_api_status(self) -> Dict[str, Any]:
         """
@@ -73,3 +258,13 @@ class AnythingLLMClient:
             包含 API 服务器状态信息的字典
         """
         return self.http_client.get("/v1/system/health")
+
+    def close(self) -> None:
+        """关闭客户端并释放所有连接"""
+        self.http_client.close()
+
+    def __enter__(self) -> "AnythingLLMClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
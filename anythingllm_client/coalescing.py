@@ -0,0 +1,265 @@
+"""
+请求合并模块
+
+缓存过期时，多个线程或协程往往同时请求同一个读取接口（例如列出工作区、获取
+模型列表）。启用 ``RequestCoalescer`` 后，路径、查询参数和凭据都相同的 GET 请求
+在第一个请求返回之前只发送一次，后来的请求等待并共享它的结果或异常。请求完成后
+立即移除，不缓存结果：之后的请求重新发送。
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from .exceptions import DeadlineExceededError
+from .timeouts import remaining
+
+
+class _Family:
+    """
+    单个端点族的合并计数，由 ``RequestCoalescer`` 的锁保护
+    """
+
+    __slots__ = ("requests", "calls", "coalesced")
+
+    def __init__(self):
+        self.requests = 0
+        self.calls = 0
+        self.coalesced = 0
+
+
+class _Call:
+    """
+    正在进行的同步请求，完成后 ``done`` 被设置
+    """
+
+    __slots__ = ("done", "result", "error", "joined")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # 加入等待的调用方数量
+        self.joined = 0
+
+
+class _AsyncCall:
+    """
+    正在进行的异步请求，在独立的任务中执行，所有等待者都取消时任务也被取消
+    """
+
+    __slots__ = ("task", "waiters", "joined")
+
+    def __init__(self):
+        self.task: Optional["asyncio.Task[Any]"] = None
+        # 仍在等待的调用方数量（包括发起请求的调用方）
+        self.waiters = 1
+        # 加入等待的调用方数量
+        self.joined = 0
+
+
+class RequestCoalescer:
+    """
+    合并同时进行的相同 GET 请求，可以被多个线程和多个客户端共享
+
+    有其他调用方加入等待时，默认每个调用方都得到结果的深拷贝，修改返回值不会互相
+    影响；没有等待者的请求不复制。
+    """
+
+    def __init__(
+        self,
+        share_results: bool = False,
+        families: Optional[Iterable[str]] = None,
+    ):
+        """
+        初始化请求合并器
+
+        Args:
+            share_results: 等待者是否直接共享同一个结果对象；确定调用方不会修改返回值时
+                设置为 True，可以省去深拷贝的开销
+            families: 启用合并的端点族，None 表示所有端点族
+        """
+        self.share_results = share_results
+        self.families = frozenset(families) if families is not None else None
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, _AsyncCall] = {}
+        self._families: Dict[str, _Family] = {}
+
+    def _family(self, family: str) -> _Family:
+        """获取端点族的计数，调用方需持有锁"""
+        state = self._families.get(family)
+        if state is None:
+            state = self._families[family] = _Family()
+        return state
+
+    def applies(self, family: str) -> bool:
+        """
+        判断端点族是否启用了合并
+
+        Args:
+            family: 端点族
+
+        Returns:
+            启用了合并时返回 True
+        """
+        return self.families is None or family in self.families
+
+    def _result(self, result: Any) -> Any:
+        """有等待者时调用方得到的结果"""
+        return result if self.share_results else copy.deepcopy(result)
+
+    def do(self, key: Hashable, family: str, call: Callable[[], Any]) -> Any:
+        """
+        执行请求，相同的请求正在进行时等待它的结果
+
+        等待时间受 ``deadline`` 的剩余预算限制。
+
+        Args:
+            key: 请求的标识，由方法、URL 和凭据组成
+            family: 端点族，用于统计
+            call: 实际发送请求的函数
+
+        Returns:
+            请求的结果
+
+        Raises:
+            DeadlineExceededError: 等待时时间预算用完时
+        """
+        with self._lock:
+            state = self._family(family)
+            state.requests += 1
+            pending = self._calls.get(key)
+            if pending is None:
+                pending = self._calls[key] = _Call()
+                state.calls += 1
+                leader = True
+            else:
+                pending.joined += 1
+                state.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                pending.result = call()
+            except BaseException as e:
+                pending.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is pending:
+                        del self._calls[key]
+                pending.done.set()
+            # 请求已经移除，之后不会再有调用方加入等待，没有等待者时不需要复制
+            return self._result(pending.result) if pending.joined else pending.result
+
+        timeout = remaining()
+        if not pending.done.wait(None if timeout is None else max(timeout, 0)):
+            raise DeadlineExceededError(family)
+        if pending.error is not None:
+            raise pending.error
+        return self._result(pending.result)
+
+    async def do_async(
+        self, key: Hashable, family: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        ``do`` 的异步版本，等待时不阻塞事件循环
+
+        请求在独立的任务中执行，某个等待者被取消不影响其他等待者；所有等待者都被
+        取消时请求也被取消。
+
+        Args:
+            key: 请求的标识，由方法、URL 和凭据组成
+            family: 端点族，用于统计
+            call: 实际发送请求的协程函数
+
+        Returns:
+            请求的结果
+
+        Raises:
+            DeadlineExceededError: 等待时时间预算用完时
+        """
+        # 任务属于事件循环，不同事件循环中的相同请求分别发送
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            state = self._family(family)
+            state.requests += 1
+            pending = self._async_calls.get(key)
+            if pending is None:
+                pending = self._async_calls[key] = _AsyncCall()
+                pending.task = asyncio.ensure_future(self._run(key, pending, call))
+                # 任务在开始执行前被取消时 _run 不会执行
+                pending.task.add_done_callback(lambda _: self._forget(key, pending))
+                state.calls += 1
+                leader = True
+            else:
+                pending.waiters += 1
+                pending.joined += 1
+                state.coalesced += 1
+                leader = False
+
+        task = pending.task
+        try:
+            if leader:
+                result = await asyncio.shield(task)
+                return self._result(result) if pending.joined else result
+            timeout = remaining()
+            try:
+                await asyncio.wait_for(
+                    asyncio.shield(task), None if timeout is None else max(timeout, 0)
+                )
+            except asyncio.TimeoutError:
+                if not task.done():
+                    raise DeadlineExceededError(family) from None
+            return self._result(task.result())
+        finally:
+            pending.waiters -= 1
+            if pending.waiters == 0 and not task.done():
+                task.cancel()
+
+    async def _run(
+        self, key: Hashable, pending: _AsyncCall, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """执行异步请求，完成时立即移除，之后的相同请求重新发送"""
+        try:
+            return await call()
+        finally:
+            self._forget(key, pending)
+
+    def _forget(self, key: Hashable, pending: Any) -> None:
+        """移除已经完成的请求"""
+        with self._lock:
+            if self._async_calls.get(key) is pending:
+                del self._async_calls[key]
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁，丢弃父进程中正在进行的请求，计数清零"""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._families = {}
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的合并统计
+
+        Returns:
+            以端点族为键的字典，包含请求数、实际发送的请求数、被合并的请求数以及
+            合并率（被合并的请求占请求数的比例）
+        """
+        with self._lock:
+            families = {
+                family: (state.requests, state.calls, state.coalesced)
+                for family, state in self._families.items()
+            }
+        return {
+            family: {
+                "requests": requests,
+                "calls": calls,
+                "coalesced": coalesced,
+                "coalescing_ratio": coalesced / requests if requests else 0.0,
+            }
+            for family, (requests, calls, coalesced) in families.items()
+        }
@@ -0,0 +1,467 @@
+"""
+JSON 编解码模块
+
+客户端用同一个编解码器编码请求体、解析响应体。响应直接从字节解析，不先解码为
+字符串，大型响应（例如文档列表和聊天历史）只经过一次解码和解析。
+
+- ``JsonCodec``: 标准库 ``json``
+- ``OrjsonCodec``: 基于 orjson，解析和编码都明显快于标准库，需要安装
+  ``anythingllm_client[fast]``
+
+``create_codec("auto")`` 在安装了 orjson 时使用 ``OrjsonCodec``，否则使用标准库。
+自定义编解码器需要继承 ``JsonCodec`` 并实现 ``loads`` 和 ``dumps``。
+
+``JsonStream`` 是分块编码的 JSON 请求体：顶层对象中的列表和迭代器逐批编码，
+以分块传输（chunked）发送，适合十万条文本的批量嵌入这类请求，内存占用不随
+条目数增长。
+
+``JsonItemParser`` 是响应方向的增量解析器：逐块喂入响应体，逐个返回其中 JSON
+数组的元素，不需要先收到完整的响应体。
+"""
+
+import codecs
+import json
+import re
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Type, Union
+
+
+class JsonCodec:
+    """
+    基于标准库 json 的编解码器，也是自定义编解码器的基类
+    """
+
+    name = "json"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        解析 JSON
+
+        Args:
+            data: UTF-8 编码的字节或字符串
+
+        Returns:
+            解析后的数据
+
+        Raises:
+            ValueError: 内容不是合法的 JSON 时
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        把数据编码为 JSON
+
+        Args:
+            obj: 要编码的数据
+
+        Returns:
+            UTF-8 编码的 JSON
+        """
+        return json.dumps(obj).encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    基于 orjson 的编解码器
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        """
+        初始化 orjson 编解码器
+
+        Raises:
+            ImportError: 未安装 orjson 时
+        """
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError(
+                "orjson 编解码器需要 orjson，请运行 pip install anythingllm_client[fast]"
+            ) from e
+        self._orjson = orjson
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj, option=self._orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson 不支持的值（例如超出 64 位的整数）交给标准库处理
+            return json.dumps(obj).encode("utf-8")
+
+
+CODECS: Dict[str, Type[JsonCodec]] = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def create_codec(codec: Union[str, JsonCodec] = "auto") -> JsonCodec:
+    """
+    根据名称创建编解码器
+
+    Args:
+        codec: 编解码器名称（"auto"、"json" 或 "orjson"）或已创建的编解码器实例；
+            "auto" 在安装了 orjson 时使用 orjson，否则使用标准库
+
+    Returns:
+        编解码器实例
+
+    Raises:
+        ValueError: 编解码器名称未知时
+        ImportError: 指定了 "orjson" 但未安装 orjson 时
+    """
+    if isinstance(codec, JsonCodec):
+        return codec
+    if codec == "auto":
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            return JsonCodec()
+    try:
+        codec_class = CODECS[codec]
+    except KeyError:
+        raise ValueError(
+            f"未知的 JSON 编解码器: {codec}，可选值: auto, {', '.join(CODECS)}"
+        ) from None
+    return codec_class()
+
+
+def _is_streamed(value: Any) -> bool:
+    """判断值是否逐项编码：字符串、字节和字典以外的可迭代对象"""
+    return isinstance(value, Iterable) and not isinstance(value, (str, bytes, bytearray, Mapping))
+
+
+class JsonStream:
+    """
+    分块编码的 JSON 请求体
+
+    顶层对象中的列表、元组和迭代器每 ``batch_size`` 项编码一次，编码结果攒够
+    ``chunk_size`` 字节后交给传输层发送，其余的值整体编码。传给客户端的
+    ``post(json_data=...)`` 后以分块传输发送。
+
+    值中有只能遍历一次的迭代器（例如生成器）时，请求体只能发送一次：开始发送
+    之后的失败不会重试。
+    """
+
+    def __init__(
+        self,
+        obj: Mapping[str, Any],
+        chunk_size: int = 64 * 1024,
+        batch_size: int = 1000,
+    ):
+        """
+        初始化请求体
+
+        Args:
+            obj: 请求体对象
+            chunk_size: 每次发送的字节数下限（最后一块除外）
+            batch_size: 每次编码的列表项数
+        """
+        self.obj = obj
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._streamed = {key for key, value in obj.items() if _is_streamed(value)}
+        # 迭代器的 iter() 返回它自己，只能遍历一次
+        self.replayable = all(iter(obj[key]) is not obj[key] for key in self._streamed)
+        self.consumed = False
+
+    def encode(self, codec: JsonCodec) -> Iterator[bytes]:
+        """
+        逐块编码请求体
+
+        Args:
+            codec: 编码使用的编解码器
+
+        Returns:
+            编码后的数据块
+
+        Raises:
+            ValueError: 只能遍历一次的请求体已经发送过时
+        """
+        if self.consumed and not self.replayable:
+            raise ValueError("请求体来自只能遍历一次的迭代器，无法重新发送")
+        return self._encode(codec)
+
+    def _encode(self, codec: JsonCodec) -> Iterator[bytes]:
+        """逐块编码请求体，开始读取时标记为已发送"""
+        self.consumed = True
+        buffer = bytearray(b"{")
+        for index, (key, value) in enumerate(self.obj.items()):
+            if index:
+                buffer += b","
+            buffer += codec.dumps(key)
+            buffer += b":"
+            if key not in self._streamed:
+                buffer += codec.dumps(value)
+                continue
+            buffer += b"["
+            items = iter(value)
+            first = True
+            while True:
+                batch: List[Any] = list(islice(items, self.batch_size))
+                if not batch:
+                    break
+                if not first:
+                    buffer += b","
+                first = False
+                # 整批编码为数组后去掉首尾的方括号
+                buffer += codec.dumps(batch)[1:-1]
+                if len(buffer) >= self.chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+            buffer += b"]"
+        buffer += b"}"
+        yield bytes(buffer)
+
+
+def stream_iterators(obj: Dict[str, Any]) -> Union[Dict[str, Any], JsonStream]:
+    """
+    值中有迭代器时把请求体包装为 ``JsonStream``
+
+    模块方法接受列表或迭代器作为批量参数：列表按普通请求体发送，迭代器（例如
+    逐行读取文件的生成器）分块编码发送。
+
+    Args:
+        obj: 请求体对象
+
+    Returns:
+        没有迭代器时原样返回，否则返回 ``JsonStream``
+    """
+    for value in obj.values():
+        if _is_streamed(value) and not isinstance(value, (list, tuple)):
+            return JsonStream(obj)
+    return obj
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# 一个值之后可能出现的字符
+_DELIMITERS = " \t\n\r,:]}"
+# 标准库 json 的 C 扫描器：从指定位置解析一个值（或字符串），返回它和结束位置；
+# 位置上没有值时 scan_once 抛出 StopIteration
+_scan_value = json.JSONDecoder().scan_once
+_scan_string = json.decoder.scanstring
+# 栈中表示数组的元素，对象则记录当前的键
+_ARRAY = object()
+# 解析状态：等待值、等待键、值之后、目标数组中等待元素、元素之后、结束
+_VALUE, _KEY, _AFTER, _ITEM, _ITEM_AFTER, _DONE = range(6)
+
+
+class JsonItemParser:
+    """
+    JSON 数组元素的增量解析器
+
+    逐块喂入 JSON 文本，每当目标数组的一个元素接收完整时就解析并返回，缓冲区中
+    只保留尚未接收完整的元素，因此内存占用取决于单个元素的大小，而不是整个响应。
+
+    元素由标准库 json 的 C 扫描器解析，一次扫描同时确定元素的结束位置并得到
+    解析结果，不使用客户端的 JSON 编解码器。
+
+    ``item_path`` 是用点号分隔的键路径，``*`` 匹配数组中的每个元素，例如
+    ``"localFiles.items.*.items"``；None 表示按出现顺序的第一个数组，响应本身是
+    数组时就是它本身。路径以外的值完整接收后跳过。
+    """
+
+    def __init__(self, item_path: Optional[str] = None):
+        """
+        初始化解析器
+
+        Args:
+            item_path: 目标数组的键路径，None 表示第一个数组
+        """
+        self.item_path = item_path
+        self._path = None if item_path is None else item_path.split(".")
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._pending: List[str] = []
+        self._pending_size = 0
+        # 没有接收完整的值至少等缓冲区增长一倍再重新解析，避免对大值反复解析
+        self._retry_at = 0
+        self._stack: List[Any] = []
+        self._state = _VALUE
+
+    def feed(self, data: bytes) -> List[Any]:
+        """
+        喂入一块 JSON 文本
+
+        Args:
+            data: 响应体的下一块数据
+
+        Returns:
+            这一块数据中接收完整的元素，可能为空
+
+        Raises:
+            ValueError: 内容不是合法的 JSON 时
+        """
+        if self._state == _DONE:
+            return []
+        text = self._decoder.decode(data)
+        if text:
+            self._pending.append(text)
+            self._pending_size += len(text)
+        if len(self._text) + self._pending_size < self._retry_at:
+            return []
+        return self._parse(False)
+
+    def close(self) -> List[Any]:
+        """
+        结束解析，返回剩余的元素并检查 JSON 文本是否完整
+
+        Returns:
+            尚未返回的元素
+
+        Raises:
+            ValueError: 内容不是合法的 JSON，或者目标数组、外层对象没有结束时
+        """
+        if self._state == _DONE:
+            return []
+        text = self._decoder.decode(b"", final=True)
+        if text:
+            self._pending.append(text)
+        items = self._parse(True)
+        if self._state != _DONE and (self._stack or self._text.strip()):
+            raise ValueError("JSON 文本不完整")
+        return items
+
+    def _prefix_matches(self) -> bool:
+        """判断当前位置是否仍在目标路径上"""
+        path = self._path
+        if path is None:
+            return True
+        stack = self._stack
+        if len(stack) > len(path):
+            return False
+        for frame, key in zip(stack, path):
+            if (key != "*") if frame is _ARRAY else (frame != key):
+                return False
+        return True
+
+    def _enters(self, char: str) -> Optional[bool]:
+        """
+        判断即将开始的对象或数组是否需要进入
+
+        Returns:
+            True 表示是目标数组，False 表示进入后继续查找，None 表示整体跳过
+        """
+        path = self._path
+        if path is None:
+            return char == "["
+        if not self._prefix_matches():
+            return None
+        depth = len(self._stack)
+        if depth == len(path):
+            return True if char == "[" else None
+        if (path[depth] == "*") != (char == "["):
+            return None
+        return False
+
+    @staticmethod
+    def _scan(scan: Any, text: str, pos: int, final: bool) -> Optional[Tuple[Any, int]]:
+        """解析一个值，数据可能还没有接收完整时返回 None"""
+        try:
+            value, end = scan(text, pos)
+        except (ValueError, StopIteration) as e:
+            if final:
+                raise ValueError(f"无法解析 JSON 值，位置 {pos}") from e
+            return None
+        # 值之后还没有出现分隔符时，数字可能还有后续的位数，例如 "0." 只解析出 0
+        if not final and (end == len(text) or text[end] not in _DELIMITERS):
+            return None
+        return value, end
+
+    def _parse(self, final: bool) -> List[Any]:
+        """解析缓冲区中的文本，返回接收完整的元素"""
+        text = self._text
+        if self._pending:
+            text += "".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+        items: List[Any] = []
+        stack = self._stack
+        state = self._state
+        pos = 0
+        # 停在没有接收完整的值上
+        partial = False
+        while state != _DONE:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos == len(text):
+                break
+            char = text[pos]
+            if state == _ITEM:
+                if char == "]":
+                    stack.pop()
+                    pos += 1
+                    state = _DONE if self._path is None or not stack else _AFTER
+                    continue
+                scanned = self._scan(_scan_value, text, pos, final)
+                if scanned is None:
+                    partial = True
+                    break
+                items.append(scanned[0])
+                pos = scanned[1]
+                state = _ITEM_AFTER
+            elif state == _ITEM_AFTER:
+                if char == ",":
+                    state = _ITEM
+                elif char == "]":
+                    stack.pop()
+                    state = _DONE if self._path is None or not stack else _AFTER
+                else:
+                    raise ValueError(f"JSON 数组元素之后应为 , 或 ]，位置 {pos}")
+                pos += 1
+            elif state == _VALUE:
+                entered = self._enters(char) if char in "[{" else None
+                if entered is not None:
+                    stack.append(_ARRAY if char == "[" else None)
+                    state = _ITEM if entered else (_VALUE if char == "[" else _KEY)
+                    pos += 1
+                elif char == "]" and stack and stack[-1] is _ARRAY:
+                    # 进入的数组为空
+                    stack.pop()
+                    pos += 1
+                    state = _AFTER if stack else _DONE
+                else:
+                    scanned = self._scan(_scan_value, text, pos, final)
+                    if scanned is None:
+                        partial = True
+                        break
+                    pos = scanned[1]
+                    state = _AFTER if stack else _DONE
+            elif state == _KEY:
+                if char == "}":
+                    stack.pop()
+                    pos += 1
+                    state = _AFTER if stack else _DONE
+                    continue
+                if char != '"':
+                    raise ValueError(f"JSON 对象的键应为字符串，位置 {pos}")
+                scanned = self._scan(_scan_string, text, pos + 1, final)
+                if scanned is None:
+                    partial = True
+                    break
+                end = _WHITESPACE.match(text, scanned[1]).end()
+                if end == len(text):
+                    break
+                if text[end] != ":":
+                    raise ValueError(f"JSON 对象的键之后应为 :，位置 {end}")
+                stack[-1] = scanned[0]
+                pos = end + 1
+                state = _VALUE
+            else:
+                if char == ",":
+                    state = _VALUE if stack[-1] is _ARRAY else _KEY
+                elif char == "]" if stack[-1] is _ARRAY else char == "}":
+                    stack.pop()
+                    if not stack:
+                        state = _DONE
+                else:
+                    raise ValueError(f"JSON 值之后应为分隔符或括号，位置 {pos}")
+                pos += 1
+        self._state = state
+        self._text = text[pos:] if state != _DONE else ""
+        self._retry_at = 2 * len(self._text) if partial else 0
+        return items
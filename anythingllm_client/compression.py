@@ -0,0 +1,332 @@
+"""
+压缩模块
+
+嵌入接口的批量请求和带有向量、来源片段的响应体积很大，压缩可以显著减少传输的
+字节数：
+
+- 响应：通过 ``Accept-Encoding`` 协商 gzip、deflate 以及 brotli（需要安装
+  ``anythingllm_client[brotli]``），传输层边读取边解压，不保留完整的压缩数据
+- 请求：``CompressionPolicy(request_threshold=...)`` 把超过阈值的 JSON 请求体用
+  gzip 压缩后发送（``Content-Encoding: gzip``），AnythingLLM 的 Express 服务端
+  默认接受压缩的请求体
+
+压缩前后的字节数记录在 ``CompressionStats`` 中，通过 ``http_client.compression_stats()``
+查看。
+"""
+
+import gzip
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# 流式解压时每次读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+
+def _brotli_module() -> Optional[Any]:
+    """导入 brotli 或 brotlicffi，都未安装时返回 None"""
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+
+_brotli = _brotli_module()
+# 解压失败时抛出的异常
+_DECODE_ERRORS = (zlib.error,)
+if _brotli is not None:
+    _DECODE_ERRORS += (getattr(_brotli, "error", Exception),)
+
+
+def brotli_available() -> bool:
+    """
+    检查是否可以解压 brotli 响应
+
+    Returns:
+        是否安装了 brotli 或 brotlicffi
+    """
+    return _brotli is not None
+
+
+def accept_encoding() -> str:
+    """
+    获取客户端可以解压的编码，作为 ``Accept-Encoding`` 请求头的值
+
+    Returns:
+        安装了 brotli 时为 ``gzip, deflate, br``，否则为 ``gzip, deflate``
+    """
+    if brotli_available():
+        return "gzip, deflate, br"
+    return "gzip, deflate"
+
+
+class CompressionPolicy:
+    """
+    请求和响应的压缩策略
+    """
+
+    def __init__(
+        self,
+        accept: bool = True,
+        request_threshold: Optional[int] = None,
+        level: int = 6,
+    ):
+        """
+        初始化压缩策略
+
+        Args:
+            accept: 是否通过 ``Accept-Encoding`` 接受压缩的响应
+            request_threshold: JSON 请求体达到该字节数时用 gzip 压缩，None 表示不压缩
+            level: gzip 压缩级别，1 最快，9 压缩率最高
+        """
+        if request_threshold is not None and request_threshold < 0:
+            raise ValueError("request_threshold 不能小于 0")
+        if not 1 <= level <= 9:
+            raise ValueError("level 必须在 1 到 9 之间")
+        self.accept = accept
+        self.request_threshold = request_threshold
+        self.level = level
+
+    def accept_encoding(self) -> str:
+        """
+        获取 ``Accept-Encoding`` 请求头的值
+
+        Returns:
+            接受压缩时为可以解压的编码列表，否则为 ``identity``
+        """
+        return accept_encoding() if self.accept else "identity"
+
+    def compress(self, body: bytes) -> Optional[bytes]:
+        """
+        按阈值压缩请求体
+
+        Args:
+            body: 已编码的 JSON 请求体
+
+        Returns:
+            gzip 压缩后的请求体，未达到阈值或未启用请求压缩时返回 None
+        """
+        if self.request_threshold is None or len(body) < self.request_threshold:
+            return None
+        return gzip.compress(body, compresslevel=self.level, mtime=0)
+
+
+def _decompress_bounded(obj: Any, data: bytes) -> Iterator[bytes]:
+    """用 zlib 解压对象分段解压，每段最多 CHUNK_SIZE 字节"""
+    while data:
+        chunk = obj.decompress(data, CHUNK_SIZE)
+        data = obj.unconsumed_tail
+        if chunk:
+            yield chunk
+
+
+class _DeflateDecoder:
+    """
+    deflate 解压器
+
+    ``Content-Encoding: deflate`` 按规范是 zlib 格式，但有的服务端发送不带头部的
+    原始 deflate 数据，第一块解压失败时改用原始格式。
+    """
+
+    def __init__(self):
+        self._first = True
+        self._data = b""
+        self._obj = zlib.decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        if not self._first:
+            return self._obj.decompress(data)
+        self._data += data
+        try:
+            decompressed = self._obj.decompress(data)
+            if decompressed:
+                self._first = False
+                self._data = b""
+            return decompressed
+        except zlib.error:
+            self._first = False
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            try:
+                return self.decompress(self._data)
+            finally:
+                self._data = b""
+
+    def iter_decompress(self, data: bytes) -> Iterator[bytes]:
+        if self._first:
+            chunk = self.decompress(data)
+            if chunk:
+                yield chunk
+            return
+        yield from _decompress_bounded(self._obj, data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _GzipDecoder:
+    """gzip 解压器"""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+
+    def iter_decompress(self, data: bytes) -> Iterator[bytes]:
+        return _decompress_bounded(self._obj, data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    """brotli 解压器"""
+
+    def __init__(self, brotli: Any):
+        self._obj = brotli.Decompressor()
+        # brotli 使用 process，brotlicffi 使用 decompress
+        self.decompress = getattr(self._obj, "process", None) or self._obj.decompress
+
+    def iter_decompress(self, data: bytes) -> Iterator[bytes]:
+        # brotli 不支持限制输出大小，整块解压
+        chunk = self.decompress(data)
+        if chunk:
+            yield chunk
+
+    def flush(self) -> bytes:
+        if hasattr(self._obj, "flush"):
+            return self._obj.flush()
+        return b""
+
+
+def create_decoder(encoding: Optional[str]) -> Optional[Any]:
+    """
+    根据 ``Content-Encoding`` 创建流式解压器
+
+    Args:
+        encoding: ``Content-Encoding`` 响应头的值
+
+    Returns:
+        提供 ``decompress(data)``、``iter_decompress(data)`` 和 ``flush()`` 的解压器，
+        没有压缩或编码不支持时返回 None；``iter_decompress`` 分段产生解压结果，
+        gzip 和 deflate 每段最多 ``CHUNK_SIZE`` 字节
+    """
+    if not encoding:
+        return None
+    encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return _GzipDecoder()
+    if encoding == "deflate":
+        return _DeflateDecoder()
+    if encoding == "br" and _brotli is not None:
+        return _BrotliDecoder(_brotli)
+    return None
+
+
+def decode_chunks(chunks: Iterable[bytes], decoder: Any) -> bytes:
+    """
+    逐块解压响应体
+
+    压缩数据读取一块解压一块，不会同时保留完整的压缩数据和解压后的数据。
+
+    Args:
+        chunks: 压缩数据块
+        decoder: ``create_decoder`` 返回的解压器
+
+    Returns:
+        解压后的响应体
+
+    Raises:
+        ValueError: 压缩数据损坏时
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            decompressed = decoder.decompress(chunk)
+            if decompressed:
+                parts.append(decompressed)
+        tail = decoder.flush()
+    except _DECODE_ERRORS as e:
+        raise ValueError(f"无法解压响应体: {e}") from e
+    if tail:
+        parts.append(tail)
+    return b"".join(parts)
+
+
+class CompressionStats:
+    """
+    线程安全的传输字节计数，分别记录压缩前和实际传输的字节数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.compressed_requests = 0
+        self.request_bytes = 0
+        self.request_wire_bytes = 0
+        self.responses = 0
+        self.compressed_responses = 0
+        self.response_bytes = 0
+        self.response_wire_bytes = 0
+
+    def record_request(self, size: int, wire_size: int) -> None:
+        """
+        记录一次请求体
+
+        Args:
+            size: 压缩前的字节数
+            wire_size: 实际发送的字节数
+        """
+        with self._lock:
+            self.requests += 1
+            self.request_bytes += size
+            self.request_wire_bytes += wire_size
+            if wire_size != size:
+                self.compressed_requests += 1
+
+    def record_response(self, size: int, wire_size: Optional[int]) -> None:
+        """
+        记录一次响应体
+
+        Args:
+            size: 解压后的字节数
+            wire_size: 实际接收的字节数，None 表示与 ``size`` 相同
+        """
+        if wire_size is None:
+            wire_size = size
+        with self._lock:
+            self.responses += 1
+            self.response_bytes += size
+            self.response_wire_bytes += wire_size
+            if wire_size != size:
+                self.compressed_responses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取计数快照
+
+        Returns:
+            包含请求和响应的数量、压缩前字节数、实际传输字节数以及节省比例的字典
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "compressed_requests": self.compressed_requests,
+                "request_bytes": self.request_bytes,
+                "request_wire_bytes": self.request_wire_bytes,
+                "request_savings": _savings(self.request_bytes, self.request_wire_bytes),
+                "responses": self.responses,
+                "compressed_responses": self.compressed_responses,
+                "response_bytes": self.response_bytes,
+                "response_wire_bytes": self.response_wire_bytes,
+                "response_savings": _savings(self.response_bytes, self.response_wire_bytes),
+            }
+
+
+def _savings(size: int, wire_size: int) -> float:
+    """压缩节省的字节比例"""
+    return 1 - wire_size / size if size else 0.0
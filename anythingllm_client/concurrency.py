@@ -0,0 +1,332 @@
+"""
+自适应并发限制模块
+
+``ConcurrencyLimiter`` 按端点族（见 ``endpoints.endpoint_family``）限制同时在途的
+请求数，并根据观察到的延迟调整上限（gradient 算法）：
+
+- 基线延迟：最近一到两个窗口内的最小延迟，近似服务端空闲时的延迟；按窗口滚动，
+  工作区切换到更慢的模型后基线随之更新
+- 每完成一个请求，比较基线延迟与本次延迟，延迟没有明显上升时上限增加约
+  ``sqrt(limit)``，延迟上升时按比例缩小
+- 连接失败、5xx 和 429 视为过载信号，上限乘以 ``backoff``
+
+在途请求数达到上限时，新请求按先来先到的顺序排队；队列已满或排队超时的请求被
+丢弃并抛出 ``ConcurrencyLimitError``，不会发出。
+"""
+
+import asyncio
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from .exceptions import ConcurrencyLimitError
+
+
+class _Waiter:
+    """
+    排队中的请求，被唤醒时已经获得在途名额
+    """
+
+    __slots__ = ("event", "loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        if loop is None:
+            self.event: Optional[threading.Event] = threading.Event()
+            self.future: Optional[asyncio.Future] = None
+        else:
+            self.event = None
+            self.future = loop.create_future()
+
+    def wake(self) -> None:
+        """唤醒等待者，调用方需持有锁"""
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Family:
+    """
+    单个端点族的并发状态，由 ``ConcurrencyLimiter`` 的锁保护
+    """
+
+    __slots__ = (
+        "limit", "in_flight", "waiters", "min_rtt", "window_min", "previous_min",
+        "last_rtt", "samples", "shed", "peak_in_flight",
+    )
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: Deque[_Waiter] = deque()
+        self.min_rtt = 0.0
+        self.window_min = math.inf
+        self.previous_min = math.inf
+        self.last_rtt = 0.0
+        self.samples = 0
+        self.shed = 0
+        self.peak_in_flight = 0
+
+
+class ConcurrencyLimiter:
+    """
+    按端点族分别调整在途请求上限的并发限制器，可以被多个线程和多个客户端共享
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        max_queue: Optional[int] = 32,
+        queue_timeout: Optional[float] = None,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+        rtt_window: int = 100,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        """
+        初始化并发限制器
+
+        Args:
+            initial_limit: 每个端点族的初始在途请求上限
+            min_limit: 在途请求上限的最小值
+            max_limit: 在途请求上限的最大值
+            max_queue: 每个端点族最多排队的请求数，超过时立即丢弃，None 表示不限制
+            queue_timeout: 排队的最长秒数，超过时丢弃，None 表示一直等待
+            tolerance: 本次延迟不超过基线延迟的该倍数时视为延迟没有明显上升
+            smoothing: 每个样本对上限的调整幅度，0 到 1 之间
+            backoff: 出现过载信号（连接失败、5xx、429）时上限乘以该系数
+            rtt_window: 基线延迟窗口的样本数
+            overrides: 按端点族覆盖 ``initial_limit``、``min_limit``、``max_limit``、
+                ``max_queue``，例如 ``{"chat": {"max_limit": 8}}``
+        """
+        self._defaults = {
+            "initial_limit": initial_limit,
+            "min_limit": min_limit,
+            "max_limit": max_limit,
+            "max_queue": max_queue,
+        }
+        self._overrides = overrides or {}
+        for family, options in self._overrides.items():
+            unknown = set(options) - set(self._defaults)
+            if unknown:
+                raise ValueError(f"端点族 {family} 的并发参数无效: {', '.join(sorted(unknown))}")
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.rtt_window = rtt_window
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._families: Dict[str, _Family] = {}
+
+    def _config(self, family: str) -> Dict[str, Any]:
+        """获取端点族的并发参数，调用方需持有锁"""
+        config = self._configs.get(family)
+        if config is None:
+            config = dict(self._defaults, **self._overrides.get(family, {}))
+            self._configs[family] = config
+        return config
+
+    def _family(self, family: str) -> _Family:
+        """获取端点族的并发状态，调用方需持有锁"""
+        state = self._families.get(family)
+        if state is None:
+            state = self._families[family] = _Family(
+                float(self._config(family)["initial_limit"])
+            )
+        return state
+
+    def _enter(self, family: str, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Waiter]:
+        """
+        占用一个在途名额，或者加入等待队列
+
+        Returns:
+            需要等待时返回等待者，已经获得名额时返回 None
+
+        Raises:
+            ConcurrencyLimitError: 等待队列已满时
+        """
+        with self._lock:
+            state = self._family(family)
+            if not state.waiters and state.in_flight < int(state.limit):
+                state.in_flight += 1
+                state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+                return None
+            max_queue = self._config(family)["max_queue"]
+            if max_queue is not None and len(state.waiters) >= max_queue:
+                state.shed += 1
+                raise ConcurrencyLimitError(family, int(state.limit), len(state.waiters))
+            waiter = _Waiter(loop)
+            state.waiters.append(waiter)
+            return waiter
+
+    def try_acquire(self, family: str) -> bool:
+        """
+        不排队地占用一个在途名额，用于对冲等可以放弃的请求
+
+        Args:
+            family: 端点族
+
+        Returns:
+            占用了名额时返回 True，没有空闲名额或有请求在排队时返回 False
+        """
+        with self._lock:
+            state = self._family(family)
+            if state.waiters or state.in_flight >= int(state.limit):
+                return False
+            state.in_flight += 1
+            state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+            return True
+
+    def _abandon(self, family: str, waiter: _Waiter) -> bool:
+        """
+        放弃排队
+
+        Returns:
+            等待者仍在队列中（已移出）时返回 True，已经获得名额时返回 False
+        """
+        with self._lock:
+            state = self._family(family)
+            try:
+                state.waiters.remove(waiter)
+            except ValueError:
+                return False
+            state.shed += 1
+            return True
+
+    def _timeout_error(self, family: str) -> ConcurrencyLimitError:
+        with self._lock:
+            state = self._family(family)
+            return ConcurrencyLimitError(family, int(state.limit), len(state.waiters))
+
+    def acquire(self, family: str, timeout: Optional[float] = None) -> None:
+        """
+        占用一个在途名额，必要时排队等待
+
+        Args:
+            family: 端点族
+            timeout: 最长排队秒数，None 表示使用 ``queue_timeout``
+
+        Raises:
+            ConcurrencyLimitError: 等待队列已满或排队超时时
+        """
+        waiter = self._enter(family, None)
+        if waiter is None:
+            return
+        if timeout is None:
+            timeout = self.queue_timeout
+        if waiter.event.wait(timeout):
+            return
+        if self._abandon(family, waiter):
+            raise self._timeout_error(family)
+
+    async def acquire_async(self, family: str, timeout: Optional[float] = None) -> None:
+        """
+        ``acquire`` 的协程版本，排队时不阻塞事件循环
+
+        Args:
+            family: 端点族
+            timeout: 最长排队秒数，None 表示使用 ``queue_timeout``
+
+        Raises:
+            ConcurrencyLimitError: 等待队列已满或排队超时时
+        """
+        waiter = self._enter(family, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        if timeout is None:
+            timeout = self.queue_timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(family, waiter):
+                raise self._timeout_error(family) from None
+        except BaseException:
+            # 任务被取消：还在排队则移出队列，已经获得名额则归还
+            if not self._abandon(family, waiter):
+                self.release(family)
+            raise
+
+    def release(
+        self, family: str, duration: Optional[float] = None, dropped: bool = False
+    ) -> None:
+        """
+        归还在途名额并根据本次结果调整上限
+
+        Args:
+            family: 端点族
+            duration: 请求耗时（秒），None 表示请求没有结果（例如被取消），不调整上限
+            dropped: 是否出现过载信号（连接失败、5xx、429）
+        """
+        with self._lock:
+            state = self._family(family)
+            config = self._config(family)
+            in_flight = state.in_flight
+            if dropped:
+                state.limit = max(config["min_limit"], state.limit * self.backoff)
+            elif duration is not None and duration > 0:
+                self._update(state, config, duration, in_flight)
+
+            # 名额直接交给排在最前面的等待者
+            state.in_flight -= 1
+            while state.waiters and state.in_flight < int(state.limit):
+                state.in_flight += 1
+                state.waiters.popleft().wake()
+            state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+
+    def _update(
+        self, state: _Family, config: Dict[str, Any], rtt: float, in_flight: int
+    ) -> None:
+        """根据一次延迟样本调整上限，调用方需持有锁"""
+        state.samples += 1
+        state.last_rtt = rtt
+        state.window_min = min(state.window_min, rtt)
+        state.min_rtt = min(state.window_min, state.previous_min)
+        if state.samples % self.rtt_window == 0:
+            state.previous_min = state.window_min
+            state.window_min = math.inf
+
+        if in_flight * 2 < state.limit and not state.waiters:
+            # 在途请求远低于上限时样本不能说明上限是否合适
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * state.min_rtt / rtt))
+        target = state.limit * gradient + math.sqrt(state.limit)
+        limit = state.limit * (1 - self.smoothing) + target * self.smoothing
+        state.limit = max(config["min_limit"], min(config["max_limit"], limit))
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁并清空状态，父进程的在途请求不属于子进程"""
+        self._lock = threading.Lock()
+        self._families = {}
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的并发状态
+
+        Returns:
+            以端点族为键的字典，包含当前上限、在途请求数、排队请求数、出现过的
+            最大在途请求数、基线延迟、最近一次延迟以及被丢弃的请求数
+        """
+        with self._lock:
+            return {
+                family: {
+                    "limit": int(state.limit),
+                    "in_flight": state.in_flight,
+                    "queued": len(state.waiters),
+                    "peak_in_flight": state.peak_in_flight,
+                    "min_rtt": state.min_rtt,
+                    "last_rtt": state.last_rtt,
+                    "shed": state.shed,
+                }
+                for family, state in self._families.items()
+            }
@@ -0,0 +1,184 @@
+"""
+DNS 缓存模块
+
+连接池回收或新建连接时，传输层通过 ``DnsCache`` 解析主机名。解析结果在 TTL 内
+复用，避免连接频繁重建时每次都查询 DNS。
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DnsCache:
+    """
+    带 TTL 的线程安全 DNS 缓存
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        """
+        初始化 DNS 缓存
+
+        Args:
+            ttl: 解析结果的缓存时间（秒）
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[Tuple[Any, ...]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host: str, port: int) -> List[Tuple[Any, ...]]:
+        """
+        解析主机名，TTL 内直接返回缓存结果
+
+        Args:
+            host: 主机名
+            port: 端口
+
+        Returns:
+            ``socket.getaddrinfo`` 格式的地址列表
+
+        Raises:
+            socket.gaierror: 解析失败时
+        """
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        """
+        删除缓存的解析结果
+
+        Args:
+            host: 主机名
+            port: 端口
+        """
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(
+        self,
+        address: Tuple[str, int],
+        timeout: Optional[float] = None,
+        source_address: Optional[Tuple[str, int]] = None,
+    ) -> socket.socket:
+        """
+        使用缓存的解析结果建立 TCP 连接，签名与 ``socket.create_connection`` 相同
+
+        依次尝试解析出的每个地址；全部失败时清除缓存，下次连接重新解析。
+
+        Args:
+            address: (主机名, 端口)
+            timeout: 超时时间（秒）
+            source_address: 本地绑定地址
+
+        Returns:
+            已连接的套接字
+        """
+        host, port = address
+        if _is_ip_address(host):
+            return socket.create_connection(address, timeout, source_address)
+
+        error: Optional[OSError] = None
+        for family, socktype, proto, _, sockaddr in self.resolve(host, port):
+            sock = socket.socket(family, socktype, proto)
+            try:
+                sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                error = e
+                sock.close()
+
+        self.invalidate(host, port)
+        raise error or OSError(f"无法解析主机 {host}")
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁并清空缓存"""
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含缓存条目数、命中和未命中次数的字典
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl": self.ttl,
+            }
+
+
+def _is_ip_address(host: str) -> bool:
+    """判断主机名是否为 IP 地址字面量"""
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+def install_requests_dns_cache(adapter: Any, dns_cache: DnsCache) -> None:
+    """
+    让 requests 适配器新建的连接通过 DNS 缓存解析主机名
+
+    urllib3 连接用 ``_dns_host`` 建立 TCP 连接、用 ``host`` 做 TLS 校验，
+    这里把 ``_dns_host`` 换成缓存的 IP 地址。
+
+    Args:
+        adapter: ``requests.adapters.HTTPAdapter`` 实例
+        dns_cache: DNS 缓存
+    """
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def _cached_new_conn(base):
+        def new_conn(self):
+            if not _is_ip_address(self.host):
+                sockaddr = dns_cache.resolve(self.host, self.port)[0][4]
+                self._dns_host = sockaddr[0]
+            try:
+                return base._new_conn(self)
+            except Exception:
+                dns_cache.invalidate(self.host, self.port)
+                raise
+        return new_conn
+
+    class _CachedHTTPConnection(HTTPConnection):
+        _new_conn = _cached_new_conn(HTTPConnection)
+
+    class _CachedHTTPSConnection(HTTPSConnection):
+        _new_conn = _cached_new_conn(HTTPSConnection)
+
+    class _CachedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _CachedHTTPConnection
+
+    class _CachedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _CachedHTTPSConnection
+
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": _CachedHTTPConnectionPool,
+        "https": _CachedHTTPSConnectionPool,
+    }
@@ -0,0 +1,109 @@
+"""
+端点分类模块
+
+熔断、限流等按端点族（endpoint family）分别统计的功能通过 ``endpoint_family``
+把请求 URL 归入以下几类：
+
+- ``chat``: 需要调用 LLM 的对话端点，包括线程消息和 OpenAI 兼容的 chat/completions
+- ``embed``: 嵌入端点，包括 OpenAI 兼容的 embeddings
+- ``documents``: 文档、文档文件夹、上传以及工作区文档
+- ``threads``: 工作区线程的其余端点
+- ``workspaces``: 工作区的其余端点
+- ``admin``: 管理员和 API 密钥端点
+- ``system``、``users``、``auth``、``openai``: 对应路径前缀下的端点
+- ``other``: 无法识别的路径
+
+``affinity_key`` 识别属于同一个工作区线程的请求，启用多实例负载均衡时这些请求
+可以固定发往同一个实例。
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+ENDPOINT_FAMILIES = (
+    "chat",
+    "embed",
+    "documents",
+    "threads",
+    "workspaces",
+    "admin",
+    "system",
+    "users",
+    "auth",
+    "openai",
+    "other",
+)
+
+_CHAT_SEGMENTS = frozenset({"chat", "stream-chat", "message"})
+
+_PREFIX_FAMILIES = {
+    "admin": "admin",
+    "api-keys": "admin",
+    "auth": "auth",
+    "document": "documents",
+    "documents": "documents",
+    "document-folders": "documents",
+    "embed": "embed",
+    "system": "system",
+    "users": "users",
+}
+
+
+@lru_cache(maxsize=4096)
+def endpoint_family(url: str) -> str:
+    """
+    判断请求所属的端点族
+
+    Args:
+        url: 完整 URL 或以 /v1/ 开头的 API 路径
+
+    Returns:
+        端点族名称，取值见 ``ENDPOINT_FAMILIES``
+    """
+    start = url.find("/v1/")
+    if start == -1:
+        return "other"
+    path = url[start + 4:].split("?", 1)[0]
+    segments = [segment for segment in path.split("/") if segment]
+    if not segments:
+        return "other"
+
+    prefix = segments[0]
+    if prefix == "openai":
+        if "chat" in segments[1:]:
+            return "chat"
+        if "embeddings" in segments[1:]:
+            return "embed"
+        return "openai"
+    if prefix in ("workspace", "workspaces"):
+        # /v1/workspace(s)/{slug}/...，第三段起才是子资源
+        rest = segments[2:]
+        if _CHAT_SEGMENTS.intersection(rest):
+            return "chat"
+        if rest and rest[0] in ("thread", "threads"):
+            return "threads"
+        if rest and rest[0] in ("documents", "update-embeddings"):
+            return "documents"
+        return "workspaces"
+    return _PREFIX_FAMILIES.get(prefix, "other")
+
+
+@lru_cache(maxsize=4096)
+def affinity_key(url: str) -> Optional[str]:
+    """
+    获取线程级请求的亲和键
+
+    Args:
+        url: 完整 URL 或以 /v1/ 开头的 API 路径
+
+    Returns:
+        ``/v1/workspace/{slug}/thread/{thread_slug}`` 下的请求返回
+        ``"{slug}/{thread_slug}"``，其他请求返回 None
+    """
+    start = url.find("/v1/workspace/")
+    if start == -1:
+        return None
+    segments = url[start + 14:].split("?", 1)[0].split("/")
+    if len(segments) < 3 or segments[1] != "thread" or not segments[2] or segments[2] == "new":
+        return None
+    return f"{segments[0]}/{segments[2]}"
@@ -0,0 +1,84 @@
+"""
+异常定义模块
+"""
+
+from typing import Dict, Any, Optional
+
+
+class ApiError(Exception):
+    """API 错误异常类"""
+
+    # 抛出该错误之前发送请求的次数（包括重试）
+    attempts = 1
+
+    def __init__(
+        self,
+        status_code: int,
+        message: str,
+        details: Optional[Dict[str, Any]] = None,
+        retry_after: Optional[float] = None,
+    ):
+        self.status_code = status_code
+        self.message = message
+        self.details = details
+        self.retry_after = retry_after
+        super().__init__(f"API 错误 {status_code}: {message}")
+
+
+class TransportError(Exception):
+    """传输层错误，例如连接失败、连接被重置或读取超时"""
+
+    # 抛出该错误之前发送请求的次数（包括重试）
+    attempts = 1
+
+
+class ConnectError(TransportError):
+    """建立连接失败，请求确定没有发出，任何方法都可以安全重试"""
+
+
+class CircuitOpenError(ApiError):
+    """熔断器打开时直接拒绝请求，请求没有发出"""
+
+    def __init__(self, family: str, retry_after: Optional[float] = None):
+        self.family = family
+        super().__init__(
+            503,
+            f"端点族 {family} 的熔断器已打开",
+            {"family": family},
+            retry_after,
+        )
+
+
+class RateLimitError(ApiError):
+    """客户端限流器在允许的等待时间内拿不到令牌，请求没有发出"""
+
+    def __init__(self, family: str, retry_after: Optional[float] = None):
+        self.family = family
+        super().__init__(
+            429,
+            f"端点族 {family} 的请求超过客户端限流速率",
+            {"family": family},
+            retry_after,
+        )
+
+
+class ConcurrencyLimitError(ApiError):
+    """并发限制器的等待队列已满或排队超时，请求被丢弃，没有发出"""
+
+    def __init__(self, family: str, limit: int, queued: int):
+        self.family = family
+        self.limit = limit
+        self.queued = queued
+        super().__init__(
+            503,
+            f"端点族 {family} 的在途请求已达上限 {limit}，排队请求 {queued} 个",
+            {"family": family, "limit": limit, "queued": queued},
+        )
+
+
+class DeadlineExceededError(ApiError):
+    """请求的时间预算（``Timeout.total`` 或 ``deadline()``）已经用完"""
+
+    def __init__(self, family: Optional[str] = None):
+        self.family = family
+        super().__init__(504, "请求的时间预算已用完", {"family": family})
@@ -0,0 +1,215 @@
+"""
+对冲请求模块
+
+读取类接口（例如列出工作区、文档和聊天历史）的尾延迟往往来自偶尔变慢的服务端
+实例或连接。启用 ``HedgePolicy`` 后，幂等的 GET 请求在发出后超过该端点族最近
+延迟的某个分位数（默认 p95）仍未返回时，通过另一个连接再发送一份相同的请求，
+采用先返回的结果并放弃另一个。
+
+对冲请求会增加服务端负载，因此由预算限制：每个符合条件的请求为该端点族积累
+``budget`` 个对冲额度，每次对冲消耗 1 个，额度不足时不对冲。默认 ``budget=0.05``
+即对冲请求最多约占 5%，负载不会翻倍。对冲请求与普通请求一样占用并发限制器、调度器
+和共享限流器的名额，但不排队：没有空闲名额时不对冲。
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+
+class _Family:
+    """
+    单个端点族的延迟样本和对冲计数，由 ``HedgePolicy`` 的锁保护
+    """
+
+    __slots__ = ("samples", "tokens", "requests", "hedged", "wins", "denied", "skipped")
+
+    def __init__(self, window: int, burst: float):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.tokens = burst
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.denied = 0
+        self.skipped = 0
+
+
+class HedgePolicy:
+    """
+    对冲请求策略，按端点族统计延迟并分配对冲预算，可以被多个线程和多个客户端共享
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.01,
+        max_delay: Optional[float] = None,
+        budget: float = 0.05,
+        burst: float = 10.0,
+        window: int = 200,
+        min_samples: int = 20,
+        families: Optional[Iterable[str]] = None,
+    ):
+        """
+        初始化对冲策略
+
+        Args:
+            percentile: 发出对冲请求的延迟分位数，0 到 1 之间
+            min_delay: 对冲前等待的最短秒数
+            max_delay: 对冲前等待的最长秒数，None 表示不限制
+            budget: 每个请求积累的对冲额度，即对冲请求占请求总数的最大比例
+            burst: 每个端点族最多积累的对冲额度
+            window: 计算分位数使用的最近延迟样本数
+            min_samples: 样本数少于该值时不对冲
+            families: 启用对冲的端点族，None 表示所有端点族
+        """
+        if not 0 < percentile < 1:
+            raise ValueError("percentile 必须在 0 和 1 之间")
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.burst = burst
+        self.window = window
+        self.min_samples = min_samples
+        self.families = frozenset(families) if families is not None else None
+        self._lock = threading.Lock()
+        self._families: Dict[str, _Family] = {}
+
+    def _family(self, family: str) -> _Family:
+        """获取端点族的状态，调用方需持有锁"""
+        state = self._families.get(family)
+        if state is None:
+            state = self._families[family] = _Family(self.window, self.burst)
+        return state
+
+    def applies(self, method: str, family: str) -> bool:
+        """
+        判断请求是否可以对冲
+
+        Args:
+            method: HTTP 方法
+            family: 端点族
+
+        Returns:
+            GET 请求且端点族启用了对冲时返回 True
+        """
+        return method == "GET" and (self.families is None or family in self.families)
+
+    def delay(self, family: str) -> Optional[float]:
+        """
+        为一个新请求计算对冲前的等待时间，并为端点族积累对冲额度
+
+        Args:
+            family: 端点族
+
+        Returns:
+            等待秒数，样本不足时返回 None（不对冲）
+        """
+        with self._lock:
+            state = self._family(family)
+            state.requests += 1
+            state.tokens = min(self.burst, state.tokens + self.budget)
+            if len(state.samples) < self.min_samples:
+                return None
+            samples = list(state.samples)
+        return self._delay_for(samples)
+
+    def _delay_for(self, samples: List[float]) -> Optional[float]:
+        """由延迟样本计算对冲等待时间，样本不足时返回 None"""
+        if len(samples) < self.min_samples:
+            return None
+        samples = sorted(samples)
+        index = min(len(samples) - 1, int(len(samples) * self.percentile))
+        delay = max(self.min_delay, samples[index])
+        if self.max_delay is not None:
+            delay = min(self.max_delay, delay)
+        return delay
+
+    def try_hedge(self, family: str) -> bool:
+        """
+        尝试消耗一个对冲额度
+
+        Args:
+            family: 端点族
+
+        Returns:
+            额度充足（可以发出对冲请求）时返回 True
+        """
+        with self._lock:
+            state = self._family(family)
+            if state.tokens < 1:
+                state.denied += 1
+                return False
+            state.tokens -= 1
+            state.hedged += 1
+            return True
+
+    def record(self, family: str, latency: float) -> None:
+        """
+        记录一次成功返回的请求的延迟
+
+        Args:
+            family: 端点族
+            latency: 延迟（秒）
+        """
+        with self._lock:
+            self._family(family).samples.append(latency)
+
+    def record_win(self, family: str) -> None:
+        """
+        记录一次对冲请求先于原请求返回
+
+        Args:
+            family: 端点族
+        """
+        with self._lock:
+            self._family(family).wins += 1
+
+    def record_skipped(self, family: str) -> None:
+        """
+        记录一次因没有空闲的在途名额没有对冲
+
+        Args:
+            family: 端点族
+        """
+        with self._lock:
+            self._family(family).skipped += 1
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁，延迟样本保留，计数清零"""
+        self._lock = threading.Lock()
+        for state in self._families.values():
+            state.tokens = self.burst
+            state.requests = state.hedged = state.wins = state.denied = state.skipped = 0
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的对冲统计
+
+        Returns:
+            以端点族为键的字典，包含请求数、对冲请求数、对冲请求先返回的次数、因预算
+            不足没有对冲的次数、因没有空闲名额没有对冲的次数、对冲率、对冲胜出率以及
+            当前的对冲等待秒数
+        """
+        with self._lock:
+            families = {
+                family: (
+                    state.requests, state.hedged, state.wins, state.denied, state.skipped,
+                    list(state.samples),
+                )
+                for family, state in self._families.items()
+            }
+        states = {}
+        for family, (requests, hedged, wins, denied, skipped, samples) in families.items():
+            states[family] = {
+                "requests": requests,
+                "hedged": hedged,
+                "wins": wins,
+                "denied": denied,
+                "skipped": skipped,
+                "hedge_rate": hedged / requests if requests else 0.0,
+                "win_rate": wins / hedged if hedged else 0.0,
+                "delay": self._delay_for(samples),
+            }
+        return states
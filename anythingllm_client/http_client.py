@@ -2,181 +2,1661 @@
 HTTP 客户端模块，处理与 AnythingLLM API 的所有 HTTP 通信
 """
 
-import json
-import requests
-from typing import Dict, Any, Optional, Union, List, BinaryIO
-from urllib.parse import urljoin
+import os
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Dict, Any, Callable, Iterator, Mapping, Optional, Sequence, Union, List, BinaryIO, Tuple,
+)
+from urllib.parse import urljoin, urlencode, urlsplit
 
+from .balancer import LoadBalancer
+from .cache import CacheLookup, ResponseCache
+from .circuit_breaker import CircuitBreaker
+from .coalescing import RequestCoalescer
+from .codec import JsonCodec, JsonItemParser, JsonStream, create_codec
+from .compression import CompressionPolicy, CompressionStats
+from .concurrency import ConcurrencyLimiter
+from .dns_cache import DnsCache
+from .endpoints import affinity_key, endpoint_family
+from .hedging import HedgePolicy
+from .rate_limiter import RateLimiter
+from .shared_limiter import SharedLimiter
+from .timeouts import (
+    Timeout,
+    budget_timeouts,
+    budget_wait,
+    request_deadline,
+    resolve_timeouts,
+    within_deadline,
+)
+from .exceptions import ApiError, ConnectError, DeadlineExceededError, TransportError
+from .retry import RetryPolicy, RetryStats, parse_retry_after
+from .scheduler import RequestScheduler
+from .transports import Transport, TransportResponse, create_transport
+from .unix_socket import unix_origin
 
-class ApiError(Exception):
-    """API 错误异常类"""
-    
-    def __init__(self, status_code: int, message: str, details: Optional[Dict[str, Any]] = None):
-        self.status_code = status_code
-        self.message = message
-        self.details = details
-        super().__init__(f"API 错误 {status_code}: {message}")
+
+_STDLIB_CODEC = JsonCodec()
+
+
+def parse_response(
+    status_code: int,
+    reason: str,
+    content: Union[bytes, str],
+    headers: Optional[Mapping[str, str]] = None,
+    codec: Optional[JsonCodec] = None,
+) -> Any:
+    """
+    解析 API 响应内容，同步和异步客户端共用同一套错误语义
+
+    响应正文直接从字节解析，只有无法解析为 JSON 时才解码为字符串。
+
+    Args:
+        status_code: HTTP 状态码
+        reason: HTTP 状态描述
+        content: 响应正文
+        headers: 响应头，用于读取 Retry-After
+        codec: JSON 编解码器，None 表示标准库
+
+    Returns:
+        解析后的响应数据
+
+    Raises:
+        ApiError: 当 API 返回错误时
+    """
+    if codec is None:
+        codec = _STDLIB_CODEC
+    if status_code >= 400:
+        try:
+            error_data = codec.loads(content)
+            message = error_data.get("message", reason)
+            details = error_data
+        except (ValueError, AttributeError):
+            message = reason
+            details = {"raw_response": _text(content)}
+
+        retry_after = parse_retry_after(headers.get("Retry-After")) if headers else None
+        raise ApiError(status_code, message, details, retry_after)
+
+    # 处理空响应
+    if not content:
+        return {}
+
+    try:
+        return codec.loads(content)
+    except ValueError:
+        return {"raw_response": _text(content)}
+
+
+def _text(content: Union[bytes, str]) -> str:
+    """把响应正文解码为字符串"""
+    if isinstance(content, str):
+        return content
+    return content.decode("utf-8", errors="replace")
+
+
+class _StreamedBody:
+    """
+    分块发送的 JSON 请求体
+
+    每次遍历重新编码 ``JsonStream``，启用请求压缩时边编码边用 gzip 压缩；遍历
+    结束后记录压缩前后的字节数。传输层遇到可迭代的请求体时使用分块传输。
+    """
+
+    def __init__(
+        self,
+        stream: JsonStream,
+        codec: JsonCodec,
+        level: Optional[int],
+        stats: CompressionStats,
+    ):
+        """
+        初始化请求体
+
+        Args:
+            stream: 要发送的 JSON 请求体
+            codec: 编码使用的编解码器
+            level: gzip 压缩级别，None 表示不压缩
+            stats: 记录字节数的统计
+        """
+        self.stream = stream
+        self._codec = codec
+        self._level = level
+        self._stats = stats
+
+    @property
+    def resendable(self) -> bool:
+        """请求体是否可以重新发送：尚未开始发送，或者数据可以重新遍历"""
+        return self.stream.replayable or not self.stream.consumed
+
+    def __iter__(self) -> Iterator[bytes]:
+        size = wire_size = 0
+        compressor = None
+        if self._level is not None:
+            compressor = zlib.compressobj(self._level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in self.stream.encode(self._codec):
+            size += len(chunk)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            wire_size += len(chunk)
+            yield chunk
+        if compressor is not None:
+            tail = compressor.flush()
+            wire_size += len(tail)
+            yield tail
+        self._stats.record_request(size, wire_size)
+
+
+def _can_resend(body: Any) -> bool:
+    """
+    判断请求体是否可以在重试时重新发送
+
+    Args:
+        body: 请求体
+
+    Returns:
+        只有开始发送后无法重新遍历的分块请求体返回 False
+    """
+    return getattr(body, "resendable", True)
+
+
+def _queue(
+    acquire: Callable[[Optional[float]], Any],
+    wait: Optional[float],
+    expires: Optional[float],
+    family: Optional[str],
+) -> Any:
+    """
+    在时间预算内排队等待限流令牌或在途名额
+
+    Args:
+        acquire: 以最长等待秒数为参数的排队函数
+        wait: 排队组件自身的最长等待秒数，None 表示不限制
+        expires: 请求的截止时间，None 表示没有截止时间
+        family: 端点族
+
+    Returns:
+        ``acquire`` 的返回值
+
+    Raises:
+        DeadlineExceededError: 剩余的时间预算不够排队时
+        ApiError: 超过排队组件自身的等待时间时，由 ``acquire`` 抛出
+    """
+    timeout, capped = budget_wait(wait, expires)
+    try:
+        return acquire(timeout)
+    except ApiError as e:
+        if not capped:
+            raise
+        raise DeadlineExceededError(family) from e
+
+
+class _HedgeSlots:
+    """
+    对冲请求占用的并发限制器、调度器和共享限流器的名额，对冲请求结束或被取消时归还
+    """
+
+    __slots__ = ("concurrency", "scheduler", "shared", "family", "priority", "slot")
+
+    def __init__(self, family: str, priority: Optional[str]):
+        self.concurrency: Optional[ConcurrencyLimiter] = None
+        self.scheduler: Optional[RequestScheduler] = None
+        self.shared: Optional[SharedLimiter] = None
+        self.family = family
+        self.priority = priority
+        self.slot: Optional[int] = None
+
+    @classmethod
+    def acquire(
+        cls,
+        concurrency: Optional[ConcurrencyLimiter],
+        scheduler: Optional[RequestScheduler],
+        shared: Optional[SharedLimiter],
+        family: str,
+        priority: Optional[str] = None,
+    ) -> Optional["_HedgeSlots"]:
+        """
+        不排队地占用对冲请求需要的名额
+
+        Returns:
+            占用的名额，任何一个组件没有空闲名额时归还已占用的名额并返回 None
+        """
+        slots = cls(family, priority)
+        if concurrency is not None:
+            if not concurrency.try_acquire(family):
+                return None
+            slots.concurrency = concurrency
+        if scheduler is not None:
+            if not scheduler.try_acquire(priority):
+                slots.release()
+                return None
+            slots.scheduler = scheduler
+        if shared is not None:
+            acquired, slots.slot = shared.try_acquire()
+            if not acquired:
+                slots.release()
+                return None
+            slots.shared = shared
+        return slots
+
+    def release(self, *_: Any) -> None:
+        """归还占用的名额，可以作为 future 的完成回调，重复调用没有作用"""
+        if self.shared is not None:
+            self.shared.release(self.slot)
+            self.shared = None
+        if self.scheduler is not None:
+            self.scheduler.release(self.priority)
+            self.scheduler = None
+        if self.concurrency is not None:
+            self.concurrency.release(self.family)
+            self.concurrency = None
+
+
+def _encode_multipart(
+    data: Optional[Dict[str, Any]],
+    files: Dict[str, Any],
+) -> Tuple[bytes, str]:
+    """
+    编码 multipart/form-data 请求体
+
+    Args:
+        data: 表单字段
+        files: 文件字段，值为文件对象或 (文件名, 文件对象[, 内容类型]) 元组
+
+    Returns:
+        请求体和 Content-Type 头
+    """
+    boundary = uuid.uuid4().hex
+    parts: List[bytes] = []
+
+    for name, value in (data or {}).items():
+        if value is None:
+            continue
+        if not isinstance(value, bytes):
+            value = str(value).encode("utf-8")
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode("utf-8")
+        )
+        parts.append(value)
+        parts.append(b"\r\n")
+
+    for name, value in files.items():
+        content_type = None
+        if isinstance(value, (tuple, list)):
+            if len(value) == 2:
+                filename, file_obj = value
+            else:
+                filename, file_obj, content_type = value[:3]
+        else:
+            file_obj = value
+            filename = os.path.basename(getattr(file_obj, "name", "") or "") or name
+
+        content = file_obj.read() if hasattr(file_obj, "read") else file_obj
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        header = f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        parts.append(header.encode("utf-8") + b"\r\n")
+        parts.append(content)
+        parts.append(b"\r\n")
+
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _encode_params(params: Dict[str, Any]) -> str:
+    """
+    编码查询参数，忽略值为 None 的参数
+
+    Args:
+        params: 查询参数
+
+    Returns:
+        查询字符串
+    """
+    return urlencode([(k, v) for k, v in params.items() if v is not None], doseq=True)
+
+
+def _origin(base_url: str) -> str:
+    """
+    获取基础 URL 的源地址，Unix 域套接字转换为 ``http+unix://`` 形式
+
+    Args:
+        base_url: 基础 URL
+
+    Returns:
+        源地址
+    """
+    parts = urlsplit(base_url)
+    if parts.scheme == "unix":
+        return unix_origin(parts.path)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# 当前进程中的所有 HttpClient，os.fork() 之后在子进程中逐个重建连接池
+_live_clients: "weakref.WeakSet[HttpClient]" = weakref.WeakSet()
+
+
+def _reset_clients_after_fork() -> None:
+    """fork 之后在子进程中调用"""
+    for client in list(_live_clients):
+        client._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
 
 
 class HttpClient:
     """
     HTTP 客户端类，处理与 AnythingLLM API 的所有 HTTP 通信
+
+    客户端负责拼装 URL、请求头和请求体，再交给传输层发送。传输层持有长连接池，
+    所有请求复用同一个连接池，避免每次调用都重新进行 TCP/TLS 握手。使用完毕后
+    应调用 ``close()``，或者以上下文管理器的方式使用。
+
+    ``base_url`` 为 ``unix:///run/anythingllm.sock`` 形式时，所有请求（包括文件
+    上传）都通过该 Unix 域套接字发送。``base_url`` 为多个地址的列表时，请求由
+    ``LoadBalancer`` 在这些实例之间分配，重试时避开上一次失败的实例。
+
+    启用熔断器后，某个端点族（例如 chat）持续失败或变慢时，该端点族的请求直接
+    抛出 ``CircuitOpenError``，其他端点族照常发送。启用限流器后，请求发出前从
+    所属端点族的令牌桶取得令牌，收到 429 时自动降低该端点族的速率。
+
+    客户端可以在 fork 之前创建（例如 gunicorn 的 master 进程）：子进程发出第一个
+    请求前会丢弃继承的连接池和 DNS 缓存并重新建立，配置保持不变。
+
+    同一个客户端可以被多个线程同时使用。客户端创建后只读取自身配置，每个请求
+    独占一个从连接池借出的连接，连接池、DNS 缓存和统计计数都由锁保护。
     """
-    
-    def __init__(self, base_url: str, api_key: str, timeout: int = 60):
+
+    def __init__(
+        self,
+        base_url: Union[str, Sequence[str]],
+        api_key: str,
+        timeout: int = 60,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        pool_idle_timeout: Optional[float] = None,
+        transport: Union[str, Transport] = "requests",
+        dns_ttl: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        shared_limiter: Optional[SharedLimiter] = None,
+        concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        timeouts: Optional[Dict[str, Timeout]] = None,
+        hedging: Optional[HedgePolicy] = None,
+        load_balancer: Optional[LoadBalancer] = None,
+        json_codec: Union[str, JsonCodec] = "auto",
+        compression: Optional[CompressionPolicy] = None,
+        coalescing: Optional[RequestCoalescer] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         """
         初始化 HTTP 客户端
-        
+
         Args:
-            base_url: API 的基础 URL
+            base_url: API 的基础 URL，也可以是 unix:// 开头的 Unix 域套接字路径；
+                多个实例时为基础 URL 的列表
             api_key: API 密钥
-            timeout: 请求超时时间（秒）
+            timeout: 连接和读取的默认超时时间（秒）
+            pool_connections: 连接池缓存的主机数量
+            pool_maxsize: 每个主机最多保留的连接数
+            keep_alive: 是否复用连接，为 False 时每个请求结束后关闭连接
+            pool_idle_timeout: 连接空闲超过该秒数后回收，None 表示不回收
+            transport: 传输层名称（"requests"、"http.client" 或 "http2"）或传输层实例
+            dns_ttl: DNS 解析结果的缓存时间（秒），None 表示不缓存
+            retry: 重试策略，None 表示使用默认的 ``RetryPolicy()``，
+                ``RetryPolicy(total=0)`` 表示不重试
+            circuit_breaker: 按端点族统计的熔断器，None 表示不熔断
+            rate_limiter: 按端点族限流的令牌桶，None 表示不限流
+            shared_limiter: 同一主机上多个进程共享的速率和在途请求数预算，
+                None 表示不共享
+            concurrency_limiter: 按端点族自适应调整在途请求上限的并发限制器，
+                None 表示不限制
+            scheduler: 按优先级通道分配在途名额的请求调度器，None 表示不调度
+            timeouts: 按端点族区分的超时配置，例如 ``TIMEOUT_PROFILES``，未配置的端点族
+                使用 ``default`` 键或 ``timeout``
+            hedging: GET 请求的对冲策略，None 表示不对冲；启用后可以对冲的请求在
+                最多 ``pool_maxsize * 2`` 个工作线程中发送；启用负载均衡时对冲请求发往
+                另一个实例
+            load_balancer: 多实例负载均衡器，``base_url`` 为多个地址且未指定时使用
+                默认的 ``LoadBalancer()``
+            json_codec: 编码请求体和解析响应的 JSON 编解码器名称（"auto"、"json" 或
+                "orjson"）或实例，"auto" 在安装了 orjson 时使用 orjson
+            compression: 压缩策略，None 表示使用默认的 ``CompressionPolicy()``
+                （接受压缩的响应，不压缩请求体）
+            coalescing: 合并同时进行的相同 GET 请求（路径、查询参数和凭据都相同），
+                None 表示不合并
+            cache: 按接口设置缓存时间的 GET 响应缓存，None 表示不缓存；写入请求完成后
+                使相关资源的缓存失效
         """
+        endpoints = [base_url] if isinstance(base_url, str) else list(base_url)
+        if not endpoints:
+            raise ValueError("base_url 不能为空")
+        base_url = endpoints[0]
         self.base_url = base_url
+        self.endpoints = endpoints
+        self.json_codec = create_codec(json_codec)
+        self.compression = compression if compression is not None else CompressionPolicy()
+        self._compression_stats = CompressionStats()
         self.api_key = api_key
         self.timeout = timeout
-    
+        self._timeouts = resolve_timeouts(timeout, timeouts)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.pool_idle_timeout = pool_idle_timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+        self._retry_stats = RetryStats()
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.shared_limiter = shared_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.scheduler = scheduler
+        self.hedging = hedging
+        self.coalescing = coalescing
+        self.cache = cache
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        if shared_limiter is not None:
+            # 多个实例共用一份预算
+            shared_limiter.attach(",".join(endpoint.rstrip("/") for endpoint in endpoints))
+
+        self._unix = urlsplit(base_url).scheme == "unix"
+        self._origins = [_origin(endpoint) for endpoint in endpoints]
+        self._origin = self._origins[0]
+        self._json_headers = self._get_headers()
+        self._gzip_headers = dict(self._json_headers, **{"Content-Encoding": "gzip"})
+        self._plain_headers = self._get_headers(with_content_type=False)
+
+        self.dns_cache = DnsCache(dns_ttl) if dns_ttl is not None else None
+        self.transport = create_transport(
+            transport,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_idle_timeout=pool_idle_timeout,
+            dns_cache=self.dns_cache,
+        )
+        self._warmup_stats: Dict[str, Any] = {}
+        self._pid = os.getpid()
+        if load_balancer is None and len(endpoints) > 1:
+            load_balancer = LoadBalancer()
+        self.load_balancer = load_balancer
+        if load_balancer is not None:
+            load_balancer.attach(self._origins, self._probe)
+        _live_clients.add(self)
+
+    def _after_fork(self) -> None:
+        """丢弃从父进程继承的连接池和缓存"""
+        self._pid = os.getpid()
+        if self.dns_cache is not None:
+            self.dns_cache.after_fork()
+        self.transport.after_fork()
+        self._warmup_stats = {}
+        self._retry_stats = RetryStats()
+        self._compression_stats = CompressionStats()
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.after_fork()
+        if self.rate_limiter is not None:
+            self.rate_limiter.after_fork()
+        if self.shared_limiter is not None:
+            self.shared_limiter.after_fork()
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.after_fork()
+        if self.scheduler is not None:
+            self.scheduler.after_fork()
+        if self.hedging is not None:
+            self.hedging.after_fork()
+        if self.coalescing is not None:
+            self.coalescing.after_fork()
+        if self.cache is not None:
+            self.cache.after_fork()
+        # 父进程的工作线程不会复制到子进程
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        if self.load_balancer is not None:
+            self.load_balancer.after_fork()
+
+    def with_options(self, **options: Any) -> "_BoundHttpClient":
+        """
+        返回绑定了默认调用参数的客户端视图，与当前客户端共享连接池和配置
+
+        Args:
+            **options: 每次请求的默认参数，例如 ``retry``
+
+        Returns:
+            客户端视图，接口与 ``HttpClient`` 相同
+        """
+        return _BoundHttpClient(self, options)
+
+    def with_defaults(self, **options: Any) -> "_BoundHttpClient":
+        """
+        返回绑定了默认调用参数的客户端视图，已经绑定的参数优先
+
+        ``HttpClient`` 本身没有绑定参数，因此与 ``with_options`` 相同；在视图上调用时，
+        视图已经绑定的参数不会被覆盖。
+
+        Args:
+            **options: 每次请求的默认参数，例如 ``priority``
+
+        Returns:
+            客户端视图，接口与 ``HttpClient`` 相同
+        """
+        return _BoundHttpClient(self, options)
+
+    def retry_stats(self) -> Dict[str, Any]:
+        """
+        获取重试统计信息
+
+        Returns:
+            包含重试过的请求数、重试总次数、重试后仍失败的请求数以及按原因统计的字典
+        """
+        return self._retry_stats.snapshot()
+
+    def compression_stats(self) -> Dict[str, Any]:
+        """
+        获取请求体和响应体压缩前后的字节数
+
+        Returns:
+            包含请求和响应的数量、压缩前字节数、实际传输字节数以及节省比例的字典；
+            请求只统计 JSON 请求体：普通请求体在编码时统计一次，
+            分块请求体（``JsonStream``）每次发送统计一次
+        """
+        return self._compression_stats.snapshot()
+
+    def circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的熔断状态
+
+        Returns:
+            以端点族为键的状态字典，未启用熔断器时返回空字典
+        """
+        if self.circuit_breaker is None:
+            return {}
+        return self.circuit_breaker.states()
+
+    def rate_limit_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的限流状态
+
+        Returns:
+            以端点族为键的状态字典，未启用限流器时返回空字典
+        """
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.states()
+
+    def concurrency_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的并发状态
+
+        Returns:
+            以端点族为键的状态字典，未启用并发限制器时返回空字典
+        """
+        if self.concurrency_limiter is None:
+            return {}
+        return self.concurrency_limiter.states()
+
+    def scheduler_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各优先级通道的调度状态
+
+        Returns:
+            以通道名为键的状态字典，未启用调度器时返回空字典
+        """
+        if self.scheduler is None:
+            return {}
+        return self.scheduler.states()
+
+    def hedge_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的对冲统计
+
+        Returns:
+            以端点族为键的字典，包含对冲率和对冲胜出率等，未启用对冲时为空字典
+        """
+        if self.hedging is None:
+            return {}
+        return self.hedging.states()
+
+    def coalescing_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的请求合并统计
+
+        Returns:
+            以端点族为键的字典，包含请求数、实际发送的请求数、被合并的请求数以及合并率，
+            未启用合并时为空字典
+        """
+        if self.coalescing is None:
+            return {}
+        return self.coalescing.states()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        获取响应缓存的统计
+
+        Returns:
+            命中数、条件请求数、304 响应数、淘汰数、失效数等，键见
+            ``ResponseCache.stats``，未启用缓存时为空字典
+        """
+        if self.cache is None:
+            return {}
+        return self.cache.stats()
+
+    def balancer_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各实例的负载均衡状态
+
+        Returns:
+            以实例源地址为键的状态字典，未启用负载均衡时返回空字典
+        """
+        if self.load_balancer is None:
+            return {}
+        return self.load_balancer.states()
+
+    def _probe(self, origin: str) -> bool:
+        """
+        检查实例是否健康，由负载均衡器的健康检查线程调用
+
+        Args:
+            origin: 实例的源地址
+
+        Returns:
+            健康检查接口返回 5xx 以外的状态码时返回 True
+        """
+        try:
+            response = self.transport.request(
+                "GET",
+                origin + "/v1/system/health",
+                self._json_headers,
+                None,
+                self.load_balancer.probe_timeout,
+            )
+        except TransportError:
+            return False
+        return response.status_code < 500
+
+    def shared_limit_state(self) -> Dict[str, Any]:
+        """
+        获取跨进程共享预算的当前状态
+
+        Returns:
+            包含剩余令牌数、在途请求数及其上限的字典，未启用共享限流时返回空字典
+        """
+        if self.shared_limiter is None:
+            return {}
+        return self.shared_limiter.state()
+
+    def warmup(
+        self,
+        connections: int = 1,
+        background: bool = False,
+        probe_path: str = "/v1/system/health",
+    ) -> Optional[threading.Thread]:
+        """
+        预热连接池：解析并缓存主机名，预先建立连接，然后请求一次健康检查接口
+
+        连接数不超过 ``pool_maxsize``。预热失败不会抛出异常，错误记录在
+        ``pool_stats()["warmup"]`` 中。
+
+        Args:
+            connections: 预先建立的连接数
+            background: 是否在后台线程中执行
+            probe_path: 预热时请求的接口路径
+
+        Returns:
+            后台执行时返回预热线程，否则返回 None
+        """
+        if background:
+            thread = threading.Thread(
+                target=self.warmup,
+                args=(connections, False, probe_path),
+                name="anythingllm-warmup",
+                daemon=True,
+            )
+            thread.start()
+            return thread
+
+        if self._pid != os.getpid():
+            self._after_fork()
+        stats: Dict[str, Any] = {"connections": 0, "error": None}
+        try:
+            stats["connections"] = sum(
+                self.transport.warm(origin, connections) for origin in self._origins
+            )
+            self.get(probe_path)
+        except Exception as e:
+            stats["error"] = str(e) or e.__class__.__name__
+        self._warmup_stats = stats
+        return None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            包含请求数、已建立连接数（即握手次数）以及各主机连接池状态的字典
+        """
+        stats = self.transport.pool_stats()
+        stats["keep_alive"] = self.keep_alive
+        if self.dns_cache is not None:
+            stats["dns_cache"] = self.dns_cache.stats()
+        if self._warmup_stats:
+            stats["warmup"] = dict(self._warmup_stats)
+        return stats
+
+    def close(self) -> None:
+        """关闭传输层并释放连接池中的所有连接"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        if self.load_balancer is not None:
+            self.load_balancer.close()
+        self.transport.close()
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     def _get_headers(self, with_content_type: bool = True) -> Dict[str, str]:
         """
         获取请求头
-        
+
         Args:
             with_content_type: 是否包含 Content-Type 头
-            
+
         Returns:
             请求头字典
         """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "X-API-Key": self.api_key,
+            "Accept-Encoding": self.compression.accept_encoding(),
         }
-        
+
         if with_content_type:
             headers["Content-Type"] = "application/json"
-        
+
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+
         return headers
-    
-    def _handle_response(self, response: requests.Response) -> Any:
+
+    def _url(self, path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        拼接完整的请求 URL
+
+        Args:
+            path: API 路径
+            params: 查询参数
+
+        Returns:
+            完整 URL
+        """
+        # 以 / 开头的路径与 urljoin 的结果相同，直接拼接可以省去解析开销
+        if path.startswith("/"):
+            url = self._origin + path
+        elif self._unix:
+            url = f"{self._origin}/{path}"
+        else:
+            url = urljoin(self.base_url, path)
+        if params:
+            query = _encode_params(params)
+            if query:
+                url = f"{url}?{query}"
+        return url
+
+    def _handle_response(
+        self, response: TransportResponse, lookup: Optional[CacheLookup] = None
+    ) -> Any:
         """
         处理 API 响应
-        
+
         Args:
-            response: 请求响应对象
-            
+            response: 传输层响应
+            lookup: 可缓存的 GET 请求的缓存查找结果，用于写入缓存和处理 304 响应
+
         Returns:
             解析后的响应数据
-            
+
         Raises:
             ApiError: 当 API 返回错误时
         """
-        if not response.ok:
+        self._compression_stats.record_response(len(response.content), response.wire_bytes)
+        if lookup is not None:
+            cached = self.cache.complete(
+                lookup, response.status_code, response.headers, response.content
+            )
+            if cached is not None:
+                return parse_response(200, response.reason, cached, None, self.json_codec)
+        return parse_response(
+            response.status_code, response.reason, response.content, response.headers,
+            self.json_codec,
+        )
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, _StreamedBody] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
+        stream: bool = False,
+        lookup: Optional[CacheLookup] = None,
+    ) -> Any:
+        """
+        通过传输层发送请求并处理响应，按重试策略重试失败的请求
+
+        分块发送的请求体开始发送后如果无法重新遍历，则不再重试。
+
+        ``stream`` 为 True 时不对冲，成功的响应在收到响应头后以 ``(TransportStream,
+        完成回调)`` 返回，由调用方读取响应体；错误响应仍然完整读取后按重试策略处理。
+        在途名额一直占用到调用方读完或放弃响应体后调用完成回调，延迟和熔断结果也在
+        此时记录，回调参数为读取响应体是否失败，None 表示没有读完就关闭。
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            headers: 请求头
+            body: 已编码的请求体，或分块发送的请求体
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 等待限流令牌（包括共享预算）的最长秒数，
+                None 表示使用限流器的设置
+            priority: 优先级通道，None 表示 ``default``
+            stream: 是否返回流式响应
+            lookup: 可缓存的 GET 请求的缓存查找结果，None 表示不缓存
+
+        Returns:
+            解析后的响应数据，``stream`` 为 True 时为流式响应和完成回调
+
+        Raises:
+            ApiError: 当 API 返回错误且不再重试时
+            CircuitOpenError: 当该端点族的熔断器打开时
+            ConcurrencyLimitError: 当该端点族的并发等待队列已满或排队超时时
+            DeadlineExceededError: 当请求的时间预算用完时
+            RateLimitError: 当限流令牌或共享预算的等待时间超过 rate_limit_wait 时
+            TransportError: 当连接或读写失败且不再重试时
+            ValueError: 当优先级未知时
+        """
+        policy = retry if retry is not None else self.retry
+        breaker = self.circuit_breaker
+        limiter = self.rate_limiter
+        shared = self.shared_limiter
+        concurrency = self.concurrency_limiter
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.validate(priority)
+        hedging = self.hedging
+        timeouts = self._timeouts
+        family = None
+        if (
+            breaker is not None or limiter is not None or concurrency is not None
+            or hedging is not None or len(timeouts) > 1
+        ):
+            family = endpoint_family(url)
+        if hedging is not None and (stream or not hedging.applies(method, family)):
+            hedging = None
+        balancer = self.load_balancer
+        if balancer is not None:
+            if url.startswith(self._origin):
+                suffix = url[len(self._origin):]
+                key = affinity_key(url) if balancer.sticky_threads else None
+            else:
+                balancer = None
+        connect_timeout, read_timeout, total = timeouts.get(family, timeouts["default"])
+        expires = request_deadline(total)
+        retries = 0
+        # 上一次失败的实例，重试时尽量避开
+        avoid = None
+        while True:
+            # 不经过 os.fork() 创建的子进程（例如 C 扩展直接调用 fork）不会触发 fork 钩子
+            if self._pid != os.getpid():
+                self._after_fork()
+
+            slot = None
+            entered = scheduled = False
             try:
-                error_data = response.json()
-                message = error_data.get("message", response.reason)
-                details = error_data
-            except (ValueError, json.JSONDecodeError):
-                message = response.reason
-                details = {"raw_response": response.text}
-            
-            raise ApiError(response.status_code, message, details)
-        
-        # 处理空响应
-        if not response.text:
-            return {}
-        
+                # 先等待令牌和在途名额再检查熔断器，避免半开状态的探测名额在等待期间被占用
+                # 排队的时间不超过剩余的时间预算
+                if limiter is not None:
+                    _queue(
+                        lambda wait: limiter.acquire(family, wait),
+                        limiter.max_wait if rate_limit_wait is None else rate_limit_wait,
+                        expires,
+                        family,
+                    )
+                if concurrency is not None:
+                    _queue(
+                        lambda wait: concurrency.acquire(family, wait),
+                        concurrency.queue_timeout,
+                        expires,
+                        family,
+                    )
+                    entered = True
+                if scheduler is not None:
+                    _queue(lambda wait: scheduler.acquire(priority, wait), None, expires, family)
+                    scheduled = True
+                if shared is not None:
+                    slot = _queue(
+                        shared.acquire,
+                        shared.max_wait if rate_limit_wait is None else rate_limit_wait,
+                        expires,
+                        family,
+                    )
+                budget = budget_timeouts(connect_timeout, read_timeout, expires)
+                if budget is None:
+                    raise DeadlineExceededError(family)
+                if breaker is not None:
+                    breaker.before_call(family)
+            except ApiError as e:
+                if shared is not None:
+                    shared.release(slot)
+                if scheduled:
+                    scheduler.release(priority)
+                if entered:
+                    concurrency.release(family)
+                self._give_up(e, retries)
+                raise
+            origin = target = None
+            if balancer is not None:
+                origin = balancer.pick(key, avoid)
+                target = origin + suffix
+            started = time.monotonic()
+            # 是否出现过载信号，None 表示请求没有结果
+            overloaded = None
+            failed = False
+            # 流式响应的名额和结果留到响应体读完后处理
+            deferred = False
+            # 对冲请求先返回时仍在进行的原请求
+            lagging = None
+            try:
+                try:
+                    timeout = budget[0] if budget[0] == budget[1] else budget
+                    if hedging is not None:
+                        response, lagging = self._send_hedged(
+                            hedging, family, method, target or url, headers, body, timeout,
+                            origin, priority,
+                        )
+                    elif stream:
+                        response = self.transport.stream(
+                            method, target or url, headers, body, timeout
+                        )
+                        if response.status_code >= 400:
+                            response = response.read()
+                        else:
+                            deferred = True
+                    else:
+                        response = self.transport.request(
+                            method, target or url, headers, body, timeout
+                        )
+                    failed = response.status_code >= 500
+                    overloaded = failed or response.status_code == 429
+                except TransportError:
+                    overloaded = failed = True
+                    raise
+                finally:
+                    avoid = origin if failed else None
+                    if lagging is not None:
+                        # 原请求仍在工作线程中占用连接，名额在它结束后归还
+                        lagging.add_done_callback(
+                            self._lagging_done(family, priority, origin, slot, started)
+                        )
+                    elif not deferred:
+                        self._release_slots(
+                            family, priority, origin, slot, started, overloaded, failed
+                        )
+            except TransportError as e:
+                if breaker is not None:
+                    breaker.record(family, True, time.monotonic() - started)
+                delay = policy.delay_for_error(method, not isinstance(e, ConnectError), retries + 1)
+                if not _can_resend(body):
+                    delay = None
+                if expires is not None and (
+                    time.monotonic() >= expires
+                    or (delay is not None and within_deadline(delay, expires) is None)
+                ):
+                    # 时间预算已经用完，或者剩余的预算不够等待下一次重试
+                    error = DeadlineExceededError(family)
+                    self._give_up(error, retries)
+                    raise error from e
+                if delay is None:
+                    self._give_up(e, retries)
+                    raise
+                reason = e.__class__.__name__
+            except BaseException:
+                if breaker is not None:
+                    breaker.release(family)
+                raise
+            else:
+                if breaker is not None and not deferred:
+                    breaker.record(
+                        family, response.status_code >= 500, time.monotonic() - started
+                    )
+                if limiter is not None and response.status_code >= 400:
+                    limiter.on_response(
+                        family,
+                        response.status_code,
+                        parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                delay = None
+                if response.status_code >= 400 and _can_resend(body):
+                    delay = within_deadline(
+                        policy.delay_for_status(
+                            method, response.status_code, response.headers, retries + 1
+                        ),
+                        expires,
+                    )
+                if delay is None:
+                    if deferred:
+                        return response, self._stream_done(
+                            family, priority, origin, slot, started
+                        )
+                    try:
+                        return self._handle_response(response, lookup)
+                    except ApiError as e:
+                        self._give_up(e, retries)
+                        raise
+                reason = str(response.status_code)
+
+            retries += 1
+            self._retry_stats.record_retry(retries, reason)
+            time.sleep(delay)
+
+    def _release_slots(
+        self,
+        family: Optional[str],
+        priority: Optional[str],
+        origin: Optional[str],
+        slot: Optional[int],
+        started: float,
+        overloaded: Optional[bool],
+        failed: bool,
+    ) -> None:
+        """
+        归还一次请求占用的在途名额，并把结果记录到负载均衡器和并发限制器
+
+        Args:
+            family: 端点族
+            priority: 优先级通道
+            origin: 负载均衡器选择的实例，None 表示没有经过负载均衡器
+            slot: 共享限流器的在途名额序号
+            started: 请求开始的时间（``time.monotonic``）
+            overloaded: 是否出现过载信号，None 表示请求没有结果
+            failed: 请求是否失败
+        """
+        duration = None if overloaded is None else time.monotonic() - started
+        if origin is not None:
+            self.load_balancer.finish(origin, duration, failed)
+        if self.shared_limiter is not None:
+            self.shared_limiter.release(slot)
+        if self.scheduler is not None:
+            self.scheduler.release(priority)
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(family, duration, bool(overloaded))
+
+    def _lagging_done(
+        self,
+        family: Optional[str],
+        priority: Optional[str],
+        origin: Optional[str],
+        slot: Optional[int],
+        started: float,
+    ) -> Callable[[Future], None]:
+        """
+        创建落后的原请求的完成回调：原请求结束后归还它占用的在途名额，并把它的
+        结果记录到负载均衡器和并发限制器
+
+        Returns:
+            ``Future.add_done_callback`` 使用的回调
+        """
+
+        def done(future: Future) -> None:
+            if future.cancelled():
+                self._release_slots(family, priority, origin, slot, started, None, False)
+                return
+            error = future.exception()
+            status = None if error is not None else future.result().status_code
+            failed = error is not None or status >= 500
+            self._release_slots(
+                family, priority, origin, slot, started, failed or status == 429, failed
+            )
+
+        return done
+
+    def _stream_done(
+        self,
+        family: Optional[str],
+        priority: Optional[str],
+        origin: Optional[str],
+        slot: Optional[int],
+        started: float,
+    ) -> Callable[[Optional[bool]], None]:
+        """
+        创建流式响应的完成回调：归还在途名额并记录延迟和熔断结果
+
+        Returns:
+            完成回调，参数为读取响应体是否失败，None 表示没有读完就关闭（不记录
+            延迟样本，熔断器按成功处理）
+        """
+
+        def done(failed: Optional[bool]) -> None:
+            self._release_slots(family, priority, origin, slot, started, failed, bool(failed))
+            breaker = self.circuit_breaker
+            if breaker is not None:
+                breaker.record(family, bool(failed), time.monotonic() - started)
+
+        return done
+
+    def _executor(self) -> ThreadPoolExecutor:
+        """获取发送对冲请求和后台刷新缓存的线程池，第一次使用时创建"""
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self.pool_maxsize * 2, thread_name_prefix="anythingllm-worker"
+                )
+            return self._hedge_executor
+
+    def _send_timed(
+        self,
+        hedging: HedgePolicy,
+        family: str,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes],
+        timeout: Any,
+        avoid: Optional[str] = None,
+    ) -> TransportResponse:
+        """
+        发送一次请求，并把成功返回的延迟记录到对冲策略
+
+        ``avoid`` 不为 None 时，请求由负载均衡器改发到该实例以外的实例。
+        """
+        origin = None
+        if avoid is not None:
+            origin = self.load_balancer.pick(exclude=avoid)
+            url = origin + url[len(avoid):]
+        started = time.monotonic()
+        failed = None
         try:
-            return response.json()
-        except (ValueError, json.JSONDecodeError):
-            return {"raw_response": response.text}
-    
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+            response = self.transport.request(method, url, headers, body, timeout)
+            failed = response.status_code >= 500
+        except TransportError:
+            failed = True
+            raise
+        finally:
+            if origin is not None:
+                self.load_balancer.finish(
+                    origin, None if failed is None else time.monotonic() - started, bool(failed)
+                )
+        if not failed:
+            hedging.record(family, time.monotonic() - started)
+        return response
+
+    def _send_hedged(
+        self,
+        hedging: HedgePolicy,
+        family: str,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes],
+        timeout: Any,
+        origin: Optional[str] = None,
+        priority: Optional[str] = None,
+    ) -> Tuple[TransportResponse, Optional[Future]]:
+        """
+        发送可以对冲的请求：超过对冲等待时间仍未返回时，通过另一个连接再发送一份，
+        采用先返回的响应；``origin`` 为原请求所在的实例，对冲请求发往其他实例
+
+        对冲请求不排队地占用并发限制器、调度器（``priority`` 通道）和共享限流器的
+        名额，没有空闲名额时不对冲；名额在对冲请求结束或被取消时归还。
+
+        同步传输层无法中断正在读取的连接，落后的请求在工作线程中自然结束，
+        连接随后归还连接池。对冲请求先返回时，原请求仍然占用调用方的名额，
+        调用方需要在它结束后归还。
+
+        Returns:
+            (先返回的响应, 仍在进行的原请求)，原请求已经结束时后者为 None
+
+        Raises:
+            TransportError: 所有请求都失败时，抛出原请求的错误
+        """
+        args = (hedging, family, method, url, headers, body, timeout)
+        delay = hedging.delay(family)
+        if delay is None:
+            return self._send_timed(*args), None
+
+        executor = self._executor()
+        primary = executor.submit(self._send_timed, *args)
+        pending = {primary}
+        done, _ = wait(pending, timeout=delay)
+        if not done:
+            slots = _HedgeSlots.acquire(
+                self.concurrency_limiter, self.scheduler, self.shared_limiter, family, priority
+            )
+            if slots is None:
+                hedging.record_skipped(family)
+            elif not hedging.try_hedge(family):
+                slots.release()
+            else:
+                hedge = executor.submit(self._send_timed, *args, origin)
+                hedge.add_done_callback(slots.release)
+                pending.add(hedge)
+        hedged = len(pending) > 1
+
+        errors: Dict[Future, BaseException] = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    errors[future] = error
+                    continue
+                for other in pending:
+                    other.cancel()
+                if hedged and future is not primary:
+                    hedging.record_win(family)
+                lagging = primary if primary in pending and not primary.cancelled() else None
+                return future.result(), lagging
+        raise errors.get(primary) or next(iter(errors.values()))
+
+    def _give_up(self, error: Exception, retries: int) -> None:
+        """
+        记录放弃重试的请求
+
+        Args:
+            error: 最终抛出的异常
+            retries: 已经重试的次数
+        """
+        error.attempts = retries + 1
+        if retries:
+            self._retry_stats.record_exhausted()
+
+    def _encode_json(self, json_data: Any) -> Tuple[Union[bytes, _StreamedBody], Dict[str, str]]:
+        """
+        编码 JSON 请求体，达到压缩阈值时用 gzip 压缩
+
+        ``JsonStream`` 分块发送，大小事先未知，启用请求压缩（设置了
+        ``request_threshold``）时总是压缩。
+
+        Args:
+            json_data: JSON 数据或 ``JsonStream``
+
+        Returns:
+            请求体和请求头
+        """
+        if isinstance(json_data, JsonStream):
+            compression = self.compression
+            if compression.request_threshold is None:
+                return (
+                    _StreamedBody(json_data, self.json_codec, None, self._compression_stats),
+                    self._json_headers,
+                )
+            return (
+                _StreamedBody(
+                    json_data, self.json_codec, compression.level, self._compression_stats
+                ),
+                self._gzip_headers,
+            )
+        body = self.json_codec.dumps(json_data)
+        compressed = self.compression.compress(body)
+        if compressed is None:
+            self._compression_stats.record_request(len(body), len(body))
+            return body, self._json_headers
+        self._compression_stats.record_request(len(body), len(compressed))
+        return compressed, self._gzip_headers
+
+    def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Any:
         """
         发送 GET 请求
-        
+
+        启用响应缓存时，缓存期内的接口直接返回缓存的结果，过期后带上条件请求头重新
+        验证；需要后台刷新时在工作线程中发送刷新请求。启用请求合并时，与正在进行的
+        相同请求共享结果，``retry`` 等参数以先发出的请求为准。
+
         Args:
             path: API 路径
             params: 查询参数
-            
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            priority: 本次请求的优先级通道，None 表示 ``default``，未启用调度器时忽略
+
         Returns:
             解析后的响应数据
         """
-        url = urljoin(self.base_url, path)
-        response = requests.get(
+        url = self._url(path, params)
+        headers = self._json_headers
+        lookup = None
+        if self.cache is not None:
+            lookup = self.cache.lookup(url, self.api_key)
+            if lookup is not None:
+                if lookup.fresh:
+                    if lookup.refresh:
+                        self._refresh(url, lookup)
+                    return parse_response(200, "OK", lookup.entry.content, None, self.json_codec)
+                if lookup.headers:
+                    headers = dict(headers, **lookup.headers)
+        coalescing = self.coalescing
+        if coalescing is not None:
+            family = endpoint_family(url)
+            if coalescing.applies(family):
+                # 同时进行的相同请求只发送一次，以先到达的请求的参数发送
+                return coalescing.do(
+                    ("GET", url, self.api_key),
+                    family,
+                    lambda: self._request(
+                        "GET",
+                        url,
+                        headers,
+                        retry=retry,
+                        rate_limit_wait=rate_limit_wait,
+                        priority=priority,
+                        lookup=lookup,
+                    ),
+                )
+        return self._request(
+            "GET",
             url,
-            params=params,
-            headers=self._get_headers(),
-            timeout=self.timeout
+            headers,
+            retry=retry,
+            rate_limit_wait=rate_limit_wait,
+            priority=priority,
+            lookup=lookup,
         )
-        return self._handle_response(response)
-    
+
+    def _refresh(self, url: str, lookup: CacheLookup) -> None:
+        """
+        在工作线程中刷新缓存的响应，调用方不等待
+
+        Args:
+            url: 完整 URL
+            lookup: 触发刷新的缓存查找结果
+        """
+        headers = self._json_headers
+        if lookup.headers:
+            headers = dict(headers, **lookup.headers)
+
+        def refresh() -> None:
+            error = None
+            try:
+                self._request("GET", url, headers, lookup=lookup)
+            except Exception as e:
+                error = e
+            finally:
+                self.cache.refresh_done(lookup, error)
+
+        try:
+            self._executor().submit(refresh)
+        except RuntimeError as e:
+            # 解释器正在退出，不再接受新的任务
+            self.cache.refresh_done(lookup, e)
+
+    def _write(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, _StreamedBody],
+        **options: Any,
+    ) -> Any:
+        """
+        发送写入请求，完成后（无论成功与否）使相关资源的响应缓存失效
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            headers: 请求头
+            body: 已编码的请求体
+            **options: 传递给 ``_request`` 的其他参数
+
+        Returns:
+            解析后的响应数据
+        """
+        try:
+            return self._request(method, url, headers, body, **options)
+        finally:
+            # 失败的请求也可能已经在服务端生效
+            if self.cache is not None and self.cache.invalidates(method, url):
+                self.cache.invalidate(url)
+
     def post(
         self,
         path: str,
         data: Optional[Dict[str, Any]] = None,
-        json_data: Optional[Dict[str, Any]] = None,
-        files: Optional[Dict[str, BinaryIO]] = None
+        json_data: Union[None, Dict[str, Any], JsonStream] = None,
+        files: Optional[Dict[str, BinaryIO]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
     ) -> Any:
         """
         发送 POST 请求
-        
+
+        POST 默认只在请求确定没有发出（建立连接失败）时重试。
+
         Args:
             path: API 路径
             data: 表单数据
-            json_data: JSON 数据
+            json_data: JSON 数据，``JsonStream`` 以分块传输发送
             files: 文件数据
-            
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            priority: 本次请求的优先级通道，None 表示 ``default``，未启用调度器时忽略
+
         Returns:
             解析后的响应数据
         """
-        url = urljoin(self.base_url, path)
-        headers = self._get_headers(with_content_type=files is None)
-        
-        response = requests.post(
-            url,
-            data=data,
-            json=json_data,
-            files=files,
-            headers=headers,
-            timeout=self.timeout
+        headers = self._json_headers
+        body = None
+
+        if files:
+            body, content_type = _encode_multipart(data, files)
+            headers = dict(self._plain_headers, **{"Content-Type": content_type})
+        elif data:
+            body = _encode_params(data).encode("utf-8")
+            headers = dict(
+                self._plain_headers,
+                **{"Content-Type": "application/x-www-form-urlencoded"}
+            )
+        elif json_data is not None:
+            body, headers = self._encode_json(json_data)
+
+        return self._write(
+            "POST", self._url(path), headers, body,
+            retry=retry, rate_limit_wait=rate_limit_wait, priority=priority,
         )
-        return self._handle_response(response)
-    
-    def put(self, path: str, json_data: Dict[str, Any]) -> Any:
+
+    def put(
+        self,
+        path: str,
+        json_data: Dict[str, Any],
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Any:
         """
         发送 PUT 请求
-        
+
         Args:
             path: API 路径
             json_data: JSON 数据
-            
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            priority: 本次请求的优先级通道，None 表示 ``default``，未启用调度器时忽略
+
         Returns:
             解析后的响应数据
         """
-        url = urljoin(self.base_url, path)
-        response = requests.put(
-            url,
-            json=json_data,
-            headers=self._get_headers(),
-            timeout=self.timeout
+        body, headers = self._encode_json(json_data)
+        return self._write(
+            "PUT", self._url(path), headers, body,
+            retry=retry, rate_limit_wait=rate_limit_wait, priority=priority,
         )
-        return self._handle_response(response)
-    
-    def delete(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+
+    def delete(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Any:
         """
         发送 DELETE 请求
-        
+
         Args:
             path: API 路径
             params: 查询参数
-            
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            priority: 本次请求的优先级通道，None 表示 ``default``，未启用调度器时忽略
+
         Returns:
             解析后的响应数据
         """
-        url = urljoin(self.base_url, path)
-        response = requests.delete(
-            url,
-            params=params,
-            headers=self._get_headers(),
-            timeout=self.timeout
+        return self._write(
+            "DELETE",
+            self._url(path, params),
+            self._json_headers,
+            None,
+            retry=retry,
+            rate_limit_wait=rate_limit_wait,
+            priority=priority,
+        )
+
+    def iter_items(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        item_path: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rate_limit_wait: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """
+        发送 GET 请求，边接收响应体边逐个返回其中 JSON 数组的元素
+
+        请求在开始迭代时才发送。收到响应头之前的失败按重试策略重试，之后读取响应体
+        时的失败直接抛出。提前结束迭代时关闭连接。在途名额（并发限制器、调度器和
+        共享限流器）一直占用到响应体读完或迭代结束，延迟和熔断结果也在此时记录。
+
+        Args:
+            path: API 路径
+            params: 查询参数
+            item_path: 目标数组的键路径，规则见 ``JsonItemParser``，None 表示
+                响应中的第一个数组
+            retry: 本次请求的重试策略，None 表示使用客户端的策略
+            rate_limit_wait: 本次请求等待限流令牌的最长秒数，None 表示使用限流器的设置
+            priority: 本次请求的优先级通道，None 表示 ``default``，未启用调度器时忽略
+
+        Returns:
+            数组元素的迭代器
+
+        Raises:
+            ApiError: 当 API 返回错误时
+            TransportError: 当读取响应体失败时
+            ValueError: 当响应体不是合法的 JSON 时
+        """
+        response, done = self._request(
+            "GET",
+            self._url(path, params),
+            self._json_headers,
+            retry=retry,
+            rate_limit_wait=rate_limit_wait,
+            priority=priority,
+            stream=True,
         )
-        return self._handle_response(response)
+        parser = JsonItemParser(item_path)
+        size = 0
+        # 读取响应体是否失败，None 表示没有读完
+        failed = None
+        try:
+            try:
+                for chunk in response:
+                    size += len(chunk)
+                    yield from parser.feed(chunk)
+            except TransportError:
+                failed = True
+                raise
+            failed = False
+            yield from parser.close()
+        finally:
+            response.close()
+            done(failed)
+        self._compression_stats.record_response(size, response.wire_bytes)
+
+
+class _BoundHttpClient:
+    """
+    绑定了默认调用参数的 HTTP 客户端视图
+
+    由 ``HttpClient.with_options()`` 和 ``AsyncHttpClient.with_options()`` 创建。
+    请求方法把绑定的参数与调用时传入的参数合并后转发给原客户端，其余属性直接
+    读取原客户端，因此同步和异步客户端共用这一个类。
+    """
+
+    def __init__(self, client: Any, options: Dict[str, Any]):
+        self._client = client
+        self._options = options
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def with_options(self, **options: Any) -> "_BoundHttpClient":
+        return _BoundHttpClient(self._client, {**self._options, **options})
+
+    def with_defaults(self, **options: Any) -> "_BoundHttpClient":
+        return _BoundHttpClient(self._client, {**options, **self._options})
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, **options: Any) -> Any:
+        return self._client.get(path, params, **{**self._options, **options})
+
+    def post(
+        self,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, BinaryIO]] = None,
+        **options: Any,
+    ) -> Any:
+        return self._client.post(path, data, json_data, files, **{**self._options, **options})
+
+    def put(self, path: str, json_data: Dict[str, Any], **options: Any) -> Any:
+        return self._client.put(path, json_data, **{**self._options, **options})
+
+    def delete(self, path: str, params: Optional[Dict[str, Any]] = None, **options: Any) -> Any:
+        return self._client.delete(path, params, **{**self._options, **options})
+
+    def iter_items(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        item_path: Optional[str] = None,
+        **options: Any,
+    ) -> Any:
+        return self._client.iter_items(path, params, item_path, **{**self._options, **options})
@@ -0,0 +1,469 @@
+"""
+批量加载模块
+
+按 ID 逐个获取文档、工作区或用户时，每次调用都是一次往返，几千个 ID 就是几千次
+往返。``BatchLoader`` 收集短时间内（异步客户端为同一轮事件循环内）的 ``get`` 调用：
+待获取的 ID 足够多时用一次列表请求（``documents.list()``、``workspaces.list()``、
+``users.list()``）回答所有调用，否则逐个发送 GET 请求。
+
+加载器就是缓存的作用域：同一个加载器中获取过的对象（包括列表请求返回的其他对象）
+直接从缓存返回，不会再次请求。通常为每个业务请求或每个任务创建一个加载器，用完
+即丢弃，避免读到过期的数据。
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# 批次中没有从列表请求得到的对象，由调用方逐个获取
+_MISS = object()
+
+# 各资源的模块属性名和用于匹配 ID 的字段
+_RESOURCES: Dict[str, Tuple[str, ...]] = {
+    "documents": ("id", "name"),
+    "workspaces": ("id", "slug"),
+    "users": ("id",),
+}
+
+
+def _first_array(value: Any) -> Optional[List[Any]]:
+    """按出现顺序查找第一个数组"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for item in value.values():
+            found = _first_array(item)
+            if found is not None:
+                return found
+    return None
+
+
+def _select(value: Any, path: Sequence[str]) -> Iterator[Any]:
+    """按键路径取出数组元素，``*`` 匹配数组中的每个元素"""
+    if not path:
+        if isinstance(value, list):
+            yield from value
+        return
+    head, rest = path[0], path[1:]
+    if head == "*":
+        if isinstance(value, list):
+            for item in value:
+                yield from _select(item, rest)
+    elif isinstance(value, dict) and head in value:
+        yield from _select(value[head], rest)
+
+
+def extract_items(data: Any, item_path: Optional[str] = None) -> List[Any]:
+    """
+    从列表接口的响应中取出对象列表
+
+    Args:
+        data: 解析后的响应
+        item_path: 对象数组的键路径，规则与 ``JsonItemParser`` 相同，None 表示响应中的
+            第一个数组
+
+    Returns:
+        对象列表，找不到数组时为空列表
+    """
+    if item_path is None:
+        return _first_array(data) or []
+    return list(_select(data, item_path.split(".")))
+
+
+class _Stats:
+    """
+    单个资源的加载计数
+    """
+
+    __slots__ = ("loads", "cache_hits", "batches", "bulk_calls", "individual_calls")
+
+    def __init__(self):
+        self.loads = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.bulk_calls = 0
+        self.individual_calls = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _ResourceLoader:
+    """
+    单个资源的加载状态：缓存、正在收集的批次和计数，同步和异步加载器共用
+    """
+
+    def __init__(self, module: Any, keys: Tuple[str, ...], item_path: Optional[str], owner: Any):
+        self._module = module
+        self._keys = keys
+        self._item_path = item_path
+        self._owner = owner
+        self._cache: Dict[str, Any] = {}
+        self._batch: Optional[Dict[str, Any]] = None
+        # 本作用域中已经请求过完整列表，之后缓存中没有的对象只能逐个获取
+        self._listed = False
+        # 本作用域中逐个获取的次数，累计达到阈值后改用列表请求
+        self._misses = 0
+        self.stats = _Stats()
+
+    def prime(self, item_id: Any, value: Any) -> None:
+        """
+        把已知的对象放入缓存
+
+        Args:
+            item_id: 对象 ID
+            value: 对象
+        """
+        self._cache[str(item_id)] = value
+
+    def clear(self) -> None:
+        """清空缓存，之后的获取重新请求"""
+        self._cache = {}
+        self._listed = False
+        self._misses = 0
+
+    def _use_bulk(self, size: int) -> bool:
+        """批次（加上之前逐个获取的次数）足够大且还没有请求过列表时使用列表请求"""
+        return not self._listed and size + self._misses >= self._owner.bulk_threshold
+
+    def _store_list(self, data: Any) -> None:
+        """缓存列表请求返回的所有对象"""
+        self._listed = True
+        for item in extract_items(data, self._item_path):
+            if not isinstance(item, dict):
+                continue
+            for key in self._keys:
+                value = item.get(key)
+                if value is not None:
+                    self._cache.setdefault(str(value), item)
+
+
+class _Loader(_ResourceLoader):
+    """
+    同步客户端的单个资源加载器
+    """
+
+    def __init__(self, *args: Any):
+        super().__init__(*args)
+        self._lock = threading.Lock()
+
+    def get(self, item_id: Any) -> Any:
+        """
+        获取单个对象，与 ``window`` 秒内其他线程的获取合并为一个批次
+
+        Args:
+            item_id: 对象 ID
+
+        Returns:
+            对象
+
+        Raises:
+            ApiError: 当逐个获取时 API 返回错误时
+        """
+        return self.get_many([item_id])[0]
+
+    def get_many(self, item_ids: Iterable[Any]) -> List[Any]:
+        """
+        获取多个对象，作为一个批次立即发送
+
+        Args:
+            item_ids: 对象 ID
+
+        Returns:
+            与 ``item_ids`` 顺序对应的对象列表
+
+        Raises:
+            ApiError: 当逐个获取时 API 返回错误时
+        """
+        keys = [str(item_id) for item_id in item_ids]
+        single = len(keys) == 1
+        leader = False
+        with self._lock:
+            self.stats.loads += len(keys)
+            missing = [key for key in dict.fromkeys(keys) if key not in self._cache]
+            self.stats.cache_hits += len(keys) - len(missing)
+            if missing:
+                batch = self._batch
+                if batch is None:
+                    batch = self._batch = {}
+                    leader = True
+                for key in missing:
+                    if key not in batch:
+                        batch[key] = Future()
+                futures = {key: batch[key] for key in missing}
+            cached = {key: self._cache[key] for key in keys if key in self._cache}
+        if not missing:
+            return [cached[key] for key in keys]
+        if leader:
+            window = self._owner.window
+            if single and window > 0:
+                # 等待其他线程把 ID 加入同一个批次
+                time.sleep(window)
+            self._dispatch(batch)
+        values = []
+        for key in keys:
+            value = cached[key] if key in cached else futures[key].result()
+            if value is _MISS:
+                value = self._fetch(key)
+            values.append(value)
+        return values
+
+    def _dispatch(self, batch: Dict[str, Future]) -> None:
+        """
+        关闭批次，需要时发送列表请求；列表中没有的对象交给各自的调用方逐个获取，
+        与不使用加载器时一样在各自的线程中并行发送
+        """
+        with self._lock:
+            if self._batch is batch:
+                self._batch = None
+            self.stats.batches += 1
+            bulk = self._use_bulk(len(batch))
+            if bulk:
+                self.stats.bulk_calls += 1
+        data = None
+        try:
+            if bulk:
+                data = self._module.list()
+        except Exception:
+            # 列表请求失败时逐个获取
+            pass
+        finally:
+            with self._lock:
+                if bulk:
+                    if data is None:
+                        self._listed = True
+                    else:
+                        self._store_list(data)
+                for key, future in batch.items():
+                    future.set_result(self._cache.get(key, _MISS))
+
+    def _fetch(self, key: str) -> Any:
+        """逐个获取对象并放入缓存"""
+        with self._lock:
+            self._misses += 1
+            self.stats.individual_calls += 1
+        value = self._module.get(key)
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+
+class _AsyncLoader(_ResourceLoader):
+    """
+    异步客户端的单个资源加载器，只能在一个事件循环中使用
+    """
+
+    def __init__(self, *args: Any):
+        super().__init__(*args)
+        # 事件循环只保留任务的弱引用
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def get(self, item_id: Any) -> Any:
+        """
+        获取单个对象，与同一轮事件循环（或 ``window`` 秒）内的其他获取合并为一个批次
+
+        Args:
+            item_id: 对象 ID
+
+        Returns:
+            对象
+
+        Raises:
+            ApiError: 当逐个获取时 API 返回错误时
+        """
+        key = str(item_id)
+        self.stats.loads += 1
+        if key in self._cache:
+            self.stats.cache_hits += 1
+            return self._cache[key]
+        batch = self._batch
+        loop = asyncio.get_running_loop()
+        if batch is None:
+            batch = self._batch = {}
+            window = self._owner.window
+            if window > 0:
+                loop.call_later(window, self._schedule, batch)
+            else:
+                loop.call_soon(self._schedule, batch)
+        future = batch.get(key)
+        if future is None:
+            future = batch[key] = loop.create_future()
+        # 某个调用方被取消不影响等待同一个对象的其他调用方
+        return await asyncio.shield(future)
+
+    async def get_many(self, item_ids: Iterable[Any]) -> List[Any]:
+        """
+        获取多个对象，合并为一个批次
+
+        Args:
+            item_ids: 对象 ID
+
+        Returns:
+            与 ``item_ids`` 顺序对应的对象列表
+
+        Raises:
+            ApiError: 当逐个获取时 API 返回错误时
+        """
+        return list(await asyncio.gather(*(self.get(item_id) for item_id in item_ids)))
+
+    def _schedule(self, batch: Dict[str, "asyncio.Future[Any]"]) -> None:
+        """关闭批次，在新任务中获取其中的对象"""
+        if self._batch is batch:
+            self._batch = None
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: Dict[str, "asyncio.Future[Any]"]) -> None:
+        """获取批次中的对象"""
+        self.stats.batches += 1
+        try:
+            if self._use_bulk(len(batch)):
+                self.stats.bulk_calls += 1
+                try:
+                    self._store_list(await self._module.list())
+                except Exception:
+                    self._listed = True
+            pending = []
+            for key, future in batch.items():
+                if key in self._cache:
+                    if not future.done():
+                        future.set_result(self._cache[key])
+                else:
+                    pending.append((key, future))
+            self._misses += len(pending)
+            self.stats.individual_calls += len(pending)
+            values = await asyncio.gather(
+                *(self._module.get(key) for key, _ in pending), return_exceptions=True
+            )
+            for (key, future), value in zip(pending, values):
+                if future.done():
+                    continue
+                if isinstance(value, BaseException):
+                    future.set_exception(value)
+                else:
+                    self._cache[key] = value
+                    future.set_result(value)
+        except BaseException as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+
+
+class _BaseBatchLoader:
+    """
+    批量加载器的公共部分
+    """
+
+    _loader_class: Any = None
+
+    def __init__(
+        self,
+        client: Any,
+        window: float,
+        bulk_threshold: int,
+        documents_item_path: Optional[str],
+    ):
+        if bulk_threshold < 1:
+            raise ValueError("bulk_threshold 必须大于 0")
+        if window < 0:
+            raise ValueError("window 不能小于 0")
+        self.window = window
+        self.bulk_threshold = bulk_threshold
+        item_paths = {"documents": documents_item_path}
+        for name, keys in _RESOURCES.items():
+            setattr(
+                self,
+                name,
+                self._loader_class(getattr(client, name), keys, item_paths.get(name), self),
+            )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各资源的加载计数
+
+        Returns:
+            以资源名为键的字典，包括获取的次数（``loads``）、缓存命中次数、批次数、
+            列表请求次数（``bulk_calls``）和逐个获取的次数（``individual_calls``）
+        """
+        return {name: getattr(self, name).stats.snapshot() for name in _RESOURCES}
+
+    def clear(self) -> None:
+        """清空所有资源的缓存"""
+        for name in _RESOURCES:
+            getattr(self, name).clear()
+
+    def __enter__(self) -> Any:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.clear()
+
+
+class BatchLoader(_BaseBatchLoader):
+    """
+    同步客户端的批量加载器，通过 ``AnythingLLMClient.batch_loader()`` 创建
+
+    ``documents``、``workspaces`` 和 ``users`` 属性分别提供 ``get(id)``、
+    ``get_many(ids)``、``prime(id, value)`` 和 ``clear()``。多个线程同时调用 ``get``
+    时合并为一个批次；单个线程逐个获取时，累计逐个获取 ``bulk_threshold`` 次后改用
+    一次列表请求，之后的对象都从缓存返回。可以被多个线程共享。
+    """
+
+    _loader_class = _Loader
+
+    def __init__(
+        self,
+        client: Any,
+        window: float = 0.002,
+        bulk_threshold: int = 10,
+        documents_item_path: Optional[str] = None,
+    ):
+        """
+        初始化批量加载器
+
+        Args:
+            client: ``AnythingLLMClient`` 实例
+            window: 单个 ``get`` 等待其他线程加入批次的秒数，0 表示不等待
+            bulk_threshold: 批次中的 ID 数（加上本作用域中逐个获取的次数）达到该值时
+                改用列表请求
+            documents_item_path: 文档数组在 ``documents.list()`` 响应中的键路径，
+                None 表示第一个数组；服务端按文件夹返回文档树时可以使用
+                ``"localFiles.items.*.items"``
+        """
+        super().__init__(client, window, bulk_threshold, documents_item_path)
+
+
+class AsyncBatchLoader(_BaseBatchLoader):
+    """
+    异步客户端的批量加载器，通过 ``AsyncAnythingLLMClient.batch_loader()`` 创建
+
+    接口与 ``BatchLoader`` 相同，但 ``get`` 和 ``get_many`` 是协程：同一轮事件循环中
+    发起的 ``get``（例如 ``asyncio.gather`` 中的调用）合并为一个批次。只能在创建它的
+    事件循环中使用。
+    """
+
+    _loader_class = _AsyncLoader
+
+    def __init__(
+        self,
+        client: Any,
+        window: float = 0.0,
+        bulk_threshold: int = 10,
+        documents_item_path: Optional[str] = None,
+    ):
+        """
+        初始化批量加载器
+
+        Args:
+            client: ``AsyncAnythingLLMClient`` 实例
+            window: 收集批次的秒数，0 表示收集同一轮事件循环中的调用
+            bulk_threshold: 批次中的 ID 数（加上本作用域中逐个获取的次数）达到该值时
+                改用列表请求
+            documents_item_path: 文档数组在 ``documents.list()`` 响应中的键路径，
+                规则与 ``BatchLoader`` 相同
+        """
+        super().__init__(client, window, bulk_threshold, documents_item_path)
@@ -0,0 +1,92 @@
+"""
+异步模块
+
+大多数模块方法只是把 ``http_client`` 的返回值原样返回，搭配 ``AsyncHttpClient``
+时返回的就是协程，可以直接复用同步模块。这里只覆盖那些需要对响应做后处理
+或在请求结束后释放资源的方法。
+"""
+
+import os
+from typing import List, Optional, BinaryIO
+from .documents import DocumentsModule
+from .openai import OpenAIModule
+from ..types import Document, OpenAIModel, VectorStore
+
+
+class AsyncDocumentsModule(DocumentsModule):
+    """
+    处理 AnythingLLM 文档相关的 API（异步版本）
+    """
+
+    async def upload(
+        self,
+        file_path: str = None,
+        file_obj: BinaryIO = None,
+        add_to_workspaces: Optional[List[str]] = None,
+        folder_name: Optional[str] = None
+    ) -> Document:
+        """
+        上传文档
+
+        Args:
+            file_path: 文件路径
+            file_obj: 文件对象
+            add_to_workspaces: 要添加文档的工作区 slug 列表
+            folder_name: 目标文件夹名称
+
+        Returns:
+            上传的文档信息
+        """
+        if not file_path and not file_obj:
+            raise ValueError("必须提供 file_path 或 file_obj")
+
+        if file_path and not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        files = {}
+        data = {}
+
+        if file_path:
+            files["file"] = open(file_path, "rb")
+        elif file_obj:
+            files["file"] = file_obj
+
+        if add_to_workspaces:
+            data["addToWorkspaces"] = ",".join(add_to_workspaces)
+
+        endpoint = "/v1/document/upload"
+        if folder_name:
+            endpoint = f"/v1/document/upload/{folder_name}"
+
+        try:
+            return await self.http_client.post(endpoint, data=data, files=files)
+        finally:
+            # 如果我们打开了文件，确保关闭它
+            if file_path and "file" in files:
+                files["file"].close()
+
+
+class AsyncOpenAIModule(OpenAIModule):
+    """
+    处理 AnythingLLM OpenAI 兼容 API（异步版本）
+    """
+
+    async def list_models(self) -> List[OpenAIModel]:
+        """
+        获取所有可用的"模型"，实际上是可用于聊天的工作区
+
+        Returns:
+            模型列表
+        """
+        response = await self.http_client.get("/v1/openai/models")
+        return response.get("data", [])
+
+    async def list_vector_stores(self) -> List[VectorStore]:
+        """
+        获取所有向量数据库集合
+
+        Returns:
+            向量数据库集合列表
+        """
+        response = await self.http_client.get("/v1/openai/vector_stores")
+        return response.get("data", [])
@@ -2,7 +2,7 @@
 聊天模块
 """
 
-from typing import Dict, Any, List, Optional, cast
+from typing import Dict, Any, Iterator, List, Optional, cast
 from .base import BaseModule
 from ..types import ChatMessage, ChatThread
 
@@ -75,6 +75,30 @@ class ChatModule(BaseModule):
 
         return self.http_client.get(endpoint)
 
+    def iter_history(
+        self,
+        workspace_id: str,
+        thread_id: Optional[str] = None
+    ) -> Iterator[ChatMessage]:
+        """
+        边接收边逐条返回聊天历史
+
+        异步客户端返回异步迭代器，用 ``async for`` 遍历。
+
+        Args:
+            workspace_id: 工作区 ID 或 slug
+            thread_id: 对话线程 ID
+
+        Returns:
+            聊天记录的迭代器
+        """
+        endpoint = f"/v1/workspaces/{workspace_id}/chat-history"
+
+        if thread_id:
+            endpoint = f"{endpoint}/{thread_id}"
+
+        return self.http_client.iter_items(endpoint)
+
     def clear_history(
         self,
         workspace_id: str,
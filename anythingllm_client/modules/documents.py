@@ -3,7 +3,7 @@
 """
 
 import os
-from typing import Dict, Any, List, Optional, Union, BinaryIO, cast
+from typing import Dict, Any, Iterator, List, Optional, Union, BinaryIO, cast
 from .base import BaseModule
 from ..types import Document, DocumentFolder
 
@@ -22,6 +22,21 @@ class DocumentsModule(BaseModule):
         """
         return self.http_client.get("/v1/documents")
 
+    def iter_list(self, item_path: Optional[str] = None) -> Iterator[Document]:
+        """
+        边接收边逐个返回文档，不在内存中保留完整的文档列表
+
+        异步客户端返回异步迭代器，用 ``async for`` 遍历。
+
+        Args:
+            item_path: 文档数组在响应中的键路径，None 表示响应中的第一个数组；
+                服务端按文件夹返回文档树时可以使用 ``"localFiles.items.*.items"``
+
+        Returns:
+            文档的迭代器
+        """
+        return self.http_client.iter_items("/v1/documents", item_path=item_path)
+
     def get(self, document_id: str) -> Document:
         """
         获取特定文档的详细信息
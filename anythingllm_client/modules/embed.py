@@ -2,8 +2,9 @@
 嵌入模块
 """
 
-from typing import Dict, Any, List, Optional, cast
+from typing import Dict, Any, Iterable, List, Optional, cast
 from .base import BaseModule
+from ..codec import stream_iterators
 
 
 class EmbedModule(BaseModule):
@@ -23,14 +24,17 @@ class EmbedModule(BaseModule):
         """
         return self.http_client.post("/v1/embed", json_data={"text": text})
 
-    def get_batch_embeddings(self, texts: List[str]) -> Dict[str, Any]:
+    def get_batch_embeddings(self, texts: Iterable[str]) -> Dict[str, Any]:
         """
         批量获取文本嵌入向量
 
         Args:
-            texts: 要嵌入的文本列表
+            texts: 要嵌入的文本列表，或逐条产生文本的迭代器（请求体分块编码发送，
+                内存占用不随文本数增长）
 
         Returns:
             嵌入向量结果
         """
-        return self.http_client.post("/v1/embed/batch", json_data={"texts": texts})
+        return self.http_client.post(
+            "/v1/embed/batch", json_data=stream_iterators({"texts": texts})
+        )
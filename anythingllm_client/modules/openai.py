@@ -2,8 +2,9 @@
 OpenAI 兼容模块
 """
 
-from typing import Dict, Any, List, Optional, Union, cast
+from typing import Dict, Any, Iterable, List, Optional, Union, cast
 from .base import BaseModule
+from ..codec import stream_iterators
 from ..types import OpenAIModel, VectorStore
 
 
@@ -82,12 +83,12 @@ class OpenAIModule(BaseModule):
         response = self.http_client.get("/v1/openai/vector_stores")
         return response.get("data", [])
 
-    def create_embedding(self, input_text: Union[str, List[str]], model: Optional[str] = None) -> Dict[str, Any]:
+    def create_embedding(self, input_text: Union[str, Iterable[str]], model: Optional[str] = None) -> Dict[str, Any]:
         """
         创建嵌入向量
 
         Args:
-            input_text: 输入文本或文本列表
+            input_text: 输入文本、文本列表，或逐条产生文本的迭代器（请求体分块编码发送）
             model: 模型名称
 
         Returns:
@@ -100,4 +101,4 @@ class OpenAIModule(BaseModule):
         if model:
             data["model"] = model
 
-        return self.http_client.post("/v1/openai/embeddings", json_data=data)
+        return self.http_client.post("/v1/openai/embeddings", json_data=stream_iterators(data))
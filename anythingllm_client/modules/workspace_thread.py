@@ -2,7 +2,7 @@
 工作区线程模块
 """
 
-from typing import Dict, Any, List, Optional, Union, cast
+from typing import Dict, Any, Iterator, List, Optional, Union, cast
 from .base import BaseModule
 from ..types import ChatThread, ChatMessage
 
@@ -118,6 +118,23 @@ class WorkspaceThreadModule(BaseModule):
         """
         return self.http_client.get(f"/v1/workspace/{workspace_id}/thread/{thread_id}/messages")
 
+    def iter_thread_messages(self, workspace_id: str, thread_id: str) -> Iterator[ChatMessage]:
+        """
+        边接收边逐条返回线程的消息
+
+        异步客户端返回异步迭代器，用 ``async for`` 遍历。
+
+        Args:
+            workspace_id: 工作区 ID 或 slug
+            thread_id: 线程 ID
+
+        Returns:
+            消息的迭代器
+        """
+        return self.http_client.iter_items(
+            f"/v1/workspace/{workspace_id}/thread/{thread_id}/messages"
+        )
+
     def send_message(
         self,
         workspace_id: str,
@@ -2,8 +2,9 @@
 工作区管理模块
 """
 
-from typing import Dict, Any, List, Optional, Union, cast
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union, cast
 from .base import BaseModule
+from ..codec import stream_iterators
 from ..types import Workspace, Document
 
 
@@ -141,20 +142,35 @@ class WorkspacesModule(BaseModule):
         """
         return self.http_client.get(f"/v1/workspaces/{workspace_id}/documents")
 
-    def add_documents(self, workspace_id: str, document_ids: List[str]) -> Dict[str, Any]:
+    def iter_documents(self, workspace_id: str) -> Iterator[Document]:
+        """
+        边接收边逐个返回工作区中的文档
+
+        异步客户端返回异步迭代器，用 ``async for`` 遍历。
+
+        Args:
+            workspace_id: 工作区 ID 或 slug
+
+        Returns:
+            文档的迭代器
+        """
+        return self.http_client.iter_items(f"/v1/workspaces/{workspace_id}/documents")
+
+    def add_documents(self, workspace_id: str, document_ids: Iterable[str]) -> Dict[str, Any]:
         """
         向工作区添加文档
 
         Args:
             workspace_id: 工作区 ID 或 slug
-            document_ids: 要添加的文档 ID 列表
+            document_ids: 要添加的文档 ID 列表，或逐个产生文档 ID 的迭代器（请求体
+                分块编码发送）
 
         Returns:
             操作结果
         """
         return self.http_client.post(
             f"/v1/workspaces/{workspace_id}/documents",
-            json_data={"documents": document_ids}
+            json_data=stream_iterators({"documents": document_ids})
         )
 
     def remove_document(self, workspace_id: str, document_id: str) -> Dict[str, Any]:
@@ -0,0 +1,237 @@
+"""
+客户端限流模块
+
+``RateLimiter`` 为每个端点族（见 ``endpoints.endpoint_family``）维护一个令牌桶，
+请求发出前取得一个令牌。服务端返回 429 时该端点族的速率按比例降低（乘性减），
+之后随时间缓慢恢复到设定的速率（加性增）；响应带有 ``Retry-After`` 时，该端点族
+在指定时间内暂停发放令牌。这样批量任务的请求速率贴近服务端的实际上限，而不会
+持续超出导致包括交互式对话在内的所有请求都收到 429。
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .exceptions import RateLimitError
+
+
+class _Bucket:
+    """
+    单个端点族的令牌桶，由 ``RateLimiter`` 的锁保护
+    """
+
+    __slots__ = (
+        "rate", "tokens", "updated", "paused_until", "last_decrease",
+        "throttled", "waited", "rejected",
+    )
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = now
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.waited = 0.0
+        self.rejected = 0
+
+
+class RateLimiter:
+    """
+    按端点族分别限流的自适应令牌桶，可以被多个线程和多个客户端共享
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: Optional[float] = None,
+        min_rate: float = 0.5,
+        decrease_factor: float = 0.5,
+        recovery_time: float = 60.0,
+        max_wait: Optional[float] = None,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        """
+        初始化限流器
+
+        Args:
+            rate: 每个端点族每秒最多发出的请求数
+            burst: 令牌桶容量，即允许的突发请求数，None 表示与 ``rate`` 相同
+            min_rate: 收到 429 后速率最低降到的值
+            decrease_factor: 每次收到 429 时速率乘以该系数
+            recovery_time: 速率从 0 恢复到 ``rate`` 所需的秒数
+            max_wait: 等待令牌的最长秒数，超过时抛出 ``RateLimitError``；
+                None 表示一直等待，0 表示拿不到令牌时立即失败
+            overrides: 按端点族覆盖 ``rate``、``burst``、``min_rate``，
+                例如 ``{"embed": {"rate": 2}}``
+        """
+        self._defaults = {
+            "rate": rate,
+            "burst": burst,
+            "min_rate": min_rate,
+        }
+        self._overrides = overrides or {}
+        for family, options in self._overrides.items():
+            unknown = set(options) - set(self._defaults)
+            if unknown:
+                raise ValueError(f"端点族 {family} 的限流参数无效: {', '.join(sorted(unknown))}")
+        self.decrease_factor = decrease_factor
+        self.recovery_time = recovery_time
+        self.max_wait = max_wait
+        self._configs: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def _config(self, family: str) -> Dict[str, float]:
+        """获取端点族的限流参数，调用方需持有锁"""
+        config = self._configs.get(family)
+        if config is None:
+            config = dict(self._defaults, **self._overrides.get(family, {}))
+            if config["burst"] is None:
+                config["burst"] = max(1.0, config["rate"])
+            self._configs[family] = config
+        return config
+
+    def _bucket(self, family: str, now: float) -> _Bucket:
+        """获取端点族的令牌桶并补充令牌，调用方需持有锁"""
+        config = self._config(family)
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            bucket = self._buckets[family] = _Bucket(config["rate"], config["burst"], now)
+            return bucket
+
+        elapsed = now - bucket.updated
+        if elapsed <= 0 or now < bucket.paused_until:
+            # Retry-After 指定的暂停期间不补充令牌，也不恢复速率
+            bucket.updated = max(bucket.updated, now)
+            return bucket
+        bucket.updated = now
+        if bucket.rate < config["rate"]:
+            bucket.rate = min(
+                config["rate"], bucket.rate + config["rate"] * elapsed / self.recovery_time
+            )
+        bucket.tokens = min(config["burst"], bucket.tokens + bucket.rate * elapsed)
+        return bucket
+
+    def reserve(self, family: str, max_wait: Optional[float] = None) -> float:
+        """
+        预订一个令牌
+
+        令牌按预订顺序发放：令牌不足时预订仍然成功，返回需要等待的秒数，调用方
+        等待之后再发出请求。
+
+        Args:
+            family: 端点族
+            max_wait: 最长等待秒数，None 表示使用限流器的 ``max_wait``
+
+        Returns:
+            发出请求前需要等待的秒数
+
+        Raises:
+            RateLimitError: 需要等待的时间超过 ``max_wait`` 时
+        """
+        if max_wait is None:
+            max_wait = self.max_wait
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(family, now)
+            wait = max(0.0, bucket.paused_until - now)
+            if bucket.tokens < 1:
+                wait += (1 - bucket.tokens) / bucket.rate
+            if max_wait is not None and wait > max_wait:
+                bucket.rejected += 1
+                raise RateLimitError(family, wait)
+            bucket.tokens -= 1
+            if wait > 0:
+                bucket.throttled += 1
+                bucket.waited += wait
+            return wait
+
+    def refund(self, family: str) -> None:
+        """
+        归还一个已预订但没有使用的令牌
+
+        等待令牌期间请求被取消时调用，避免令牌白白消耗。
+
+        Args:
+            family: 端点族
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(family, now)
+            bucket.tokens = min(self._config(family)["burst"], bucket.tokens + 1)
+
+    def acquire(self, family: str, max_wait: Optional[float] = None) -> float:
+        """
+        取得一个令牌，必要时阻塞等待
+
+        Args:
+            family: 端点族
+            max_wait: 最长等待秒数，None 表示使用限流器的 ``max_wait``
+
+        Returns:
+            实际等待的秒数
+
+        Raises:
+            RateLimitError: 需要等待的时间超过 ``max_wait`` 时
+        """
+        wait = self.reserve(family, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_response(
+        self, family: str, status_code: int, retry_after: Optional[float] = None
+    ) -> None:
+        """
+        根据响应调整端点族的速率
+
+        Args:
+            family: 端点族
+            status_code: 响应状态码
+            retry_after: 响应头 Retry-After 指定的秒数
+        """
+        if status_code != 429 and retry_after is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(family, now)
+            if retry_after is not None:
+                bucket.paused_until = max(bucket.paused_until, now + retry_after)
+            if status_code == 429:
+                # 同一批在途请求的 429 只降速一次
+                if now - bucket.last_decrease >= 1 / bucket.rate:
+                    bucket.rate = max(
+                        self._config(family)["min_rate"], bucket.rate * self.decrease_factor
+                    )
+                    bucket.last_decrease = now
+                bucket.tokens = min(bucket.tokens, 0.0)
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁并清空令牌桶"""
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点族的限流状态
+
+        Returns:
+            以端点族为键的字典，包含当前速率、设定速率、剩余令牌数、剩余暂停秒数、
+            等待过的请求数、累计等待秒数以及被拒绝的请求数
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = {}
+            for family in list(self._buckets):
+                bucket = self._bucket(family, now)
+                states[family] = {
+                    "rate": bucket.rate,
+                    "configured_rate": self._config(family)["rate"],
+                    "tokens": bucket.tokens,
+                    "paused_for": max(0.0, bucket.paused_until - now),
+                    "throttled": bucket.throttled,
+                    "waited": bucket.waited,
+                    "rejected": bucket.rejected,
+                }
+            return states
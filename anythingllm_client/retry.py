@@ -0,0 +1,194 @@
+"""
+重试策略模块
+
+``HttpClient`` 和 ``AsyncHttpClient`` 按 ``RetryPolicy`` 重试失败的请求：指数退避
+加完全抖动（full jitter），避免大量客户端在同一时刻重试；服务端返回
+``Retry-After`` 时按其指定的时间等待。
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+# 幂等方法，请求失败后可以安全地重新发送
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    - 幂等方法（GET、PUT、DELETE 等）在连接错误、超时以及 ``statuses`` 中的
+      状态码上重试
+    - 其他方法（如 POST）只在请求确定没有发出时重试，即建立连接失败
+      （``ConnectError``），避免服务端重复执行
+    """
+
+    def __init__(
+        self,
+        total: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        statuses: Iterable[int] = (429, 502, 503, 504),
+        methods: Iterable[str] = IDEMPOTENT_METHODS,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 60.0,
+    ):
+        """
+        初始化重试策略
+
+        Args:
+            total: 最多重试次数，0 表示不重试
+            backoff_base: 第一次重试的退避上限（秒），之后每次翻倍
+            backoff_max: 退避时间上限（秒）
+            statuses: 需要重试的 HTTP 状态码
+            methods: 在任何可重试错误上都重试的 HTTP 方法
+            respect_retry_after: 是否按 Retry-After 响应头等待
+            max_retry_after: Retry-After 超过该秒数时不再重试，直接抛出错误
+        """
+        self.total = total
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, retry_number: int) -> float:
+        """
+        计算第 retry_number 次重试前的等待时间（完全抖动）
+
+        Args:
+            retry_number: 重试序号，从 1 开始
+
+        Returns:
+            等待秒数
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (retry_number - 1)))
+        return random.uniform(0, ceiling)
+
+    def delay_for_status(
+        self,
+        method: str,
+        status_code: int,
+        headers: Optional[Mapping[str, str]],
+        retry_number: int,
+    ) -> Optional[float]:
+        """
+        判断响应状态码是否需要重试
+
+        Args:
+            method: HTTP 方法
+            status_code: 响应状态码
+            headers: 响应头
+            retry_number: 即将进行的重试序号，从 1 开始
+
+        Returns:
+            重试前的等待秒数，不重试时返回 None
+        """
+        if (
+            retry_number > self.total
+            or status_code not in self.statuses
+            or method not in self.methods
+        ):
+            return None
+        if self.respect_retry_after and headers is not None:
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(retry_number)
+
+    def delay_for_error(
+        self, method: str, sent: bool, retry_number: int
+    ) -> Optional[float]:
+        """
+        判断传输层错误是否需要重试
+
+        Args:
+            method: HTTP 方法
+            sent: 请求是否可能已经发出
+            retry_number: 即将进行的重试序号，从 1 开始
+
+        Returns:
+            重试前的等待秒数，不重试时返回 None
+        """
+        if retry_number > self.total:
+            return None
+        if sent and method not in self.methods:
+            return None
+        return self.backoff(retry_number)
+
+
+class RetryStats:
+    """
+    线程安全的重试计数
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retried_requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.by_reason: Dict[str, int] = {}
+
+    def record_retry(self, retry_number: int, reason: str) -> None:
+        """
+        记录一次重试
+
+        Args:
+            retry_number: 重试序号，从 1 开始
+            reason: 重试原因，状态码或异常类名
+        """
+        with self._lock:
+            self.retries += 1
+            if retry_number == 1:
+                self.retried_requests += 1
+            self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def record_exhausted(self) -> None:
+        """记录一次重试后仍然失败的请求"""
+        with self._lock:
+            self.exhausted += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取计数快照
+
+        Returns:
+            包含重试过的请求数、重试总次数、重试后仍失败的请求数以及按原因统计的字典
+        """
+        with self._lock:
+            return {
+                "retried_requests": self.retried_requests,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "by_reason": dict(self.by_reason),
+            }
@@ -0,0 +1,250 @@
+"""
+请求调度模块
+
+``RequestScheduler`` 把同一个客户端的请求分为若干优先级通道（默认 ``interactive``、
+``default``、``bulk``），限制所有通道合计的在途请求数：
+
+- 预留名额（bulkhead）：每个通道可以预留若干名额，只供本通道使用，批量上传占满
+  共享名额时交互式对话仍然可以立即发出
+- 上限：通道可以设置最多占用的名额数，避免批量任务独占共享名额
+- 加权出队：名额释放时按各通道的权重（平滑加权轮询）在有请求排队的通道之间分配，
+  权重高的通道更快得到名额，权重低的通道也不会饿死
+
+排队可以设置超时（通常是请求剩余的时间预算），超时的请求移出队列并抛出
+``DeadlineExceededError``，不会发出。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional
+
+from .exceptions import DeadlineExceededError
+
+INTERACTIVE = "interactive"
+DEFAULT = "default"
+BULK = "bulk"
+
+_DEFAULT_LANES = {
+    INTERACTIVE: {"reserved": 2, "weight": 8},
+    DEFAULT: {"reserved": 0, "weight": 4},
+    BULK: {"reserved": 0, "weight": 1},
+}
+
+
+class _Lane:
+    """
+    单个优先级通道的状态，由 ``RequestScheduler`` 的锁保护
+    """
+
+    __slots__ = (
+        "reserved", "limit", "weight", "current", "in_flight", "waiters",
+        "completed", "queued_total", "waited", "timed_out",
+    )
+
+    def __init__(self, reserved: int, limit: Optional[int], weight: int):
+        self.reserved = reserved
+        self.limit = limit
+        self.weight = weight
+        # 平滑加权轮询的当前权重
+        self.current = 0
+        self.in_flight = 0
+        self.waiters: Deque[threading.Event] = deque()
+        self.completed = 0
+        self.queued_total = 0
+        self.waited = 0.0
+        self.timed_out = 0
+
+
+class RequestScheduler:
+    """
+    按优先级通道分配在途名额的请求调度器，可以被多个线程共享
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        lanes: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    ):
+        """
+        初始化请求调度器
+
+        Args:
+            max_concurrency: 所有通道合计的最大在途请求数，通常不大于客户端的
+                ``pool_maxsize``
+            lanes: 各通道的配置，键为通道名，值可以包含 ``reserved``（预留名额数，
+                默认 0）、``limit``（最多占用的名额数，默认不限制）和 ``weight``
+                （出队权重，默认 1）；None 表示使用默认的 ``interactive``（预留 2，
+                权重 8）、``default``（权重 4）和 ``bulk``（权重 1）
+
+        Raises:
+            ValueError: 通道配置无效或预留名额合计超过 max_concurrency 时
+        """
+        lanes = _DEFAULT_LANES if lanes is None else lanes
+        if DEFAULT not in lanes:
+            raise ValueError(f"通道配置必须包含 {DEFAULT}")
+        self.max_concurrency = max_concurrency
+        self._lanes: Dict[str, _Lane] = {}
+        for name, options in lanes.items():
+            unknown = set(options) - {"reserved", "limit", "weight"}
+            if unknown:
+                raise ValueError(f"通道 {name} 的参数无效: {', '.join(sorted(unknown))}")
+            self._lanes[name] = _Lane(
+                options.get("reserved", 0), options.get("limit"), options.get("weight", 1)
+            )
+        reserved = sum(lane.reserved for lane in self._lanes.values())
+        if reserved > max_concurrency:
+            raise ValueError(f"预留名额合计 {reserved} 超过 max_concurrency {max_concurrency}")
+        self._shared = max_concurrency - reserved
+        self._shared_in_use = 0
+        self._lock = threading.Lock()
+
+    def _lane(self, priority: Optional[str]) -> _Lane:
+        """获取通道，None 表示 ``default``"""
+        lane = self._lanes.get(priority or DEFAULT)
+        if lane is None:
+            raise ValueError(f"未知的优先级: {priority}，可选值: {', '.join(self._lanes)}")
+        return lane
+
+    def validate(self, priority: Optional[str]) -> None:
+        """
+        检查优先级是否有效
+
+        Args:
+            priority: 优先级通道，None 表示 ``default``
+
+        Raises:
+            ValueError: 优先级未知时
+        """
+        self._lane(priority)
+
+    def _eligible(self, lane: _Lane) -> bool:
+        """通道此时能否占用一个名额，调用方需持有锁"""
+        if lane.limit is not None and lane.in_flight >= lane.limit:
+            return False
+        return lane.in_flight < lane.reserved or self._shared_in_use < self._shared
+
+    def _take(self, lane: _Lane) -> None:
+        """为通道占用一个名额，优先使用预留名额，调用方需持有锁"""
+        if lane.in_flight >= lane.reserved:
+            self._shared_in_use += 1
+        lane.in_flight += 1
+
+    def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        """
+        占用一个在途名额，必要时排队等待
+
+        Args:
+            priority: 优先级通道，None 表示 ``default``
+            timeout: 最长排队秒数，通常是请求剩余的时间预算，None 表示一直等待
+
+        Raises:
+            ValueError: 优先级未知时
+            DeadlineExceededError: 排队超时时，请求已移出队列
+        """
+        lane = self._lane(priority)
+        with self._lock:
+            if not lane.waiters and self._eligible(lane):
+                self._take(lane)
+                return
+            event = threading.Event()
+            lane.waiters.append(event)
+            lane.queued_total += 1
+        started = time.monotonic()
+        acquired = event.wait(timeout)
+        waited = time.monotonic() - started
+        with self._lock:
+            lane.waited += waited
+            if acquired:
+                return
+            try:
+                lane.waiters.remove(event)
+            except ValueError:
+                # 超时的同时被分配了名额
+                return
+            lane.timed_out += 1
+        raise DeadlineExceededError()
+
+    def try_acquire(self, priority: Optional[str] = None) -> bool:
+        """
+        不排队地占用一个在途名额，用于对冲等可以放弃的请求
+
+        Args:
+            priority: 优先级通道，None 表示 ``default``
+
+        Returns:
+            占用了名额时返回 True，通道没有可用名额或有请求在排队时返回 False
+        """
+        lane = self._lane(priority)
+        with self._lock:
+            if lane.waiters or not self._eligible(lane):
+                return False
+            self._take(lane)
+            return True
+
+    def release(self, priority: Optional[str] = None) -> None:
+        """
+        归还在途名额，并把空出的名额按权重分配给排队的通道
+
+        Args:
+            priority: ``acquire`` 时使用的优先级通道
+        """
+        lane = self._lane(priority)
+        with self._lock:
+            lane.in_flight -= 1
+            lane.completed += 1
+            if lane.in_flight >= lane.reserved:
+                self._shared_in_use -= 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """按平滑加权轮询把空闲名额分配给排队的通道，调用方需持有锁"""
+        while True:
+            candidates = [
+                lane for lane in self._lanes.values() if lane.waiters and self._eligible(lane)
+            ]
+            if not candidates:
+                return
+            total = 0
+            best = None
+            for lane in candidates:
+                lane.current += lane.weight
+                total += lane.weight
+                if best is None or lane.current > best.current:
+                    best = lane
+            best.current -= total
+            self._take(best)
+            best.waiters.popleft().set()
+
+    def after_fork(self) -> None:
+        """在 fork 出的子进程中重建锁并清空在途和排队状态"""
+        self._lock = threading.Lock()
+        self._shared_in_use = 0
+        for lane in self._lanes.values():
+            lane.in_flight = 0
+            lane.waiters = deque()
+            lane.current = 0
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各通道的调度状态
+
+        Returns:
+            以通道名为键的字典，包含预留名额数、上限、权重、在途请求数、排队请求数、
+            完成的请求数、排过队的请求数、累计排队秒数以及排队超时的请求数
+        """
+        with self._lock:
+            return {
+                name: {
+                    "reserved": lane.reserved,
+                    "limit": lane.limit,
+                    "weight": lane.weight,
+                    "in_flight": lane.in_flight,
+                    "queued": len(lane.waiters),
+                    "completed": lane.completed,
+                    "queued_total": lane.queued_total,
+                    "waited": lane.waited,
+                    "timed_out": lane.timed_out,
+                }
+                for name, lane in self._lanes.items()
+            }
@@ -0,0 +1,369 @@
+"""
+跨进程共享的限流模块
+
+同一台主机上的多个工作进程各自持有 ``HttpClient`` 时，进程内的 ``RateLimiter``
+无法限制总速率。``SharedLimiter`` 把令牌桶和在途请求表放在一个内存映射文件中，
+用文件锁（``fcntl.flock``）互斥，所有指向同一个服务端的客户端共用同一份预算：
+
+- 请求速率：所有进程合计每秒最多发出 ``rate`` 个请求
+- 在途请求数：所有进程合计最多同时有 ``max_in_flight`` 个请求未完成
+
+在途请求表的每一项记录占用它的进程号，进程异常退出后它占用的名额会被其他进程
+回收。文件锁依赖 ``fcntl``，仅支持 POSIX 系统。
+"""
+
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .exceptions import RateLimitError
+
+# 文件头：魔数、版本、令牌数、上次补充令牌的时间（time.monotonic，主机内各进程一致）
+_HEADER = struct.Struct("<4sIdd")
+_SLOT = struct.Struct("<i")
+_MAGIC = b"ALLM"
+_VERSION = 1
+
+# 在途请求数已满时轮询空闲名额的间隔（秒）
+_POLL_MIN = 0.001
+_POLL_MAX = 0.05
+
+
+class SharedLimiter:
+    """
+    同一主机上多个进程共享的请求速率和在途请求数预算
+
+    客户端传入 ``shared_limiter`` 后，请求发出前先取得令牌和在途名额，请求结束后
+    归还名额。未指定 ``key`` 时按客户端的服务端地址生成，因此所有指向同一个服务端
+    的客户端自动共用一份预算。各进程应使用相同的参数。
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        key: Optional[str] = None,
+        directory: Optional[str] = None,
+    ):
+        """
+        初始化共享限流器
+
+        Args:
+            rate: 所有进程合计每秒最多发出的请求数，None 表示不限制速率
+            burst: 令牌桶容量，None 表示与 ``rate`` 相同
+            max_in_flight: 所有进程合计最多同时未完成的请求数，None 表示不限制
+            max_wait: 等待令牌或在途名额的最长秒数，超过时抛出 ``RateLimitError``，
+                None 表示一直等待
+            key: 共享预算的名称，None 表示使用客户端的服务端地址
+            directory: 存放共享文件的目录，None 表示系统临时目录
+
+        Raises:
+            RuntimeError: 当前平台不支持 ``fcntl`` 时
+        """
+        try:
+            import fcntl
+        except ImportError as e:
+            raise RuntimeError("SharedLimiter 依赖 fcntl，仅支持 POSIX 系统") from e
+
+        self._fcntl = fcntl
+        self.rate = rate
+        self.burst = burst if burst is not None else (max(1.0, rate) if rate else None)
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.key = key
+        self.directory = directory or tempfile.gettempdir()
+        self.path: Optional[str] = None
+        self._size = _HEADER.size + _SLOT.size * (max_in_flight or 0)
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._pid = os.getpid()
+
+    def attach(self, base_url: str) -> None:
+        """
+        绑定到服务端地址并打开共享文件，由 ``HttpClient`` 在初始化时调用
+
+        Args:
+            base_url: 服务端地址，``key`` 为 None 时用于生成共享文件名
+        """
+        if self.path is not None:
+            return
+        key = self.key if self.key is not None else base_url
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(self.directory, f"anythingllm-limit-{digest}")
+        self._open()
+
+    def _open(self) -> None:
+        """打开并映射共享文件，文件不存在或未初始化时初始化"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._fcntl.flock(fd, self._fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < self._size:
+                    os.ftruncate(fd, self._size)
+                mapped = mmap.mmap(fd, self._size)
+                magic, version, _, _ = _HEADER.unpack_from(mapped, 0)
+                if magic != _MAGIC or version != _VERSION:
+                    _HEADER.pack_into(
+                        mapped, 0, _MAGIC, _VERSION, self.burst or 0.0, time.monotonic()
+                    )
+            finally:
+                self._fcntl.flock(fd, self._fcntl.LOCK_UN)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._map = mapped
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self) -> Iterator[mmap.mmap]:
+        """
+        同时持有线程锁和文件锁
+
+        同一进程内的线程共用一个文件描述符，``flock`` 无法在它们之间互斥，
+        因此先取得线程锁。
+        """
+        with self._lock:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+    def _reserve_token(self, max_wait: Optional[float]) -> float:
+        """
+        预订一个令牌
+
+        Args:
+            max_wait: 最长等待秒数
+
+        Returns:
+            发出请求前需要等待的秒数
+
+        Raises:
+            RateLimitError: 需要等待的时间超过 max_wait 时
+        """
+        with self._locked() as mapped:
+            _, _, tokens, updated = _HEADER.unpack_from(mapped, 0)
+            now = time.monotonic()
+            if now > updated:
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = (1 - tokens) / self.rate if tokens < 1 else 0.0
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitError("shared", wait)
+            _HEADER.pack_into(mapped, 0, _MAGIC, _VERSION, tokens - 1, now)
+        return wait
+
+    def _refund_token(self) -> None:
+        """归还一个已预订但没有使用的令牌，用于等待期间被取消的请求"""
+        with self._locked() as mapped:
+            _, _, tokens, updated = _HEADER.unpack_from(mapped, 0)
+            now = time.monotonic()
+            if now > updated:
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            tokens = min(self.burst, tokens + 1)
+            _HEADER.pack_into(mapped, 0, _MAGIC, _VERSION, tokens, now)
+
+    def _try_enter(self) -> Optional[int]:
+        """
+        尝试占用一个在途名额
+
+        Returns:
+            名额序号，没有空闲名额时返回 None
+        """
+        pid = os.getpid()
+        with self._locked() as mapped:
+            owners = []
+            for index in range(self.max_in_flight):
+                offset = _HEADER.size + index * _SLOT.size
+                (owner,) = _SLOT.unpack_from(mapped, offset)
+                if owner == 0:
+                    _SLOT.pack_into(mapped, offset, pid)
+                    return index
+                owners.append((index, offset, owner))
+            # 没有空闲名额时回收已退出进程占用的名额
+            for index, offset, owner in owners:
+                if owner != pid and not _process_alive(owner):
+                    _SLOT.pack_into(mapped, offset, pid)
+                    return index
+        return None
+
+    def _deadline(self, max_wait: Optional[float]) -> Optional[float]:
+        """计算等待在途名额的截止时间"""
+        if max_wait is None:
+            max_wait = self.max_wait
+        return None if max_wait is None else time.monotonic() + max_wait
+
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[int]:
+        """
+        取得一个令牌和一个在途名额，必要时阻塞等待
+
+        Args:
+            max_wait: 最长等待秒数，None 表示使用 ``max_wait`` 参数
+
+        Returns:
+            在途名额序号，需要传给 ``release``；未限制在途请求数时返回 None
+
+        Raises:
+            RateLimitError: 等待时间超过 max_wait 时
+        """
+        deadline = self._deadline(max_wait)
+        if self.rate:
+            wait = self._reserve_token(_remaining(deadline))
+            if wait > 0:
+                time.sleep(wait)
+        if not self.max_in_flight:
+            return None
+        poll = _POLL_MIN
+        while True:
+            slot = self._try_enter()
+            if slot is not None:
+                return slot
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                raise RateLimitError("shared", poll)
+            time.sleep(poll if remaining is None else min(poll, remaining))
+            poll = min(poll * 2, _POLL_MAX)
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> Optional[int]:
+        """
+        ``acquire`` 的协程版本，等待时不阻塞事件循环
+
+        Args:
+            max_wait: 最长等待秒数，None 表示使用 ``max_wait`` 参数
+
+        Returns:
+            在途名额序号，未限制在途请求数时返回 None
+        """
+        deadline = self._deadline(max_wait)
+        if self.rate:
+            wait = self._reserve_token(_remaining(deadline))
+            if wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    self._refund_token()
+                    raise
+        if not self.max_in_flight:
+            return None
+        poll = _POLL_MIN
+        while True:
+            slot = self._try_enter()
+            if slot is not None:
+                return slot
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                raise RateLimitError("shared", poll)
+            await asyncio.sleep(poll if remaining is None else min(poll, remaining))
+            poll = min(poll * 2, _POLL_MAX)
+
+    def try_acquire(self) -> Tuple[bool, Optional[int]]:
+        """
+        不等待地取得一个令牌和一个在途名额，用于对冲等可以放弃的请求
+
+        Returns:
+            (是否取得, 在途名额序号)，名额序号需要传给 ``release``，未限制在途请求数
+            或没有取得时为 None
+        """
+        slot = None
+        if self.max_in_flight:
+            slot = self._try_enter()
+            if slot is None:
+                return False, None
+        if self.rate:
+            try:
+                self._reserve_token(0)
+            except RateLimitError:
+                self.release(slot)
+                return False, None
+        return True, slot
+
+    def release(self, slot: Optional[int]) -> None:
+        """
+        归还在途名额
+
+        Args:
+            slot: ``acquire`` 返回的名额序号
+        """
+        if slot is None:
+            return
+        with self._locked() as mapped:
+            _SLOT.pack_into(mapped, _HEADER.size + slot * _SLOT.size, 0)
+
+    def after_fork(self) -> None:
+        """
+        在 fork 出的子进程中重新打开共享文件
+
+        子进程继承的文件描述符与父进程共享同一个打开的文件，``flock`` 无法在两者
+        之间互斥。多个客户端共用一个限流器时只重新打开一次。
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+            self._open()
+
+    def close(self) -> None:
+        """关闭共享文件，共享文件本身保留，供其他进程继续使用"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+                self._map = None
+                self._fd = None
+                self.path = None
+
+    def state(self) -> Dict[str, Any]:
+        """
+        获取共享预算的当前状态
+
+        Returns:
+            包含共享文件路径、速率、剩余令牌数、在途请求数及其上限的字典
+        """
+        if self._map is None:
+            return {}
+        with self._locked() as mapped:
+            _, _, tokens, updated = _HEADER.unpack_from(mapped, 0)
+            in_flight = sum(
+                1
+                for index in range(self.max_in_flight or 0)
+                if _SLOT.unpack_from(mapped, _HEADER.size + index * _SLOT.size)[0]
+            )
+        if self.rate:
+            tokens = min(self.burst, tokens + max(0.0, time.monotonic() - updated) * self.rate)
+        return {
+            "path": self.path,
+            "rate": self.rate,
+            "tokens": tokens if self.rate else None,
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """距离截止时间的剩余秒数"""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _process_alive(pid: int) -> bool:
+    """判断进程是否仍在运行"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
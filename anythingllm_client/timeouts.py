@@ -0,0 +1,215 @@
+"""
+超时配置模块
+
+- ``Timeout``: 单个端点族的超时配置，分别限制建立连接、读取响应以及整个请求
+  （包括重试和重试前的等待）的时间
+- ``TIMEOUT_PROFILES``: 按端点族区分的推荐配置，健康检查等轻量接口很快失败，
+  需要调用 LLM 的对话接口允许较长的读取时间
+- ``deadline``: 上下文管理器，其中的所有请求共用一个时间预算。组合操作（创建线程、
+  发送消息、获取历史）中任何一步都只能使用剩余的时间，预算用完后立即抛出
+  ``DeadlineExceededError``。预算保存在 ``contextvars`` 中，对线程和协程都有效
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+# 当前上下文的截止时间（time.monotonic），None 表示没有截止时间
+_deadline: ContextVar[Optional[float]] = ContextVar("anythingllm_deadline", default=None)
+
+
+class Timeout:
+    """
+    超时配置
+    """
+
+    __slots__ = ("connect", "read", "total")
+
+    def __init__(
+        self,
+        connect: Optional[float] = None,
+        read: Optional[float] = None,
+        total: Optional[float] = None,
+    ):
+        """
+        初始化超时配置
+
+        Args:
+            connect: 建立连接的超时时间（秒），None 表示使用客户端的 ``timeout``
+            read: 等待响应数据的超时时间（秒），None 表示使用客户端的 ``timeout``
+            total: 整个请求的时间上限（秒），包括重试和重试前的等待，None 表示不限制
+        """
+        self.connect = connect
+        self.read = read
+        self.total = total
+
+    def __repr__(self) -> str:
+        return f"Timeout(connect={self.connect}, read={self.read}, total={self.total})"
+
+
+# 按端点族区分的推荐超时配置，通过客户端的 timeouts 参数启用
+TIMEOUT_PROFILES: Dict[str, Timeout] = {
+    "system": Timeout(connect=3, read=10, total=15),
+    "auth": Timeout(connect=3, read=10, total=15),
+    "chat": Timeout(connect=5, read=120, total=300),
+    "embed": Timeout(connect=5, read=60, total=120),
+    "documents": Timeout(connect=5, read=300, total=600),
+}
+
+
+def resolve_timeouts(
+    timeout: Optional[float], profiles: Optional[Dict[str, Timeout]]
+) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+    """
+    把超时配置展开为各端点族的 (连接, 读取, 总时间)
+
+    Args:
+        timeout: 客户端的默认超时时间（秒）
+        profiles: 按端点族覆盖的超时配置，``default`` 键作用于其余端点族
+
+    Returns:
+        以端点族为键的字典，``default`` 键总是存在
+    """
+    profiles = profiles or {}
+    base = profiles.get("default", Timeout())
+    default = (
+        base.connect if base.connect is not None else timeout,
+        base.read if base.read is not None else timeout,
+        base.total,
+    )
+    resolved = {"default": default}
+    for family, profile in profiles.items():
+        resolved[family] = (
+            profile.connect if profile.connect is not None else default[0],
+            profile.read if profile.read is not None else default[1],
+            profile.total if profile.total is not None else default[2],
+        )
+    return resolved
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    在上下文中设置时间预算，其中发出的所有请求共用该预算
+
+    嵌套使用时以较早的截止时间为准。
+
+    Args:
+        seconds: 预算秒数
+
+    Examples:
+        >>> with deadline(30):
+        ...     thread = client.workspace_thread.create_thread("ws", "客服会话")
+        ...     client.workspace_thread.send_message("ws", thread["id"], "你好")
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current < expires:
+        expires = current
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """
+    获取当前上下文的截止时间
+
+    Returns:
+        ``time.monotonic()`` 时间，没有设置预算时返回 None
+    """
+    return _deadline.get()
+
+
+def request_deadline(total: Optional[float]) -> Optional[float]:
+    """
+    计算一次请求（包括重试）的截止时间
+
+    Args:
+        total: 端点族的总时间上限（秒），None 表示不限制
+
+    Returns:
+        上下文截止时间与 ``total`` 中较早的一个，都没有时返回 None
+    """
+    expires = _deadline.get()
+    if total is not None:
+        own = time.monotonic() + total
+        if expires is None or own < expires:
+            expires = own
+    return expires
+
+
+def budget_timeouts(
+    connect: Optional[float], read: Optional[float], expires: Optional[float]
+) -> Optional[Tuple[Optional[float], Optional[float]]]:
+    """
+    用剩余的时间预算限制连接超时和读取超时
+
+    Args:
+        connect: 连接超时（秒）
+        read: 读取超时（秒）
+        expires: 截止时间，None 表示没有截止时间
+
+    Returns:
+        (连接超时, 读取超时)，预算已经用完时返回 None
+    """
+    if expires is None:
+        return connect, read
+    left = expires - time.monotonic()
+    if left <= 0:
+        return None
+    return (
+        left if connect is None else min(connect, left),
+        left if read is None else min(read, left),
+    )
+
+
+def budget_wait(
+    wait: Optional[float], expires: Optional[float]
+) -> Tuple[Optional[float], bool]:
+    """
+    用剩余的时间预算限制排队（限流令牌、在途名额）的等待时间
+
+    Args:
+        wait: 排队的最长秒数，None 表示不限制
+        expires: 截止时间，None 表示没有截止时间
+
+    Returns:
+        (最长等待秒数, 是否由时间预算决定)，预算已经用完时等待秒数为 0
+    """
+    if expires is None:
+        return wait, False
+    left = max(expires - time.monotonic(), 0.0)
+    if wait is not None and wait <= left:
+        return wait, False
+    return left, True
+
+
+def within_deadline(delay: Optional[float], expires: Optional[float]) -> Optional[float]:
+    """
+    判断重试前的等待是否还在时间预算内
+
+    Args:
+        delay: 重试前的等待秒数，None 表示不重试
+        expires: 截止时间，None 表示没有截止时间
+
+    Returns:
+        等待秒数，等待之后预算已经用完时返回 None（不再重试）
+    """
+    if delay is None or expires is None:
+        return delay
+    return delay if time.monotonic() + delay < expires else None
+
+
+def remaining() -> Optional[float]:
+    """
+    获取当前上下文剩余的时间预算
+
+    Returns:
+        剩余秒数（可能为负数），没有设置预算时返回 None
+    """
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
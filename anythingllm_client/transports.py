@@ -0,0 +1,1289 @@
+"""
+传输层模块
+
+``HttpClient`` 负责拼装 URL、请求头和请求体，并把编码好的请求交给传输层发送。
+传输层只负责在连接上收发字节，因此可以替换实现：
+
+- ``RequestsTransport``: 基于 ``requests.Session`` 的连接池（默认）
+- ``HttpClientTransport``: 基于标准库 ``http.client`` 的长连接池，单次请求的
+  CPU 开销最低，并且不需要导入 requests
+- ``HttpxTransport``: 基于 httpx 的 HTTP/2 传输层，多个并发请求复用少量连接
+
+所有传输层都支持 ``http+unix://`` 源地址，通过 Unix 域套接字连接服务端，
+参见 ``unix_socket`` 模块。
+
+传输层按响应的 ``Content-Encoding`` 边读取边解压响应体，并在 ``wire_bytes`` 中
+返回实际接收的字节数。``stream()`` 在收到响应头后立即返回 ``TransportStream``，
+由调用方逐块读取响应体。
+"""
+
+import functools
+import http.client
+import select
+import ssl
+import threading
+import time
+import warnings
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, List, Tuple, Type, Union
+from urllib.parse import urlsplit
+
+from .compression import _DECODE_ERRORS, CHUNK_SIZE, create_decoder, decode_chunks
+from .dns_cache import DnsCache, install_requests_dns_cache
+from .exceptions import ConnectError, TransportError
+from .unix_socket import (
+    UNIX_HOST,
+    UNIX_SCHEME,
+    UnixHTTPConnection,
+    create_requests_adapter,
+    socket_path_from_netloc,
+)
+
+
+# 超时时间：秒数，或 (连接超时, 读取超时) 元组，与 requests 的约定相同
+TimeoutValue = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+def split_timeout(timeout: TimeoutValue) -> Tuple[Optional[float], Optional[float]]:
+    """
+    把超时时间拆分为连接超时和读取超时
+
+    Args:
+        timeout: 秒数或 (连接超时, 读取超时) 元组
+
+    Returns:
+        (连接超时, 读取超时)
+    """
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+class TransportResponse:
+    """
+    传输层返回的响应
+
+    ``content`` 是解压后的响应体，``wire_bytes`` 是实际接收的响应体字节数，
+    None 表示与 ``content`` 的长度相同。
+    """
+
+    __slots__ = ("status_code", "reason", "headers", "content", "wire_bytes")
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        headers: Dict[str, str],
+        content: bytes,
+        wire_bytes: Optional[int] = None,
+    ):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.wire_bytes = wire_bytes
+
+
+class TransportStream:
+    """
+    传输层返回的流式响应
+
+    遍历得到解压后的响应体数据块。读到末尾后连接归还连接池；不再读取剩余数据时
+    需要调用 ``close()``，连接随之关闭。读取过程中连接或解压失败时抛出
+    ``TransportError``。
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        headers: Dict[str, str],
+        chunks: Iterable[bytes],
+        decoder: Optional[Any] = None,
+        errors: Tuple[Type[BaseException], ...] = (),
+        finish: Optional[Callable[[], None]] = None,
+        abort: Optional[Callable[[], None]] = None,
+        wire_bytes: Optional[Callable[[], Optional[int]]] = None,
+    ):
+        """
+        初始化流式响应
+
+        Args:
+            status_code: HTTP 状态码
+            reason: HTTP 状态描述
+            headers: 响应头
+            chunks: 从连接读取的数据块
+            decoder: ``create_decoder`` 返回的解压器，None 表示数据块无需解压
+            errors: 读取数据块时可能抛出、需要转换为 ``TransportError`` 的异常
+            finish: 响应体读完后调用，归还连接
+            abort: 没有读完就关闭时调用，关闭连接
+            wire_bytes: 返回已从连接接收的字节数，None 表示与解压后的字节数相同
+        """
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self._chunks = chunks
+        self._decoder = decoder
+        self._errors = errors + _DECODE_ERRORS
+        self._finish = finish
+        self._abort = abort
+        self._wire_bytes = wire_bytes
+        self._closed = False
+
+    @property
+    def wire_bytes(self) -> Optional[int]:
+        """已从连接接收的响应体字节数，None 表示与解压后的字节数相同"""
+        return self._wire_bytes() if self._wire_bytes is not None else None
+
+    def __iter__(self) -> Iterator[bytes]:
+        decoder = self._decoder
+        try:
+            for chunk in self._chunks:
+                if decoder is None:
+                    if chunk:
+                        yield chunk
+                    continue
+                # 压缩比很高时一块数据可以解压出几十倍的数据，分段产生以限制内存占用
+                yield from decoder.iter_decompress(chunk)
+            if decoder is not None:
+                chunk = decoder.flush()
+                if chunk:
+                    yield chunk
+        except self._errors as e:
+            self.close()
+            raise TransportError(str(e) or e.__class__.__name__) from e
+        if not self._closed:
+            self._closed = True
+            if self._finish is not None:
+                self._finish()
+
+    def read(self) -> TransportResponse:
+        """
+        读取剩余的响应体
+
+        Returns:
+            包含完整响应体的传输层响应
+
+        Raises:
+            TransportError: 连接或解压失败时
+        """
+        content = b"".join(self)
+        return TransportResponse(
+            self.status_code, self.reason, self.headers, content, self.wire_bytes
+        )
+
+    def close(self) -> None:
+        """关闭响应，响应体没有读完时关闭连接"""
+        if not self._closed:
+            self._closed = True
+            if self._abort is not None:
+                self._abort()
+
+
+class Transport:
+    """
+    传输层基类
+    """
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportResponse:
+        """
+        发送请求
+
+        Args:
+            method: HTTP 方法
+            url: 完整的请求 URL，包含查询字符串
+            headers: 请求头
+            body: 已编码的请求体，或按块产生请求体的可迭代对象（以分块传输发送）
+            timeout: 超时时间（秒），或 (连接超时, 读取超时) 元组
+
+        Returns:
+            传输层响应
+
+        Raises:
+            TransportError: 连接或读写失败时
+        """
+        raise NotImplementedError
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportStream:
+        """
+        发送请求，收到响应头后返回流式响应
+
+        默认实现通过 ``request()`` 读取完整的响应体后再返回，内置传输层会覆盖此方法。
+
+        Args:
+            method: HTTP 方法
+            url: 完整的请求 URL，包含查询字符串
+            headers: 请求头
+            body: 已编码的请求体，或按块产生请求体的可迭代对象
+            timeout: 超时时间（秒），或 (连接超时, 读取超时) 元组，读取超时
+                作用于每次从连接读取
+
+        Returns:
+            流式响应
+
+        Raises:
+            TransportError: 连接或发送失败时
+        """
+        response = self.request(method, url, headers, body, timeout)
+        return TransportStream(
+            response.status_code, response.reason, response.headers, (response.content,),
+            wire_bytes=lambda: response.wire_bytes,
+        )
+
+    def warm(self, url: str, connections: int) -> int:
+        """
+        预先建立连接并放入连接池
+
+        Args:
+            url: 目标源地址
+            connections: 期望建立的连接数
+
+        Returns:
+            实际建立的连接数，不支持预热的传输层返回 0
+        """
+        return 0
+
+    def after_fork(self) -> None:
+        """
+        在 fork 出的子进程中丢弃继承自父进程的连接和锁，保留配置
+
+        子进程继承的套接字与父进程共享，继续使用会与父进程的读写交错。默认实现
+        不做任何事，持有连接的自定义传输层需要覆盖此方法。
+        """
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {}
+
+    def close(self) -> None:
+        """关闭传输层并释放所有连接"""
+
+
+class RequestsTransport(Transport):
+    """
+    基于 ``requests.Session`` 的传输层
+
+    会话只在创建时配置，之后各线程共享的是 urllib3 的连接池（自带锁）和 Cookie
+    容器（``CookieJar`` 内部加锁），因此可以被多个线程同时使用。
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_idle_timeout: Optional[float] = None,
+        dns_cache: Optional[DnsCache] = None,
+    ):
+        """
+        初始化传输层
+
+        Args:
+            pool_connections: 连接池缓存的主机数量
+            pool_maxsize: 每个主机最多保留的连接数
+            pool_idle_timeout: 连接池空闲超过该秒数后回收所有空闲连接，None 表示不回收
+            dns_cache: 新建连接时使用的 DNS 缓存，None 表示每次都解析
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.exceptions import HTTPError, NewConnectionError
+
+        self._requests = requests
+        self._urllib3_error = HTTPError
+        self._new_connection_error = NewConnectionError
+        self._adapter_cls = HTTPAdapter
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.dns_cache = dns_cache
+        self._reset()
+
+    def _reset(self) -> None:
+        """创建新的会话、锁和统计计数"""
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._requests_sent = 0
+        self._reaped_connections = 0
+        self._reap_count = 0
+
+        self._session = self._requests.Session()
+        adapter = self._adapter_cls(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+        )
+        if self.dns_cache is not None:
+            install_requests_dns_cache(adapter, self.dns_cache)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.mount(f"{UNIX_SCHEME}://", create_requests_adapter(self.pool_maxsize))
+
+    def _iter_adapters(self):
+        """遍历会话中挂载的所有适配器（去重）"""
+        seen = set()
+        for adapter in self._session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            yield adapter
+
+    def _iter_pools(self):
+        """遍历会话中所有主机的连接池"""
+        for adapter in self._iter_adapters():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    yield pool
+            yield from list(getattr(adapter, "unix_pools", {}).values())
+
+    def _reap_idle_connections(self) -> None:
+        """如果连接池空闲时间超过 pool_idle_timeout，关闭所有空闲连接"""
+        now = time.monotonic()
+        with self._lock:
+            idle_for = now - self._last_used
+            self._last_used = now
+            self._requests_sent += 1
+            if self.pool_idle_timeout is None or idle_for < self.pool_idle_timeout:
+                return
+            for pool in self._iter_pools():
+                self._reaped_connections += pool.num_connections
+            self._reap_count += 1
+            for adapter in self._iter_adapters():
+                adapter.close()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]],
+        timeout: TimeoutValue,
+    ) -> Any:
+        """发送请求，返回尚未读取响应体的 requests 响应"""
+        self._reap_idle_connections()
+        try:
+            return self._session.request(
+                method, url, data=body, headers=headers, timeout=timeout, stream=True
+            )
+        except self._requests.RequestException as e:
+            if self._not_sent(e):
+                raise ConnectError(str(e)) from e
+            raise TransportError(str(e)) from e
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportResponse:
+        response = self._send(method, url, headers, body, timeout)
+        decoder = create_decoder(response.headers.get("Content-Encoding"))
+        try:
+            if decoder is None:
+                content = response.content
+                wire_bytes = None
+            else:
+                # 读取未解压的原始数据自行解压，以便统计实际接收的字节数
+                chunks = _Counter(response.raw.stream(CHUNK_SIZE, decode_content=False))
+                content = decode_chunks(chunks, decoder)
+                wire_bytes = chunks.count
+        except (self._requests.RequestException, self._urllib3_error, ValueError) as e:
+            response.close()
+            raise TransportError(str(e) or e.__class__.__name__) from e
+        return TransportResponse(
+            response.status_code, response.reason, response.headers, content, wire_bytes
+        )
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportStream:
+        response = self._send(method, url, headers, body, timeout)
+        # 读完后 urllib3 自动归还连接，没有读完时 close() 关闭连接
+        chunks = _Counter(response.raw.stream(CHUNK_SIZE, decode_content=False))
+        return TransportStream(
+            response.status_code, response.reason, response.headers, chunks,
+            create_decoder(response.headers.get("Content-Encoding")),
+            (self._requests.RequestException, self._urllib3_error),
+            abort=response.close,
+            wire_bytes=lambda: chunks.count,
+        )
+
+    def _not_sent(self, error: Exception) -> bool:
+        """判断 requests 异常是否发生在建立连接阶段（请求尚未发出）"""
+        if isinstance(error, self._requests.ConnectTimeout):
+            return True
+        if not isinstance(error, self._requests.ConnectionError) or not error.args:
+            return False
+        cause = error.args[0]
+        return isinstance(getattr(cause, "reason", cause), self._new_connection_error)
+
+    def warm(self, url: str, connections: int) -> int:
+        # 与 requests 发送请求时使用相同的连接池键，否则预热的连接不会被复用
+        adapter = self._session.get_adapter(url)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = self._requests.Request("GET", url).prepare()
+            settings = self._session.merge_environment_settings(url, {}, None, None, None)
+            pool = adapter.get_connection_with_tls_context(request, settings["verify"])
+        else:
+            pool = adapter.get_connection(url)
+
+        borrowed = []
+        try:
+            for _ in range(min(connections, self.pool_maxsize)):
+                conn = pool._get_conn()
+                borrowed.append(conn)
+                if conn.sock is None:
+                    conn.connect()
+        finally:
+            for conn in borrowed:
+                pool._put_conn(conn)
+        return len(borrowed)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        hosts = []
+        opened = 0
+        with self._lock:
+            for pool in self._iter_pools():
+                opened += pool.num_connections
+                hosts.append({
+                    "host": pool.host,
+                    "port": pool.port,
+                    "scheme": pool.scheme,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": pool.pool.qsize() if pool.pool else 0,
+                    "maxsize": pool.pool.maxsize if pool.pool else 0,
+                })
+            return {
+                "transport": "requests",
+                "requests": self._requests_sent,
+                "connections_opened": opened + self._reaped_connections,
+                "idle_reaps": self._reap_count,
+                "pool_connections": self.pool_connections,
+                "pool_maxsize": self.pool_maxsize,
+                "hosts": hosts,
+            }
+
+    def after_fork(self) -> None:
+        # 父进程的会话直接丢弃而不是关闭：关闭会获取可能在 fork 时被其他线程持有的锁
+        self._reset()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def _replayable(body: Union[None, bytes, Iterable[bytes]]) -> bool:
+    """
+    判断请求体能否在新连接上重新发送
+
+    分块发送的请求体开始发送后，只有可以重新遍历的才能重发（例如 ``_StreamedBody``
+    的 ``resendable``，或者列表等可以重复遍历的容器）。
+    """
+    if body is None or isinstance(body, (bytes, bytearray, str)):
+        return True
+    resendable = getattr(body, "resendable", None)
+    if resendable is not None:
+        return resendable
+    return iter(body) is not body
+
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    """
+    检查空闲连接是否已被服务端关闭
+
+    空闲的长连接上不应有可读的数据，可读说明服务端已经关闭连接（或发送了多余的
+    数据），都不能再复用。TLS 1.3 的服务端会在握手后发送会话票据，套接字可读但
+    没有应用数据，这种连接仍然可以复用。
+    """
+    sock = conn.sock
+    if sock is None:
+        return True
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            readable = bool(poller.poll(0))
+        else:
+            readable = bool(select.select([sock], [], [], 0)[0])
+        if not readable:
+            return False
+        if isinstance(sock, ssl.SSLSocket):
+            # 复用时会重新设置超时时间
+            sock.settimeout(0)
+            sock.recv(1)
+    except ssl.SSLWantReadError:
+        return False
+    except (OSError, ValueError):
+        pass
+    return True
+
+
+class _HostPool:
+    """
+    单个主机的空闲连接栈，由自己的锁保护
+    """
+
+    __slots__ = ("lock", "idle", "opened", "requests", "reaped", "closed")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle: List[Tuple[http.client.HTTPConnection, float]] = []
+        self.opened = 0
+        self.requests = 0
+        self.reaped = 0
+        self.closed = False
+
+
+class HttpClientTransport(Transport):
+    """
+    基于标准库 ``http.client`` 的长连接传输层
+
+    每个主机维护一个空闲连接栈（后进先出，优先复用最热的连接）。借出的连接
+    只被一个线程使用，归还时如果空闲连接数已达到 ``pool_maxsize`` 则直接关闭。
+
+    借出和归还连接只持有对应主机的锁，全局锁只在新增或淘汰主机时使用，因此
+    多个线程请求同一主机时的临界区只有几次列表操作。
+    """
+
+    # 复用的长连接可能已被服务端关闭，幂等请求遇到这些错误时用新连接重试一次
+    _STALE_ERRORS = (
+        http.client.RemoteDisconnected,
+        ConnectionResetError,
+        BrokenPipeError,
+    )
+    # 服务端可能已经处理了请求，只有这些方法可以在传输层直接重发
+    _IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_idle_timeout: Optional[float] = None,
+        dns_cache: Optional[DnsCache] = None,
+    ):
+        """
+        初始化传输层
+
+        Args:
+            pool_connections: 保留连接池的主机数量
+            pool_maxsize: 每个主机最多保留的空闲连接数
+            pool_idle_timeout: 连接空闲超过该秒数后关闭，None 表示不回收
+            dns_cache: 新建连接时使用的 DNS 缓存，None 表示每次都解析
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.dns_cache = dns_cache
+        self._split_cache: Dict[str, Tuple[str, str]] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        """创建新的连接池、锁和统计计数"""
+        self._lock = threading.Lock()
+        self._pools: Dict[Tuple[str, str], _HostPool] = {}
+        # 已淘汰主机的统计计数
+        self._retired_requests = 0
+        self._retired_reaps = 0
+
+    def _split(self, url: str) -> Tuple[Tuple[str, str], str]:
+        """
+        拆分 URL 为 (scheme, netloc) 和请求目标
+
+        Args:
+            url: 完整 URL
+
+        Returns:
+            主机键和请求目标（路径加查询字符串）
+        """
+        scheme_end = url.find("://") + 3
+        path_start = url.find("/", scheme_end)
+        if path_start == -1:
+            origin, target = url, "/"
+        else:
+            origin, target = url[:path_start], url[path_start:]
+
+        key = self._split_cache.get(origin)
+        if key is None:
+            parts = urlsplit(origin)
+            key = (parts.scheme, parts.netloc)
+            self._split_cache[origin] = key
+        return key, target
+
+    def _new_connection(self, key: Tuple[str, str], timeout: Optional[float]) -> http.client.HTTPConnection:
+        """
+        创建新连接
+
+        Args:
+            key: (scheme, netloc)
+            timeout: 超时时间（秒）
+
+        Returns:
+            新的 HTTP 连接
+        """
+        scheme, netloc = key
+        if scheme == UNIX_SCHEME:
+            return UnixHTTPConnection(socket_path_from_netloc(netloc), timeout=timeout)
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(netloc, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(netloc, timeout=timeout)
+        if self.dns_cache is not None:
+            conn._create_connection = self.dns_cache.create_connection
+        return conn
+
+    @classmethod
+    def _connect(
+        cls, conn: http.client.HTTPConnection, read_timeout: Optional[float] = None
+    ) -> None:
+        """
+        建立连接，失败时抛出 ConnectError
+
+        Args:
+            conn: 尚未连接的 HTTP 连接，建立连接时使用它的 ``timeout``
+            read_timeout: 连接建立后读写使用的超时时间（秒）
+        """
+        try:
+            conn.connect()
+        except OSError as e:
+            conn.close()
+            raise ConnectError(str(e) or e.__class__.__name__) from e
+        cls._set_timeout(conn, read_timeout)
+
+    @staticmethod
+    def _set_timeout(conn: http.client.HTTPConnection, timeout: Optional[float]) -> None:
+        """
+        设置已连接的连接的读写超时时间
+
+        Args:
+            conn: HTTP 连接
+            timeout: 超时时间（秒）
+        """
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def _host_pool(self, key: Tuple[str, str]) -> _HostPool:
+        """
+        获取主机的连接池，不存在时创建
+
+        Args:
+            key: (scheme, netloc)
+
+        Returns:
+            主机连接池
+        """
+        pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if len(self._pools) >= self.pool_connections:
+                    self._evict_host()
+                pool = self._pools[key] = _HostPool()
+            return pool
+
+    def _acquire(
+        self, key: Tuple[str, str], timeout: Optional[float]
+    ) -> Tuple[http.client.HTTPConnection, bool, _HostPool]:
+        """
+        从连接池借出连接，必要时新建
+
+        Args:
+            key: (scheme, netloc)
+            timeout: 新建连接时的连接超时时间（秒）
+
+        Returns:
+            连接、它是否为复用的连接，以及连接所属的主机连接池
+        """
+        pool = self._host_pool(key)
+        now = time.monotonic()
+        expired = []
+        conn = None
+        with pool.lock:
+            pool.requests += 1
+            while pool.idle:
+                candidate, last_used = pool.idle.pop()
+                if (
+                    self.pool_idle_timeout is not None and now - last_used > self.pool_idle_timeout
+                ) or _dropped(candidate):
+                    expired.append(candidate)
+                    continue
+                conn = candidate
+                break
+            if expired:
+                pool.reaped += len(expired)
+            if conn is None:
+                pool.opened += 1
+
+        for candidate in expired:
+            candidate.close()
+
+        if conn is None:
+            return self._new_connection(key, timeout), False, pool
+        return conn, True, pool
+
+    def warm(self, url: str, connections: int) -> int:
+        key, _ = self._split(url)
+        pool = self._host_pool(key)
+        with pool.lock:
+            count = max(0, min(connections, self.pool_maxsize - len(pool.idle)))
+            pool.opened += count
+
+        opened = 0
+        try:
+            for _ in range(count):
+                conn = self._new_connection(key, None)
+                conn.connect()
+                self._release(pool, conn)
+                opened += 1
+        finally:
+            if opened < count:
+                with pool.lock:
+                    pool.opened -= count - opened
+        return opened
+
+    def _evict_host(self) -> None:
+        """关闭最早加入的主机连接池，调用方需持有全局锁"""
+        key = next(iter(self._pools))
+        pool = self._pools.pop(key)
+        with pool.lock:
+            pool.closed = True
+            idle, pool.idle = pool.idle, []
+            self._retired_requests += pool.requests
+            self._retired_reaps += pool.reaped
+        for conn, _ in idle:
+            conn.close()
+
+    def _release(self, pool: _HostPool, conn: http.client.HTTPConnection) -> None:
+        """
+        归还连接
+
+        Args:
+            pool: 连接所属的主机连接池
+            conn: 要归还的连接
+        """
+        with pool.lock:
+            if not pool.closed and len(pool.idle) < self.pool_maxsize:
+                pool.idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]],
+        timeout: TimeoutValue,
+    ) -> Tuple[http.client.HTTPConnection, _HostPool, http.client.HTTPResponse]:
+        """
+        借出连接并发送请求，返回连接、所属的主机连接池和尚未读取响应体的响应
+
+        借出前丢弃已被服务端关闭的空闲连接；发送时才发现复用的连接已关闭的，幂等
+        且请求体可以重新发送的请求用新连接重试一次，其他请求抛出 ``TransportError``，
+        由重试策略决定是否重发。分块请求体在遍历时抛出的 ``ValueError``（例如只能
+        遍历一次的请求体被再次发送）同样转换为 ``TransportError``。
+        """
+        key, target = self._split(url)
+        connect_timeout, read_timeout = split_timeout(timeout)
+        conn, reused, pool = self._acquire(key, connect_timeout)
+        try:
+            try:
+                if not reused:
+                    self._connect(conn, read_timeout)
+                else:
+                    self._set_timeout(conn, read_timeout)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+            except self._STALE_ERRORS:
+                if (
+                    not reused
+                    or method not in self._IDEMPOTENT_METHODS
+                    or not _replayable(body)
+                ):
+                    raise
+                conn.close()
+                with pool.lock:
+                    pool.opened += 1
+                conn = self._new_connection(key, connect_timeout)
+                self._connect(conn, read_timeout)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise TransportError(str(e) or e.__class__.__name__) from e
+        except ValueError as e:
+            conn.close()
+            if isinstance(body, (bytes, bytearray, str)) or body is None:
+                raise
+            raise TransportError(f"无法发送请求体: {e}") from e
+        return conn, pool, response
+
+    def _finish(
+        self,
+        pool: _HostPool,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        """响应体读完后归还连接，服务端要求关闭时关闭连接"""
+        # 逐块读取到末尾时响应不会自动关闭，连接要求上一个响应关闭后才能发送下一个请求
+        response.close()
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(pool, conn)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportResponse:
+        conn, pool, response = self._send(method, url, headers, body, timeout)
+        try:
+            decoder = create_decoder(response.headers.get("Content-Encoding"))
+            if decoder is None:
+                content = response.read()
+                wire_bytes = None
+            else:
+                chunks = _Counter(iter(lambda: response.read(CHUNK_SIZE), b""))
+                content = decode_chunks(chunks, decoder)
+                wire_bytes = chunks.count
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            conn.close()
+            raise TransportError(str(e) or e.__class__.__name__) from e
+
+        self._finish(pool, conn, response)
+        return TransportResponse(
+            response.status, response.reason, response.headers, content, wire_bytes
+        )
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportStream:
+        conn, pool, response = self._send(method, url, headers, body, timeout)
+        chunks = _Counter(iter(lambda: response.read1(CHUNK_SIZE), b""))
+        return TransportStream(
+            response.status, response.reason, response.headers, chunks,
+            create_decoder(response.headers.get("Content-Encoding")),
+            (OSError, http.client.HTTPException),
+            finish=functools.partial(self._finish, pool, conn, response),
+            abort=conn.close,
+            wire_bytes=lambda: chunks.count,
+        )
+
+    def pool_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = list(self._pools.items())
+            requests_sent = self._retired_requests
+            reaped = self._retired_reaps
+
+        hosts = []
+        opened = 0
+        for (scheme, netloc), pool in pools:
+            with pool.lock:
+                host = {
+                    "host": socket_path_from_netloc(netloc) if scheme == UNIX_SCHEME else netloc,
+                    "scheme": scheme,
+                    "connections_opened": pool.opened,
+                    "requests": pool.requests,
+                    "idle_connections": len(pool.idle),
+                    "maxsize": self.pool_maxsize,
+                }
+                reaped += pool.reaped
+            opened += host["connections_opened"]
+            requests_sent += host["requests"]
+            hosts.append(host)
+        return {
+            "transport": "http.client",
+            "requests": requests_sent,
+            "connections_opened": opened,
+            "idle_reaps": reaped,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "hosts": hosts,
+        }
+
+    def after_fork(self) -> None:
+        # 继承的连接不关闭，只丢弃引用，避免在子进程中获取可能被持有的锁
+        self._reset()
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            with pool.lock:
+                pool.closed = True
+                idle, pool.idle = pool.idle, []
+                self._retired_requests += pool.requests
+                self._retired_reaps += pool.reaped
+            for conn, _ in idle:
+                conn.close()
+
+
+class _Counter:
+    """
+    统计经过的字节数的数据块迭代器
+    """
+
+    __slots__ = ("_chunks", "count")
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = iter(chunks)
+        self.count = 0
+
+    def __iter__(self) -> "_Counter":
+        return self
+
+    def __next__(self) -> bytes:
+        chunk = next(self._chunks)
+        self.count += len(chunk)
+        return chunk
+
+
+def http2_available() -> bool:
+    """
+    检查 HTTP/2 依赖（httpx 和 h2）是否已安装
+
+    Returns:
+        是否可以启用 HTTP/2
+    """
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpxTransport(Transport):
+    """
+    基于 httpx 的 HTTP/2 传输层
+
+    HTTPS 连接通过 ALPN 协商协议，服务端不支持 HTTP/2 时自动使用 HTTP/1.1。
+    明文连接（h2c）只能在 ``http2_prior_knowledge=True`` 时直接使用 HTTP/2，
+    如果服务端在确认支持 HTTP/2 之前就断开连接或返回协议错误，传输层会切换回
+    HTTP/1.1 并重试该请求。未安装 h2 时发出警告并使用 HTTP/1.1。
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_idle_timeout: Optional[float] = None,
+        http2: bool = True,
+        http2_prior_knowledge: bool = False,
+        dns_cache: Optional[DnsCache] = None,
+    ):
+        """
+        初始化传输层
+
+        Args:
+            pool_connections: 未使用，仅为与其他传输层保持相同的构造参数
+            pool_maxsize: 每个主机最多保留的空闲连接数
+            pool_idle_timeout: 连接空闲超过该秒数后关闭，None 表示不回收
+            dns_cache: 未使用，httpx 自行解析主机名
+            http2: 是否启用 HTTP/2
+            http2_prior_knowledge: 明文连接是否直接使用 HTTP/2（h2c）
+
+        Raises:
+            ImportError: 未安装 httpx 时
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "HTTP/2 传输层需要 httpx，请运行 pip install anythingllm_client[http2]"
+            ) from e
+
+        if http2 and not http2_available():
+            warnings.warn("未安装 h2，HTTP/2 传输层将使用 HTTP/1.1", RuntimeWarning)
+            http2 = False
+
+        self._httpx = httpx
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.http2 = http2
+        self.http2_prior_knowledge = http2 and http2_prior_knowledge
+
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+        self._fallbacks = 0
+        self._http2_confirmed = False
+        self._versions: Dict[str, int] = {}
+        self._unix_clients: Dict[str, Any] = {}
+        self._client = self._create_client(self.http2, self.http2_prior_knowledge)
+
+    def _create_client(
+        self, http2: bool, prior_knowledge: bool, socket_path: Optional[str] = None
+    ) -> Any:
+        """
+        创建 httpx 客户端
+
+        Args:
+            http2: 是否启用 HTTP/2
+            prior_knowledge: 是否禁用 HTTP/1.1 直接使用 HTTP/2
+            socket_path: Unix 域套接字路径，None 表示使用 TCP
+
+        Returns:
+            httpx.Client 实例
+        """
+        transport = self._httpx.HTTPTransport(
+            http1=not prior_knowledge,
+            http2=http2,
+            uds=socket_path,
+            limits=self._httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=self.pool_maxsize,
+                keepalive_expiry=self.pool_idle_timeout,
+            ),
+        )
+        return self._httpx.Client(transport=transport)
+
+    def _client_for(self, url: str) -> Tuple[Any, str]:
+        """
+        选择发送请求的 httpx 客户端
+
+        Args:
+            url: 完整 URL
+
+        Returns:
+            httpx 客户端和实际请求的 URL
+        """
+        if not url.startswith(UNIX_SCHEME):
+            return self._client, url
+
+        path_start = url.find("/", len(UNIX_SCHEME) + 3)
+        if path_start == -1:
+            netloc, target = url[len(UNIX_SCHEME) + 3:], "/"
+        else:
+            netloc, target = url[len(UNIX_SCHEME) + 3:path_start], url[path_start:]
+        socket_path = socket_path_from_netloc(netloc)
+        with self._lock:
+            client = self._unix_clients.get(socket_path)
+            if client is None:
+                client = self._create_client(
+                    self.http2, self.http2_prior_knowledge, socket_path
+                )
+                self._unix_clients[socket_path] = client
+        return client, f"http://{UNIX_HOST}{target}"
+
+    def _is_current(self, client: Any) -> bool:
+        """判断 httpx 客户端是否仍在使用（未因回退而被替换）"""
+        return client is self._client or any(
+            client is c for c in list(self._unix_clients.values())
+        )
+
+    def _fall_back_to_http1(self, failed_client: Any) -> None:
+        """
+        服务端不支持 h2c 时切换到 HTTP/1.1
+
+        Args:
+            failed_client: 发生协议错误的 httpx 客户端
+        """
+        with self._lock:
+            if not self._is_current(failed_client):
+                return
+            self._client = self._create_client(http2=False, prior_knowledge=False)
+            self.http2_prior_knowledge = False
+            self._fallbacks += 1
+            stale = [failed_client] + list(self._unix_clients.values())
+            self._unix_clients = {}
+        for client in set(stale):
+            client.close()
+
+    @staticmethod
+    def _call(
+        client: Any,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]],
+        timeout: Any,
+        stream: bool,
+    ) -> Any:
+        """通过 httpx 客户端发送请求，``stream`` 为 True 时不读取响应体"""
+        if stream:
+            request = client.build_request(
+                method, url, headers=headers, content=body, timeout=timeout
+            )
+            return client.send(request, stream=True)
+        return client.request(method, url, headers=headers, content=body, timeout=timeout)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]],
+        timeout: TimeoutValue,
+        stream: bool = False,
+    ) -> Any:
+        """发送请求并返回 httpx 响应，服务端不支持 h2c 时回退到 HTTP/1.1 重新发送"""
+        client, target_url = self._client_for(url)
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            timeout = self._httpx.Timeout(read_timeout, connect=connect_timeout)
+        try:
+            try:
+                response = self._call(
+                    client, method, target_url, headers, body, timeout, stream
+                )
+            except (
+                self._httpx.ProtocolError,
+                self._httpx.ReadError,
+                self._httpx.WriteError,
+            ):
+                if self._is_current(client) and (
+                    not self.http2_prior_knowledge or self._http2_confirmed
+                ):
+                    raise
+                self._fall_back_to_http1(client)
+                client, target_url = self._client_for(url)
+                response = self._call(
+                    client, method, target_url, headers, body, timeout, stream
+                )
+        except (
+            self._httpx.ConnectError,
+            self._httpx.ConnectTimeout,
+            self._httpx.PoolTimeout,
+        ) as e:
+            raise ConnectError(str(e) or e.__class__.__name__) from e
+        except self._httpx.HTTPError as e:
+            raise TransportError(str(e) or e.__class__.__name__) from e
+
+        version = response.http_version
+        with self._lock:
+            self._requests_sent += 1
+            self._versions[version] = self._versions.get(version, 0) + 1
+            if version == "HTTP/2":
+                self._http2_confirmed = True
+        return response
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportResponse:
+        response = self._send(method, url, headers, body, timeout)
+        return TransportResponse(
+            response.status_code, response.reason_phrase, response.headers, response.content,
+            response.num_bytes_downloaded,
+        )
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Union[None, bytes, Iterable[bytes]] = None,
+        timeout: TimeoutValue = None,
+    ) -> TransportStream:
+        response = self._send(method, url, headers, body, timeout, stream=True)
+        # 读取未解压的原始数据自行分段解压，读完后关闭响应即归还连接
+        return TransportStream(
+            response.status_code, response.reason_phrase, response.headers,
+            response.iter_raw(),
+            create_decoder(response.headers.get("Content-Encoding")),
+            (self._httpx.HTTPError,),
+            finish=response.close,
+            abort=response.close,
+            wire_bytes=lambda: response.num_bytes_downloaded,
+        )
+
+    def pool_stats(self) -> Dict[str, Any]:
+        pool = getattr(self._client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        with self._lock:
+            return {
+                "transport": "http2" if self.http2 else "httpx",
+                "requests": self._requests_sent,
+                "open_connections": len(connections),
+                "http_versions": dict(self._versions),
+                "http1_fallbacks": self._fallbacks,
+                "pool_maxsize": self.pool_maxsize,
+            }
+
+    def after_fork(self) -> None:
+        # 已经回退到 HTTP/1.1 的决定保留下来，子进程不必重新探测
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+        self._fallbacks = 0
+        self._versions = {}
+        self._unix_clients = {}
+        self._client = self._create_client(self.http2, self.http2_prior_knowledge)
+
+    def close(self) -> None:
+        with self._lock:
+            clients = [self._client] + list(self._unix_clients.values())
+            self._unix_clients = {}
+        for client in clients:
+            client.close()
+
+
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "http.client": HttpClientTransport,
+    "http2": HttpxTransport,
+}
+
+
+def create_transport(transport: Union[str, Transport], **options: Any) -> Transport:
+    """
+    根据名称创建传输层
+
+    Args:
+        transport: 传输层名称（"requests"、"http.client" 或 "http2"）或已创建的传输层实例
+        **options: 传递给传输层构造函数的连接池参数
+
+    Returns:
+        传输层实例
+
+    Raises:
+        ValueError: 传输层名称未知时
+    """
+    if isinstance(transport, Transport):
+        return transport
+
+    try:
+        transport_class = TRANSPORTS[transport]
+    except KeyError:
+        raise ValueError(
+            f"未知的传输层: {transport}，可选值: {', '.join(TRANSPORTS)}"
+        ) from None
+    return transport_class(**options)
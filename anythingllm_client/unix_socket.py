@@ -0,0 +1,143 @@
+"""
+Unix 域套接字支持
+
+``HttpClient`` 把 ``unix:///run/anythingllm.sock`` 形式的基础 URL 转换为
+``http+unix://%2Frun%2Fanythingllm.sock`` 形式的源地址，套接字路径经过百分号编码
+后作为主机名，各传输层据此通过 Unix 域套接字而不是 TCP 连接服务端。
+"""
+
+import http.client
+import socket
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import quote, unquote, urlsplit
+
+UNIX_SCHEME = "http+unix"
+
+# 通过 Unix 域套接字发送请求时使用的 Host 头
+UNIX_HOST = "localhost"
+
+
+def unix_origin(socket_path: str) -> str:
+    """
+    根据套接字路径生成源地址
+
+    Args:
+        socket_path: Unix 域套接字路径
+
+    Returns:
+        ``http+unix://`` 形式的源地址
+    """
+    return f"{UNIX_SCHEME}://{quote(socket_path, safe='')}"
+
+
+def socket_path_from_netloc(netloc: str) -> str:
+    """
+    从源地址的主机部分还原套接字路径
+
+    Args:
+        netloc: 百分号编码的套接字路径
+
+    Returns:
+        Unix 域套接字路径
+    """
+    return unquote(netloc)
+
+
+def _connect_unix(socket_path: str, timeout: Optional[float]) -> socket.socket:
+    """
+    连接 Unix 域套接字
+
+    Args:
+        socket_path: 套接字路径
+        timeout: 超时时间（秒）
+
+    Returns:
+        已连接的套接字
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    通过 Unix 域套接字通信的 ``http.client`` 连接
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__(UNIX_HOST, timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = _connect_unix(self.socket_path, self.timeout)
+
+
+def create_requests_adapter(pool_maxsize: int) -> Any:
+    """
+    创建通过 Unix 域套接字发送请求的 requests 适配器
+
+    urllib3 和 requests 只在这里按需导入，使用 ``http.client`` 传输层时不会加载它们。
+
+    Args:
+        pool_maxsize: 每个套接字最多保留的连接数
+
+    Returns:
+        挂载到 ``http+unix://`` 前缀上的 ``HTTPAdapter`` 实例
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+    from urllib3.connectionpool import HTTPConnectionPool
+    from urllib3.exceptions import NewConnectionError
+
+    class _UnixConnection(HTTPConnection):
+        def __init__(self, *args: Any, socket_path: str = "", **kwargs: Any):
+            super().__init__(*args, **kwargs)
+            self.socket_path = socket_path
+
+        def _new_conn(self) -> socket.socket:
+            # 与 urllib3 一样把连接失败包装为 NewConnectionError，调用方据此判断请求未发出
+            try:
+                return _connect_unix(self.socket_path, self.timeout)
+            except OSError as e:
+                raise NewConnectionError(self, f"无法连接 Unix 域套接字 {self.socket_path}: {e}") from e
+
+    class _UnixConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _UnixConnection
+
+    class _UnixAdapter(HTTPAdapter):
+        def __init__(self) -> None:
+            super().__init__(pool_maxsize=pool_maxsize)
+            self.unix_pools: Dict[str, HTTPConnectionPool] = {}
+            self._unix_lock = threading.Lock()
+
+        def _unix_pool(self, url: str) -> HTTPConnectionPool:
+            socket_path = socket_path_from_netloc(urlsplit(url).netloc)
+            with self._unix_lock:
+                pool = self.unix_pools.get(socket_path)
+                if pool is None:
+                    pool = _UnixConnectionPool(
+                        UNIX_HOST, maxsize=pool_maxsize, socket_path=socket_path
+                    )
+                    self.unix_pools[socket_path] = pool
+                return pool
+
+        def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+            return self._unix_pool(request.url)
+
+        def get_connection(self, url, proxies=None):
+            return self._unix_pool(url)
+
+        def close(self) -> None:
+            super().close()
+            with self._unix_lock:
+                pools, self.unix_pools = self.unix_pools, {}
+            for pool in pools.values():
+                pool.close()
+
+    return _UnixAdapter()
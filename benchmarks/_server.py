@@ -0,0 +1,107 @@
+"""
+基准测试用的本地 HTTP 服务器
+
+模拟 AnythingLLM API 的少量端点，并统计服务端接受的 TCP 连接数（即握手次数）。
+``/echo/`` 开头的路径原样返回请求路径，用于检查响应是否与请求错位。
+"""
+
+import json
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats["connections"] += 1
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        if self.path.startswith("/echo/"):
+            body = json.dumps({"path": self.path}).encode()
+        else:
+            body = self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _UnixHandler(_Handler):
+    disable_nagle_algorithm = False
+
+    def address_string(self) -> str:
+        return "unix"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _serve(server: socketserver.BaseServer, payload: Optional[Dict[str, Any]]) -> None:
+    server.payload = json.dumps(payload or {"online": True}).encode()
+    server.stats = {"connections": 0, "requests": 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def start_server(payload: Optional[Dict[str, Any]] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程中启动本地服务器
+
+    Args:
+        payload: 所有请求返回的 JSON 数据
+
+    Returns:
+        服务器实例和基础 URL
+    """
+    server = _Server(("127.0.0.1", 0), _Handler)
+    _serve(server, payload)
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+def start_unix_server(
+    socket_path: str, payload: Optional[Dict[str, Any]] = None
+) -> Tuple[socketserver.BaseServer, str]:
+    """
+    在后台线程中启动监听 Unix 域套接字的本地服务器
+
+    Args:
+        socket_path: 套接字路径
+        payload: 所有请求返回的 JSON 数据
+
+    Returns:
+        服务器实例和 unix:// 基础 URL
+    """
+    server = _UnixServer(socket_path, _UnixHandler)
+    _serve(server, payload)
+    return server, f"unix://{socket_path}"
+
+
+def reset_stats(server: ThreadingHTTPServer) -> None:
+    """清零服务器统计"""
+    with server.stats_lock:
+        server.stats = {"connections": 0, "requests": 0}
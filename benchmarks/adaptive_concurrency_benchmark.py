@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+自适应并发限制基准测试
+
+本地服务器模拟只能同时处理 ``CAPACITY`` 个对话请求的 LLM 后端：超出的请求在服务端
+排队，延迟随并发升高。64 个线程共用一个客户端持续发送对话请求，分别在不限制并发和
+启用 ``ConcurrencyLimiter`` 时统计吞吐量和延迟，并输出并发上限的变化过程。启用
+限制器时，多出的请求在客户端排队，队列已满时被丢弃（``ConcurrencyLimitError``）。
+
+用法：python benchmarks/adaptive_concurrency_benchmark.py [运行秒数] [服务端容量]
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, ConcurrencyLimiter, ConcurrencyLimitError
+from _server import _Server
+
+THREADS = 64
+SERVICE_TIME = 0.05
+
+
+class _LlmHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server.capacity:
+            time.sleep(SERVICE_TIME)
+        body = b'{"textResponse": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _run(base_url, duration, limiter):
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", pool_maxsize=THREADS, concurrency_limiter=limiter
+    )
+    latencies = []
+    shed = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    timeline = []
+
+    def loop(_):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                client.chat.send_message("bench", "你好")
+            except ConcurrencyLimitError:
+                with lock:
+                    shed[0] += 1
+                time.sleep(0.01)
+                continue
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    def sample():
+        while time.monotonic() < deadline:
+            state = client.http_client.concurrency_states().get("chat")
+            if state:
+                timeline.append(state["limit"])
+            time.sleep(duration / 10)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(loop, range(THREADS)))
+    sampler.join()
+    client.close()
+    return {
+        "throughput": len(latencies) / duration,
+        "p50": _percentile(latencies, 0.5),
+        "p99": _percentile(latencies, 0.99),
+        "shed": shed[0],
+        "timeline": timeline,
+    }
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = _Server(("127.0.0.1", 0), _LlmHandler)
+    server.capacity = threading.Semaphore(capacity)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    print(f"{THREADS} 个线程，服务端容量 {capacity}，单个请求 {SERVICE_TIME * 1000:.0f} ms，"
+          f"运行 {duration:g} 秒")
+    print(f"{'配置':<12}{'吞吐/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'丢弃':>8}")
+    for name, limiter in (
+        ("unlimited", None),
+        ("adaptive", ConcurrencyLimiter(max_queue=16)),
+    ):
+        result = _run(base_url, duration, limiter)
+        print(f"{name:<12}{result['throughput']:>10.1f}{result['p50'] * 1000:>10.1f}"
+              f"{result['p99'] * 1000:>10.1f}{result['shed']:>8}")
+        if result["timeline"]:
+            print(f"{'':<12}并发上限变化: {' -> '.join(map(str, result['timeline']))}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
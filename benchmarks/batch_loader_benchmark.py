@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+批量加载基准测试
+
+本地服务器模拟文档、工作区和用户接口（每个请求处理 ``SERVICE_TIME`` 秒），列表接口
+返回所有对象，``/v1/users`` 列表接口返回 403（非管理员密钥）。对比以下方式获取
+所有文档时服务端收到的请求数和耗时：
+
+- 循环调用 ``documents.get(id)``
+- 循环调用 ``loader.documents.get(id)``（累计逐个获取达到阈值后改用列表请求）
+- ``loader.documents.get_many(ids)``
+- 多个线程同时调用 ``loader.documents.get(id)``
+- 异步客户端 ``asyncio.gather`` 逐个获取与通过加载器获取
+
+并检查：结果与服务端数据一致；少量 ID 逐个获取而不请求列表；列表中没有的 ID 逐个
+获取，不存在时抛出 ``ApiError``；列表请求失败时退回逐个获取。
+
+用法：python benchmarks/batch_loader_benchmark.py [文档数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, AsyncAnythingLLMClient
+from anythingllm_client.exceptions import ApiError
+from _server import _Server
+
+SERVICE_TIME = 0.001
+THREADS = 16
+
+
+def _document(i):
+    return {"id": f"doc-{i}", "name": f"report-{i}.pdf", "type": "pdf", "tokens": 1000 + i}
+
+
+def _user(i):
+    return {"id": i, "username": f"user-{i}", "role": "default"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.strip("/").split("/")
+        kind = "list" if len(parts) == 2 else "get"
+        with server.lock:
+            server.requests[kind] += 1
+        time.sleep(SERVICE_TIME)
+        status, payload = 404, {"message": "not found"}
+        if parts[1] == "documents":
+            if kind == "list":
+                status, payload = 200, {"documents": server.documents}
+            elif parts[2] in server.by_id:
+                status, payload = 200, server.by_id[parts[2]]
+        elif parts[1] == "users":
+            if kind == "list":
+                status, payload = 403, {"message": "需要管理员密钥"}
+            elif parts[2].isdigit() and int(parts[2]) < 100:
+                status, payload = 200, _user(int(parts[2]))
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _reset(server):
+    with server.lock:
+        server.requests = {"list": 0, "get": 0}
+
+
+def _timed(server, label, run, expected, failures):
+    _reset(server)
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    requests = dict(server.requests)
+    print(f"{label:<36}{requests['list']:>8}{requests['get']:>10}{elapsed * 1000:>12.0f}")
+    if result != expected:
+        failures.append(f"{label}: 结果与服务端数据不一致")
+    return requests
+
+
+def _threaded(loader, ids):
+    chunks = [ids[i::THREADS] for i in range(THREADS)]
+    results = {}
+
+    def work(chunk):
+        for item_id in chunk:
+            results[item_id] = loader.documents.get(item_id)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(work, chunks))
+    return [results[item_id] for item_id in ids]
+
+
+def _async(base_url, ids, use_loader):
+    async def run():
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", max_connections=THREADS)
+        try:
+            if use_loader:
+                loader = client.batch_loader()
+                return list(await asyncio.gather(*(loader.documents.get(i) for i in ids)))
+            return list(await asyncio.gather(*(client.documents.get(i) for i in ids)))
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def _check_edges(server, client, failures):
+    """少量 ID、不存在的 ID 以及列表请求失败时的行为"""
+    with client.batch_loader() as loader:
+        _reset(server)
+        small = loader.documents.get_many(["doc-1", "doc-2", "doc-3"])
+        if small != [_document(i) for i in (1, 2, 3)] or server.requests != {"list": 0, "get": 3}:
+            failures.append(f"少量 ID 没有逐个获取：{server.requests}")
+        _reset(server)
+        ids = [f"doc-{i}" for i in range(20)] + ["doc-missing"]
+        try:
+            loader.documents.get_many(ids)
+            failures.append("不存在的 ID 没有抛出 ApiError")
+        except ApiError as e:
+            if e.status_code != 404 or server.requests != {"list": 1, "get": 1}:
+                failures.append(f"不存在的 ID：状态码 {e.status_code}，请求 {server.requests}")
+        _reset(server)
+        if loader.documents.get("doc-100") != _document(100) or server.requests["get"]:
+            failures.append("列表请求返回的其他文档没有被缓存")
+        _reset(server)
+        users = loader.users.get_many(range(30))
+        if users != [_user(i) for i in range(30)] or server.requests != {"list": 1, "get": 30}:
+            failures.append(f"列表请求失败后没有逐个获取：{server.requests}")
+    stats = loader.stats()
+    if stats["documents"]["bulk_calls"] != 1 or stats["users"]["individual_calls"] != 30:
+        failures.append(f"加载计数不正确：{stats}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.documents = [_document(i) for i in range(count)]
+    server.by_id = {document["id"]: document for document in server.documents}
+    _reset(server)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    ids = [f"doc-{i}" for i in range(count)]
+    expected = [_document(i) for i in range(count)]
+    client = AnythingLLMClient(base_url=base_url, api_key="test", pool_maxsize=THREADS)
+    failures = []
+
+    print(f"{count} 个文档，服务端处理时间 {SERVICE_TIME * 1000:.0f} ms/请求")
+    print(f"{'方式':<36}{'列表请求':>8}{'单个请求':>10}{'耗时 ms':>12}")
+    _timed(server, "documents.get 循环", lambda: [client.documents.get(i) for i in ids], expected, failures)
+    loader = client.batch_loader()
+    requests = _timed(
+        server, "loader.documents.get 循环",
+        lambda: [loader.documents.get(i) for i in ids], expected, failures,
+    )
+    if requests["list"] != 1 or requests["get"] > loader.bulk_threshold:
+        failures.append(f"循环获取没有改用列表请求：{requests}")
+    requests = _timed(
+        server, "loader.documents.get_many",
+        lambda: client.batch_loader().documents.get_many(ids), expected, failures,
+    )
+    if requests != {"list": 1, "get": 0}:
+        failures.append(f"get_many 没有合并为列表请求：{requests}")
+    requests = _timed(
+        server, f"{THREADS} 个线程 loader.documents.get",
+        lambda: _threaded(client.batch_loader(), ids), expected, failures,
+    )
+    if requests["list"] != 1:
+        failures.append(f"多线程获取没有合并为列表请求：{requests}")
+    _timed(server, "async gather documents.get", lambda: _async(base_url, ids, False), expected, failures)
+    requests = _timed(
+        server, "async gather loader.documents.get",
+        lambda: _async(base_url, ids, True), expected, failures,
+    )
+    if requests != {"list": 1, "get": 0}:
+        failures.append(f"异步获取没有合并为列表请求：{requests}")
+
+    _check_edges(server, client, failures)
+    client.close()
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
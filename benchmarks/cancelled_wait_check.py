@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+等待令牌期间取消请求的检查
+
+限流器速率 ``RATE``/s、容量 1。先发出一个请求用掉令牌，随后发出 ``WAITERS`` 个
+请求排队等待令牌，在 ``CANCEL_AFTER`` 秒后全部取消。被取消的请求已经预订了令牌，
+应当把令牌归还给令牌桶；之后再发出的请求只需等待到下一个令牌补充，而不是排在
+被取消的请求后面。分别检查：
+
+- 异步客户端的 ``RateLimiter``
+- 异步客户端的 ``SharedLimiter``
+
+取消后的请求等待超过 ``LIMIT`` 秒或服务端收到被取消的请求时以非零状态退出。
+
+用法：python benchmarks/cancelled_wait_check.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AsyncAnythingLLMClient, RateLimiter, RetryPolicy, SharedLimiter
+from _server import reset_stats, start_server
+
+RATE = 10
+WAITERS = 10
+CANCEL_AFTER = 0.05
+# 不归还令牌时要等待 WAITERS / RATE 秒
+LIMIT = 0.3
+
+
+async def _check(server, base_url, label, failures, **options):
+    client = AsyncAnythingLLMClient(
+        base_url=base_url, api_key="test", retry=RetryPolicy(total=0), **options
+    )
+    try:
+        await client.http_client.get("/v1/system/first")
+        reset_stats(server)
+        waiters = [
+            asyncio.ensure_future(client.http_client.get("/v1/system/cancelled"))
+            for _ in range(WAITERS)
+        ]
+        await asyncio.sleep(CANCEL_AFTER)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        started = time.monotonic()
+        await client.http_client.get("/v1/system/after")
+        elapsed = time.monotonic() - started
+    finally:
+        await client.aclose()
+    requests = server.stats["requests"]
+    print(f"{label:<24}{elapsed * 1000:>10.0f} ms{requests:>10}")
+    if elapsed > LIMIT:
+        failures.append(f"{label}: 取消后的请求等待了 {elapsed * 1000:.0f} ms，被取消的请求没有归还令牌")
+    if requests != 1:
+        failures.append(f"{label}: 服务端收到 {requests} 个请求")
+
+
+async def _run(server, base_url, failures):
+    await _check(server, base_url, "RateLimiter", failures,
+                 rate_limiter=RateLimiter(rate=RATE, burst=1))
+    with tempfile.TemporaryDirectory() as directory:
+        await _check(server, base_url, "SharedLimiter", failures,
+                     shared_limiter=SharedLimiter(rate=RATE, burst=1, directory=directory))
+
+
+def main():
+    server, base_url = start_server()
+    failures = []
+    print(f"速率 {RATE}/s，{WAITERS} 个请求排队 {CANCEL_AFTER * 1000:.0f} ms 后取消")
+    print(f"{'限流器':<24}{'之后的等待':>12}{'服务端请求':>10}")
+    try:
+        asyncio.run(_run(server, base_url, failures))
+    except ImportError:
+        print("未安装 httpx，跳过检查")
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    print("通过" if not failures else f"{len(failures)} 项失败")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+请求合并基准测试
+
+本地服务器模拟处理较慢的读取接口（每个请求 ``SERVICE_TIME`` 秒）。模拟缓存过期时的
+请求风暴：每一轮 ``THREADS`` 个线程（异步客户端为同样数量的协程）同时调用
+``workspaces.list``、``system.get_llm_models`` 和 ``workspaces.get``，分别在不启用和
+启用 ``RequestCoalescer`` 时统计服务端收到的请求数、每轮耗时和合并率，并检查：
+
+- 每个调用方得到的结果与服务端返回的一致，修改自己的结果不影响其他调用方
+- 服务端返回错误时所有等待者都收到 ``ApiError``，服务端只收到一个请求
+- 不同的查询参数和凭据不会被合并
+
+用法：python benchmarks/coalescing_benchmark.py [轮数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, AsyncAnythingLLMClient, RequestCoalescer, RetryPolicy
+from anythingllm_client.exceptions import ApiError
+from _server import _Server
+
+THREADS = 48
+SERVICE_TIME = 0.05
+
+
+def _payload(path, key):
+    return {"path": path, "key": key, "items": [{"id": i, "name": f"item-{i}"} for i in range(50)]}
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(SERVICE_TIME)
+        status = 500 if self.path.startswith("/v1/broken") else 200
+        body = json.dumps(_payload(self.path, self.headers.get("X-API-Key"))).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _calls(client):
+    """每个调用方依次执行的调用，以及对应的请求路径"""
+    return [
+        (client.workspaces.list, "/v1/workspaces"),
+        (client.system.get_llm_models, "/v1/system/llm-models"),
+        (lambda: client.workspaces.get("sales"), "/v1/workspaces/sales"),
+    ]
+
+
+def _stampede_sync(base_url, rounds, coalescing):
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", pool_maxsize=THREADS, coalescing=coalescing
+    )
+    barrier = threading.Barrier(THREADS)
+    results = []
+    lock = threading.Lock()
+
+    def caller(_):
+        for _ in range(rounds):
+            for call, path in _calls(client):
+                barrier.wait()
+                result = call()
+                ok = result == _payload(path, "test")
+                # 修改自己的结果，检查其他调用方不受影响
+                result["items"].clear()
+                with lock:
+                    results.append(ok)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(caller, range(THREADS)))
+    elapsed = time.perf_counter() - started
+    states = client.http_client.coalescing_states()
+    client.close()
+    return all(results) and len(results) == THREADS * rounds * 3, elapsed, states
+
+
+def _stampede_async(base_url, rounds, coalescing):
+    async def run():
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", coalescing=coalescing)
+        results = []
+
+        async def one(call, path):
+            result = await call()
+            ok = result == _payload(path, "test")
+            result["items"].clear()
+            results.append(ok)
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for call, path in _calls(client):
+                await asyncio.gather(*(one(call, path) for _ in range(THREADS)))
+        elapsed = time.perf_counter() - started
+        states = client.http_client.coalescing_states()
+        await client.aclose()
+        return all(results) and len(results) == THREADS * rounds * 3, elapsed, states
+
+    return asyncio.run(run())
+
+
+def _check_errors_and_keys(server, base_url):
+    """检查错误共享以及不同参数、凭据不合并，返回失败信息列表"""
+    failures = []
+    coalescing = RequestCoalescer()
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", pool_maxsize=THREADS,
+        retry=RetryPolicy(total=0), coalescing=coalescing,
+    )
+    other = AnythingLLMClient(
+        base_url=base_url, api_key="other", pool_maxsize=THREADS, coalescing=coalescing,
+    )
+    barrier = threading.Barrier(8)
+
+    def broken(_):
+        barrier.wait()
+        try:
+            client.http_client.get("/v1/broken")
+        except ApiError as e:
+            return e.status_code
+        return None
+
+    server.requests = 0
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(broken, range(8)))
+    if statuses != [500] * 8 or server.requests != 1:
+        failures.append(f"错误没有被共享：状态码 {statuses}，服务端收到 {server.requests} 个请求")
+
+    barrier = threading.Barrier(4)
+
+    def distinct(i):
+        barrier.wait()
+        if i < 2:
+            return client.http_client.get("/v1/workspaces", params={"page": i})["path"]
+        return other.http_client.get("/v1/workspaces")["key"] if i == 2 else \
+            client.http_client.get("/v1/workspaces")["key"]
+
+    server.requests = 0
+    with ThreadPoolExecutor(4) as pool:
+        values = list(pool.map(distinct, range(4)))
+    if values != ["/v1/workspaces?page=0", "/v1/workspaces?page=1", "other", "test"] \
+            or server.requests != 4:
+        failures.append(f"不同的参数或凭据被合并：{values}，服务端收到 {server.requests} 个请求")
+    client.close()
+    other.close()
+    return failures
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server = _Server(("127.0.0.1", 0), _SlowHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    print(f"{THREADS} 个并发调用方，{rounds} 轮，每轮 3 个接口，服务端处理时间 {SERVICE_TIME * 1000:.0f} ms")
+    print(f"{'客户端 / 配置':<24}{'服务端请求数':>14}{'每轮 ms':>10}{'合并率':>10}")
+    failures = []
+    for name, stampede in (("sync", _stampede_sync), ("async", _stampede_async)):
+        for label, coalescing in (("off", None), ("coalescing", RequestCoalescer())):
+            server.requests = 0
+            ok, elapsed, states = stampede(base_url, rounds, coalescing)
+            requests = sum(state["requests"] for state in states.values())
+            coalesced = sum(state["coalesced"] for state in states.values())
+            ratio = coalesced / requests if requests else 0.0
+            print(f"{name + ' / ' + label:<24}{server.requests:>14}"
+                  f"{elapsed / (rounds * 3) * 1000:>10.1f}{ratio:>10.1%}")
+            if not ok:
+                failures.append(f"{name} / {label}: 调用方得到的结果不正确")
+            if coalescing is not None and server.requests >= THREADS * rounds * 3:
+                failures.append(f"{name} / {label}: 请求没有被合并")
+    failures += _check_errors_and_keys(server, base_url)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
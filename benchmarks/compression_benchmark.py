@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+压缩基准测试
+
+本地服务器模拟批量嵌入接口：请求体是数千段文本，响应是对应的浮点向量和来源片段。
+服务端按 ``Accept-Encoding`` 用 gzip 压缩响应（分块传输），并接受 gzip 压缩的
+请求体。分别在不压缩、只压缩响应、同时压缩请求和响应时，用各个传输层发送同样的
+请求，输出耗时以及 ``compression_stats()`` 中压缩前后的字节数，并检查解压后的
+结果与服务端发送的数据一致。
+
+用法：python benchmarks/compression_benchmark.py [请求次数]
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, AsyncAnythingLLMClient, CompressionPolicy
+from anythingllm_client.transports import http2_available
+from _server import _Server
+
+TEXTS = 2000
+DIMENSIONS = 256
+
+
+def _texts():
+    words = ["季度", "报告", "收入", "成本", "预算", "风险", "客户", "合同", "交付", "回款"]
+    rng = random.Random(1)
+    return [" ".join(rng.choice(words) for _ in range(40)) for _ in range(TEXTS)]
+
+
+def _embeddings(count):
+    rng = random.Random(2)
+    return {
+        "embeddings": [[round(rng.uniform(-1, 1), 6) for _ in range(DIMENSIONS)] for _ in range(count)],
+        "sources": [{"title": f"report-{i}.pdf", "chunk": "第三季度毛利率下降 2.1 个百分点"} for i in range(count)],
+    }
+
+
+class _EmbedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        count = len(json.loads(body)["texts"])
+        payload = self.server.payloads.get(count)
+        if payload is None:
+            payload = self.server.payloads[count] = json.dumps(_embeddings(count)).encode("utf-8")
+            self.server.gzipped[count] = gzip.compress(payload, 6)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            # 分块发送压缩后的数据，检查传输层逐块解压
+            data = self.server.gzipped[count]
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(data), 16 * 1024):
+                chunk = data[start:start + 16 * 1024]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _row(name, elapsed, stats, calls):
+    print(f"{name:<34}{elapsed / calls * 1000:>10.1f}"
+          f"{stats['request_bytes'] / calls / 1024:>12.0f}{stats['request_wire_bytes'] / calls / 1024:>12.0f}"
+          f"{stats['response_bytes'] / calls / 1024:>12.0f}{stats['response_wire_bytes'] / calls / 1024:>12.0f}")
+
+
+def _run_sync(base_url, transport, compression, texts, expected, calls):
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", transport=transport, compression=compression
+    )
+    started = time.perf_counter()
+    for _ in range(calls):
+        result = client.http_client.post("/v1/embed", json_data={"texts": texts})
+    elapsed = time.perf_counter() - started
+    stats = client.http_client.compression_stats()
+    client.close()
+    return elapsed, stats, result == expected
+
+
+def _run_async(base_url, compression, texts, expected, calls):
+    async def run():
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", compression=compression)
+        started = time.perf_counter()
+        for _ in range(calls):
+            result = await client.http_client.post("/v1/embed", json_data={"texts": texts})
+        elapsed = time.perf_counter() - started
+        stats = client.http_client.compression_stats()
+        await client.aclose()
+        return elapsed, stats, result == expected
+
+    return asyncio.run(run())
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    server = _Server(("127.0.0.1", 0), _EmbedHandler)
+    server.payloads = {}
+    server.gzipped = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    texts = _texts()
+    expected = _embeddings(TEXTS)
+    configs = (
+        ("off", CompressionPolicy(accept=False)),
+        ("responses", CompressionPolicy()),
+        ("requests+responses", CompressionPolicy(request_threshold=64 * 1024)),
+    )
+    transports = ["requests", "http.client"]
+    if http2_available():
+        transports.append("http2")
+
+    print(f"{TEXTS} 段文本，{DIMENSIONS} 维向量，每种配置 {calls} 次请求，单位 KB/次")
+    print(f"{'传输层 / 配置':<34}{'耗时 ms':>10}{'请求体':>12}{'请求传输':>12}{'响应体':>12}{'响应传输':>12}")
+    failures = []
+    for transport in transports + ["async"]:
+        for name, compression in configs:
+            label = f"{transport} / {name}"
+            if transport == "async":
+                elapsed, stats, ok = _run_async(base_url, compression, texts, expected, calls)
+            else:
+                elapsed, stats, ok = _run_sync(base_url, transport, compression, texts, expected, calls)
+            _row(label, elapsed, stats, calls)
+            if not ok:
+                failures.append(f"{label}: 解压后的响应与服务端数据不一致")
+            if compression.accept and stats["compressed_responses"] != calls:
+                failures.append(f"{label}: 响应没有被压缩")
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+排队期间时间预算用完的检查
+
+本地服务器处理每个请求 ``HOLD`` 秒。一个线程先发出请求占住唯一的名额（或令牌），
+随后在 ``deadline(BUDGET)`` 中发出第二个请求，分别检查以下组件：
+
+- ``RateLimiter``：令牌要 1 秒后才补充
+- ``ConcurrencyLimiter``：上限 1，``queue_timeout=None``（一直等待）
+- ``RequestScheduler``：合计 1 个在途名额
+- ``SharedLimiter``：``max_in_flight=1``
+- 异步客户端的 ``ConcurrencyLimiter``
+
+第二个请求应当在时间预算用完时抛出 ``DeadlineExceededError``，而不是排队到名额
+空出后才发现预算已经用完；请求没有发出，服务端只收到第一个请求。组件自身的等待
+上限比时间预算短时仍然抛出组件自身的错误。
+
+用法：python benchmarks/deadline_queue_check.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import (
+    AnythingLLMClient,
+    AsyncAnythingLLMClient,
+    ConcurrencyLimiter,
+    ConcurrencyLimitError,
+    DeadlineExceededError,
+    RateLimiter,
+    RetryPolicy,
+    SharedLimiter,
+    deadline,
+)
+from anythingllm_client.scheduler import RequestScheduler
+from _server import _Server
+
+HOLD = 0.5
+BUDGET = 0.1
+# 抛出错误的时间允许超出预算的秒数
+SLACK = 0.1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(HOLD)
+        body = b'{"online": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _check(server, base_url, label, failures, expected=DeadlineExceededError, **options):
+    client = AnythingLLMClient(base_url=base_url, api_key="test", retry=RetryPolicy(total=0), **options)
+    server.requests = 0
+    holder = threading.Thread(target=client.http_client.get, args=("/v1/system/first",))
+    holder.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    try:
+        with deadline(BUDGET):
+            client.http_client.get("/v1/system/second")
+        failures.append(f"{label}: 第二个请求没有抛出 {expected.__name__}")
+    except expected:
+        pass
+    except Exception as e:
+        failures.append(f"{label}: 抛出了 {e.__class__.__name__}: {e}")
+    elapsed = time.monotonic() - started
+    holder.join()
+    print(f"{label:<40}{elapsed * 1000:>8.0f} ms")
+    if elapsed > BUDGET + SLACK:
+        failures.append(f"{label}: {elapsed * 1000:.0f} ms 后才抛出错误（预算 {BUDGET * 1000:.0f} ms）")
+    if server.requests != 1:
+        failures.append(f"{label}: 服务端收到 {server.requests} 个请求")
+    client.close()
+
+
+def _check_async(server, base_url, failures):
+    async def run():
+        client = AsyncAnythingLLMClient(
+            base_url=base_url,
+            api_key="test",
+            retry=RetryPolicy(total=0),
+            concurrency_limiter=ConcurrencyLimiter(initial_limit=1, max_limit=1),
+        )
+        server.requests = 0
+        try:
+            holder = asyncio.ensure_future(client.http_client.get("/v1/system/first"))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            try:
+                with deadline(BUDGET):
+                    await client.http_client.get("/v1/system/second")
+                failures.append("异步 ConcurrencyLimiter: 第二个请求没有抛出 DeadlineExceededError")
+            except DeadlineExceededError:
+                pass
+            elapsed = time.monotonic() - started
+            await holder
+            print(f"{'异步 ConcurrencyLimiter':<40}{elapsed * 1000:>8.0f} ms")
+            if elapsed > BUDGET + SLACK:
+                failures.append(f"异步 ConcurrencyLimiter: {elapsed * 1000:.0f} ms 后才抛出错误")
+            if server.requests != 1:
+                failures.append(f"异步 ConcurrencyLimiter: 服务端收到 {server.requests} 个请求")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    except ImportError:
+        print("未安装 httpx，跳过异步客户端检查")
+
+
+def main():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    failures = []
+    print(f"服务端处理时间 {HOLD * 1000:.0f} ms，时间预算 {BUDGET * 1000:.0f} ms")
+    _check(server, base_url, "RateLimiter", failures,
+           rate_limiter=RateLimiter(rate=1, burst=1))
+    _check(server, base_url, "ConcurrencyLimiter", failures,
+           concurrency_limiter=ConcurrencyLimiter(initial_limit=1, max_limit=1))
+    _check(server, base_url, "ConcurrencyLimiter(queue_timeout=0.05)", failures,
+           expected=ConcurrencyLimitError,
+           concurrency_limiter=ConcurrencyLimiter(initial_limit=1, max_limit=1, queue_timeout=0.05))
+    _check(server, base_url, "RequestScheduler", failures,
+           scheduler=RequestScheduler(1, {"default": {}}))
+    with tempfile.TemporaryDirectory() as directory:
+        _check(server, base_url, "SharedLimiter", failures,
+               shared_limiter=SharedLimiter(max_in_flight=1, directory=directory))
+    _check_async(server, base_url, failures)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    print("通过" if not failures else f"{len(failures)} 项失败")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
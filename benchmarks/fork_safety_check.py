@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+fork 安全检查
+
+在父进程中创建客户端并发出请求（连接池中留有长连接），然后 fork 出多个工作
+进程，每个进程用多个线程通过同一个客户端对象发送请求。服务端原样返回请求路径，
+任何一个响应与请求不匹配都说明连接在进程之间被共享。
+
+用法：python benchmarks/fork_safety_check.py [工作进程数] [每个进程的请求数]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient
+from _server import start_server
+
+THREADS_PER_WORKER = 4
+
+_client = None
+
+
+def _hammer(count):
+    pid = os.getpid()
+    mismatches = errors = 0
+
+    def one(i):
+        path = f"/echo/{pid}/{i}"
+        try:
+            response = _client.http_client.get(path)
+        except Exception:
+            return 0, 1
+        return (0, 0) if response.get("path") == path else (1, 0)
+
+    with ThreadPoolExecutor(THREADS_PER_WORKER) as pool:
+        for bad, failed in pool.map(one, range(count)):
+            mismatches += bad
+            errors += failed
+    opened = _client.http_client.pool_stats()["connections_opened"]
+    return pid, mismatches, errors, opened
+
+
+def _run(transport, workers, count, server):
+    global _client
+    _client = AnythingLLMClient(server, api_key="bench", transport=transport)
+    for i in range(10):
+        _client.http_client.get(f"/echo/parent/{i}")
+
+    start = time.perf_counter()
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        results = pool.map(_hammer, [count] * workers)
+    elapsed = time.perf_counter() - start
+
+    # 父进程的连接在子进程使用之后仍然可用
+    parent_ok = _client.http_client.get("/echo/parent/after") == {"path": "/echo/parent/after"}
+    _client.close()
+
+    mismatches = sum(r[1] for r in results)
+    errors = sum(r[2] for r in results)
+    print(
+        f"{transport:<12} 进程={workers} 请求={workers * count} 错位={mismatches} "
+        f"错误={errors} 父进程正常={parent_ok} "
+        f"子进程新建连接={[r[3] for r in results]} 耗时={elapsed:.2f}s"
+    )
+    return mismatches == 0 and errors == 0 and parent_ok
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    _, base_url = start_server()
+
+    ok = True
+    for transport in ("requests", "http.client"):
+        ok = _run(transport, workers, count, base_url) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
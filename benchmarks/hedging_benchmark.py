@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+对冲请求基准测试
+
+本地服务器模拟偶尔变慢的服务端实例：每个 GET 请求以 ``SLOW_FRACTION`` 的概率
+多等待 ``SLOW_TIME``。若干线程持续列出工作区，分别在不启用和启用 ``HedgePolicy``
+时统计延迟的 p50、p99 以及服务端收到的请求数，并输出对冲率和对冲胜出率。
+
+并检查对冲请求与普通请求一样占用在途名额：``ConcurrencyLimiter`` 或
+``RequestScheduler`` 没有空闲名额时不对冲；有空闲名额时对冲请求占用一个名额，
+对冲请求结束（同步客户端）或被取消（异步客户端）后归还；对冲请求先返回时，落后的
+原请求结束之前服务端同时处理的请求数不超过 ``max_in_flight``。检查失败时以非零状态
+退出。
+
+用法：python benchmarks/hedging_benchmark.py [运行秒数]
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import (
+    AnythingLLMClient,
+    AsyncAnythingLLMClient,
+    ConcurrencyLimiter,
+    HedgePolicy,
+    RetryPolicy,
+    SharedLimiter,
+)
+from anythingllm_client.scheduler import RequestScheduler
+from _server import _Server
+
+THREADS = 8
+SERVICE_TIME = 0.005
+SLOW_FRACTION = 0.03
+SLOW_TIME = 0.3
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            # 每轮第一个 /win 请求（原请求）变慢，对冲请求先返回
+            first_win = self.path.endswith("/win") and not server.wins
+            if self.path.endswith("/win"):
+                server.wins += 1
+        try:
+            self._reply(first_win)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, first_win):
+        if self.path.endswith("/slow") or first_win:
+            slow = True
+        elif self.path.endswith("/hold"):
+            time.sleep(SLOW_TIME / 3)
+            slow = False
+        elif self.path.endswith("/fast"):
+            slow = False
+        else:
+            slow = random.random() < SLOW_FRACTION
+        time.sleep(SERVICE_TIME + (SLOW_TIME if slow else 0))
+        body = b'{"workspaces": []}'
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _run(server, base_url, duration, hedging):
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", pool_maxsize=THREADS * 2, hedging=hedging
+    )
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    server.requests = 0
+
+    def loop(_):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            client.workspaces.list()
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(loop, range(THREADS)))
+    states = client.http_client.hedge_states().get("workspaces", {})
+    client.close()
+    return {
+        "p50": _percentile(latencies, 0.5),
+        "p99": _percentile(latencies, 0.99),
+        "calls": len(latencies),
+        "load": server.requests / max(1, len(latencies)),
+        "states": states,
+    }
+
+
+def _slot_policy():
+    # 一个样本之后即可对冲，对冲等待时间固定为 20 ms
+    return HedgePolicy(min_delay=0.02, max_delay=0.02, min_samples=1, budget=1.0)
+
+
+def _check_slots(server, base_url, failures):
+    """对冲请求占用并归还在途名额"""
+    configs = (
+        ("ConcurrencyLimiter 上限 1", {"concurrency_limiter": ConcurrencyLimiter(1, 1, 1)}, False),
+        ("RequestScheduler 名额 1", {"scheduler": RequestScheduler(1, {"default": {}})}, False),
+        ("ConcurrencyLimiter 上限 2", {"concurrency_limiter": ConcurrencyLimiter(2, 1, 2)}, True),
+    )
+    for label, options, expect_hedge in configs:
+        client = AnythingLLMClient(
+            base_url=base_url, api_key="test", retry=RetryPolicy(total=0),
+            hedging=_slot_policy(), **options
+        )
+        http = client.http_client
+        http.get("/v1/workspaces/fast")
+        server.requests = 0
+        http.get("/v1/workspaces/slow")
+        states = http.hedge_states()["workspaces"]
+        if expect_hedge and (server.requests != 2 or states["hedged"] != 1):
+            failures.append(f"{label}: 有空闲名额时没有对冲：{states}")
+        if not expect_hedge and (server.requests != 1 or states["skipped"] != 1):
+            failures.append(f"{label}: 没有空闲名额时仍然对冲：{states}")
+        # 落后的请求在工作线程中结束后归还名额
+        time.sleep(SLOW_TIME + 0.1)
+        in_flight = sum(state["in_flight"] for state in http.concurrency_states().values())
+        in_flight += sum(state["in_flight"] for state in http.scheduler_states().values())
+        if in_flight:
+            failures.append(f"{label}: 对冲请求结束后仍有 {in_flight} 个名额没有归还")
+        client.close()
+
+
+def _check_lagging(server, base_url, failures):
+    """对冲请求先返回后，落后的原请求结束之前仍然占用名额"""
+    with tempfile.TemporaryDirectory() as directory:
+        configs = (
+            ("SharedLimiter(max_in_flight=2)",
+             {"shared_limiter": SharedLimiter(max_in_flight=2, directory=directory)}),
+            ("RequestScheduler 名额 2", {"scheduler": RequestScheduler(2, {"default": {}})}),
+        )
+        for label, options in configs:
+            policy = HedgePolicy(
+                min_delay=0.02, max_delay=0.02, min_samples=1, budget=1.0, families=["workspaces"]
+            )
+            client = AnythingLLMClient(
+                base_url=base_url, api_key="test", pool_maxsize=8, retry=RetryPolicy(total=0),
+                hedging=policy, **options
+            )
+            http = client.http_client
+            http.get("/v1/workspaces/fast")
+            with server.lock:
+                server.wins = server.peak = 0
+            http.get("/v1/workspaces/win")
+            if http.hedge_states()["workspaces"]["wins"] != 1:
+                failures.append(f"{label}: 对冲请求没有先返回：{http.hedge_states()}")
+            # 原请求仍在进行时发出其他请求，只有一个空闲名额
+            with ThreadPoolExecutor(4) as pool:
+                list(pool.map(lambda _: http.get("/v1/system/hold"), range(4)))
+            print(f"{label}: 对冲请求先返回后服务端同时处理的请求数最多 {server.peak}")
+            if server.peak > 2:
+                failures.append(f"{label}: 服务端同时处理了 {server.peak} 个请求，超过上限 2")
+            client.close()
+
+
+def _check_slots_async(server, base_url, failures):
+    async def run():
+        limiter = ConcurrencyLimiter(2, 1, 2)
+        client = AsyncAnythingLLMClient(
+            base_url=base_url, api_key="test", retry=RetryPolicy(total=0),
+            hedging=_slot_policy(), concurrency_limiter=limiter,
+        )
+        http = client.http_client
+        try:
+            await http.get("/v1/workspaces/fast")
+            server.requests = 0
+            await http.get("/v1/workspaces/slow")
+            if server.requests != 2:
+                failures.append(f"异步客户端有空闲名额时没有对冲：{http.hedge_states()}")
+            # 先返回的请求完成后另一个被取消，名额随即归还
+            await asyncio.sleep(0.01)
+            in_flight = sum(state["in_flight"] for state in limiter.states().values())
+            if in_flight:
+                failures.append(f"异步客户端对冲请求被取消后仍有 {in_flight} 个名额没有归还")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    except ImportError:
+        print("未安装 httpx，跳过异步客户端检查")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+    server = _Server(("127.0.0.1", 0), _FlakyHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.active = server.peak = server.wins = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    print(f"{THREADS} 个线程，单个请求 {SERVICE_TIME * 1000:.0f} ms，{SLOW_FRACTION:.0%} 的请求"
+          f"额外等待 {SLOW_TIME * 1000:.0f} ms，运行 {duration:g} 秒")
+    print(f"{'配置':<12}{'p50 ms':>10}{'p99 ms':>10}{'调用数':>10}{'请求/调用':>12}")
+    for name, hedging in (
+        ("no hedging", None),
+        ("hedging", HedgePolicy(percentile=0.9, budget=0.1)),
+    ):
+        result = _run(server, base_url, duration, hedging)
+        print(f"{name:<12}{result['p50'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+              f"{result['calls']:>10}{result['load']:>12.3f}")
+        states = result["states"]
+        if states:
+            print(f"{'':<12}对冲率 {states['hedge_rate']:.1%}，胜出率 {states['win_rate']:.1%}，"
+                  f"预算不足 {states['denied']} 次，没有空闲名额 {states['skipped']} 次，"
+                  f"对冲等待 {(states['delay'] or 0) * 1000:.1f} ms")
+
+    failures = []
+    _check_slots(server, base_url, failures)
+    _check_lagging(server, base_url, failures)
+    _check_slots_async(server, base_url, failures)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
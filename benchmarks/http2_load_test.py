@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+HTTP/2 负载测试
+
+启动一个本地 h2c（明文 HTTP/2）服务器，用启用 HTTP/2 的异步客户端分别以
+50、200、1000 个并发流发送 chat 请求，报告服务器接受的连接数和吞吐量。
+
+服务器和客户端运行在同一进程中，h2 是纯 Python 实现，因此吞吐量主要受 CPU 限制；
+该测试关注的是连接数是否随并发流数量增长。
+
+需要安装 httpx 和 h2：pip install -e ".[http2]"
+
+用法：python benchmarks/http2_load_test.py [每档请求总数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+import h2.settings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client.async_http_client import AsyncHttpClient
+
+RESPONSE_DELAY = 0.01
+PAYLOAD = json.dumps({"id": "chat", "textResponse": "ok"}).encode()
+
+
+class H2Server:
+    """最小化的 h2c 服务器，每个请求延迟 RESPONSE_DELAY 秒后返回固定 JSON"""
+
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        config = h2.config.H2Configuration(client_side=False)
+        conn = h2.connection.H2Connection(config=config)
+        conn.initiate_connection()
+        conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000})
+        writer.write(conn.data_to_send())
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(RESPONSE_DELAY)
+            conn.send_headers(stream_id, [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(PAYLOAD))),
+            ])
+            conn.send_data(stream_id, PAYLOAD, end_stream=True)
+            writer.write(conn.data_to_send())
+
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.DataReceived):
+                        conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        asyncio.ensure_future(respond(event.stream_id))
+                writer.write(conn.data_to_send())
+        except (ConnectionError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_level(base_url: str, server: H2Server, concurrency: int, total: int) -> None:
+    server.connections = 0
+    client = AsyncHttpClient(
+        base_url,
+        "bench",
+        http2=True,
+        http2_prior_knowledge=True,
+        max_connections=10,
+        max_streams_per_connection=max(1, concurrency // 10),
+    )
+    queue = iter(range(total))
+
+    async def worker() -> None:
+        for _ in queue:
+            await client.post("/v1/workspaces/demo/chat", json_data={"message": "hi"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    print(
+        f"并发流={concurrency:<5} 请求={total:<6} 连接数={server.connections:<4} "
+        f"吞吐量={total / elapsed:8.0f} 请求/秒"
+    )
+
+
+async def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    server = H2Server()
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    host, port = listener.sockets[0].getsockname()[:2]
+    base_url = f"http://{host}:{port}"
+
+    for concurrency in (50, 200, 1000):
+        await run_level(base_url, server, concurrency, max(total, concurrency))
+
+    listener.close()
+    await listener.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
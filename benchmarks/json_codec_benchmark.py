@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码基准测试
+
+构造大型的合成响应（文档列表、聊天历史）和请求体，比较：
+
+1. 旧的解析路径：先把响应字节解码为字符串，再用标准库解析
+2. 新的解析路径：``parse_response`` 直接从字节解析，分别使用标准库和 orjson
+3. 请求体编码：标准库和 orjson
+
+未安装 orjson 时只输出标准库的结果。
+
+用法：python benchmarks/json_codec_benchmark.py [每项重复次数]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client.codec import JsonCodec, create_codec
+from anythingllm_client.http_client import parse_response
+
+
+def _documents(count):
+    return {
+        "localFiles": {
+            "name": "documents",
+            "type": "folder",
+            "items": [
+                {
+                    "name": f"custom-documents/report-{i}.json",
+                    "type": "file",
+                    "id": f"{i:08x}-7f3c-4d2a-9b1e-{i:012x}",
+                    "url": f"file:///app/collector/hotdir/report-{i}.pdf",
+                    "title": f"季度报告 {i}",
+                    "docAuthor": "财务部",
+                    "description": "包含收入、成本和预算执行情况的季度报告",
+                    "published": "2024/3/1 10:00:00",
+                    "wordCount": 1200 + i,
+                    "token_count_estimate": 2400 + i * 2,
+                    "cached": i % 3 == 0,
+                    "pinnedWorkspaces": [1, 2] if i % 5 == 0 else [],
+                    "watched": False,
+                }
+                for i in range(count)
+            ],
+        }
+    }
+
+
+def _history(count):
+    return {
+        "history": [
+            {
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": ("请总结上一份季度报告中的主要风险。" if i % 2 == 0 else
+                            "主要风险包括原材料价格波动、汇率变化以及应收账款周期延长。" * 8),
+                "sentAt": 1700000000 + i,
+                "chatId": i,
+                "sources": [
+                    {"title": f"report-{i}.pdf", "score": 0.83, "text": "第三季度毛利率下降 2.1 个百分点" * 4}
+                ] if i % 2 else [],
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def _timeit(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _legacy_parse(content):
+    text = content.decode("utf-8", errors="replace")
+    return parse_response(200, "OK", text)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    codecs = [("json", JsonCodec())]
+    try:
+        codecs.append(("orjson", create_codec("orjson")))
+    except ImportError:
+        print("未安装 orjson，只测试标准库（pip install anythingllm_client[fast]）")
+
+    payloads = [
+        ("documents x5000", _documents(5000)),
+        ("history x2000", _history(2000)),
+    ]
+
+    print(f"每项取 {repeat} 次中的最快值")
+    print(f"{'负载':<18}{'大小 KB':>10}{'解码+解析 ms':>16}"
+          + "".join(f"{'字节解析 ' + name + ' ms':>20}" for name, _ in codecs))
+    for name, payload in payloads:
+        content = json.dumps(payload).encode("utf-8")
+        legacy = _timeit(lambda: _legacy_parse(content), repeat)
+        row = f"{name:<18}{len(content) / 1024:>10.0f}{legacy * 1000:>16.2f}"
+        for _, codec in codecs:
+            elapsed = _timeit(lambda: parse_response(200, "OK", content, None, codec), repeat)
+            row += f"{elapsed * 1000:>20.2f}"
+        print(row)
+
+    print()
+    print(f"{'请求体':<18}" + "".join(f"{'编码 ' + name + ' ms':>20}" for name, _ in codecs))
+    for name, payload in payloads:
+        row = f"{name:<18}"
+        for _, codec in codecs:
+            elapsed = _timeit(lambda: codec.dumps(payload), repeat)
+            row += f"{elapsed * 1000:>20.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+多实例负载均衡检查
+
+启动三个本地服务器模拟三个 AnythingLLM 实例，其中一个明显较慢：
+
+1. 分别使用 ``least_outstanding`` 和 ``ewma`` 策略持续列出工作区，输出各实例
+   分到的请求数和延迟 p99
+2. 让一个实例的所有接口（包括健康检查）返回 503，检查它被摘除；恢复后检查它
+   重新加入
+3. 检查同一个工作区线程的请求始终发往同一个实例
+
+任何一项检查失败时以非零状态码退出。
+
+用法：python benchmarks/load_balancing_check.py [运行秒数]
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, LoadBalancer
+from _server import _Server
+
+THREADS = 8
+SERVICE_TIMES = (0.005, 0.005, 0.05)
+
+
+class _NodeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        server = self.server
+        with server.lock:
+            if not self.path.endswith("/health"):
+                server.requests += 1
+            server.paths.add(self.path)
+        if server.down:
+            status, body = 503, b'{"error": "down"}'
+        else:
+            if not self.path.endswith("/health"):
+                time.sleep(server.service_time)
+            status, body = 200, b'{"workspaces": [], "id": "t"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start(service_time):
+    server = _Server(("127.0.0.1", 0), _NodeHandler)
+    server.lock = threading.Lock()
+    server.service_time = service_time
+    server.down = False
+    server.requests = 0
+    server.paths = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+def _reset(servers):
+    for server in servers:
+        with server.lock:
+            server.requests = 0
+            server.paths = set()
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _distribution(servers, urls, duration, strategy):
+    _reset(servers)
+    client = AnythingLLMClient(
+        base_url=urls,
+        api_key="test",
+        pool_maxsize=THREADS,
+        load_balancer=LoadBalancer(strategy=strategy, probe_interval=None),
+    )
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def loop(_):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            client.workspaces.list()
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(loop, range(THREADS)))
+    client.close()
+    counts = [server.requests for server in servers]
+    print(f"{strategy:<20}{' / '.join(map(str, counts)):>24}{_percentile(latencies, 0.99) * 1000:>10.1f}")
+    return counts
+
+
+def _wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    started = [_start(service_time) for service_time in SERVICE_TIMES]
+    servers = [server for server, _ in started]
+    urls = [url for _, url in started]
+    failures = []
+
+    print(f"{THREADS} 个线程，三个实例的处理时间分别为 "
+          f"{' / '.join(f'{t * 1000:.0f} ms' for t in SERVICE_TIMES)}，每种策略运行 {duration:g} 秒")
+    print(f"{'策略':<20}{'各实例请求数':>24}{'p99 ms':>10}")
+    for strategy in ("least_outstanding", "ewma"):
+        counts = _distribution(servers, urls, duration, strategy)
+        if counts[2] >= min(counts[:2]):
+            failures.append(f"{strategy}: 慢实例分到的请求不少于快实例")
+
+    # 摘除与恢复
+    client = AnythingLLMClient(
+        base_url=urls,
+        api_key="test",
+        load_balancer=LoadBalancer(probe_interval=0.1, healthy_threshold=2, unhealthy_threshold=2),
+    )
+    origin = urls[0]
+    servers[0].down = True
+    if not _wait_for(lambda: not client.http_client.balancer_states()[origin]["healthy"], 5):
+        failures.append("不健康的实例没有被摘除")
+    _reset(servers)
+    for _ in range(50):
+        client.workspaces.list()
+    leaked = servers[0].requests
+    print(f"摘除后发往故障实例的请求数: {leaked}")
+    if leaked > 0:
+        failures.append("摘除后仍有请求发往故障实例")
+    servers[0].down = False
+    if not _wait_for(lambda: client.http_client.balancer_states()[origin]["healthy"], 5):
+        failures.append("恢复的实例没有重新加入")
+    else:
+        print("故障实例恢复后重新加入")
+
+    # 线程亲和
+    _reset(servers)
+    for _ in range(20):
+        client.workspace_thread.send_message("ws", "thread-a", "你好")
+    hits = [any("thread-a" in p for p in server.paths) for server in servers]
+    print(f"thread-a 的请求发往的实例数: {sum(hits)}")
+    if sum(hits) != 1:
+        failures.append("同一个线程的请求发往了多个实例")
+    client.close()
+
+    for server in servers:
+        server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+连接池基准测试
+
+对比旧的逐请求 ``requests.get`` 调用方式与 ``HttpClient`` 连接池在
+握手次数和 p50 延迟上的差异。
+
+用法：python benchmarks/pool_benchmark.py [请求次数]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client.http_client import HttpClient
+from _server import start_server, reset_stats
+
+
+def _run(label, call, server, count):
+    reset_stats(server)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"{label:<24} handshakes={server.stats['connections']:<6} "
+        f"p50={statistics.median(latencies) * 1000:.3f}ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server, base_url = start_server()
+    headers = {"Authorization": "Bearer bench", "X-API-Key": "bench"}
+
+    _run(
+        "requests.get (旧方式)",
+        lambda: requests.get(base_url + "/v1/system/health", headers=headers, timeout=10).json(),
+        server,
+        count,
+    )
+
+    with HttpClient(base_url, "bench") as client:
+        _run("HttpClient 连接池", lambda: client.get("/v1/system/health"), server, count)
+        print(f"连接池统计: {client.pool_stats()}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
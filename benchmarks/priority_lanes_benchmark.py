@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+优先级通道基准测试
+
+本地服务器模拟同时只能处理 ``CAPACITY`` 个请求的 AnythingLLM：超出的请求在服务端
+排队，文档上传比对话慢得多。两个线程持续发送对话请求，统计以下三种情况下对话延迟
+的 p50 和 p99：
+
+- ``chat only``: 只有对话请求
+- ``+ ingestion``: 同时有 16 个线程批量上传文档，不启用调度器
+- ``+ ingestion, lanes``: 同上，启用 ``RequestScheduler``，对话为 ``interactive``
+  通道（预留名额），上传为 ``bulk`` 通道
+
+用法：python benchmarks/priority_lanes_benchmark.py [运行秒数]
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, RequestScheduler
+from _server import _Server
+
+CAPACITY = 6
+CHAT_THREADS = 2
+INGEST_THREADS = 16
+CHAT_TIME = 0.02
+UPLOAD_TIME = 0.2
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server.capacity:
+            time.sleep(UPLOAD_TIME if "/document/upload" in self.path else CHAT_TIME)
+        body = b'{"success": true, "documents": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _run(base_url, duration, ingest, lanes):
+    options = {}
+    if lanes:
+        options = {
+            "scheduler": RequestScheduler(
+                max_concurrency=CAPACITY,
+                lanes={
+                    "interactive": {"reserved": CHAT_THREADS, "weight": 8},
+                    "default": {"weight": 4},
+                    "bulk": {"weight": 1},
+                },
+            ),
+            "module_priorities": {"chat": "interactive", "documents": "bulk"},
+        }
+    client = AnythingLLMClient(
+        base_url=base_url,
+        api_key="test",
+        pool_maxsize=CHAT_THREADS + INGEST_THREADS,
+        **options,
+    )
+    deadline = time.monotonic() + duration
+    latencies = []
+    uploads = [0]
+    lock = threading.Lock()
+
+    def chat(_):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            client.chat.send_message("bench", "你好")
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    def upload(_):
+        while time.monotonic() < deadline:
+            client.documents.upload(file_obj=io.BytesIO(b"x" * 4096))
+            with lock:
+                uploads[0] += 1
+
+    with ThreadPoolExecutor(CHAT_THREADS + INGEST_THREADS) as pool:
+        futures = [pool.submit(chat, i) for i in range(CHAT_THREADS)]
+        if ingest:
+            futures += [pool.submit(upload, i) for i in range(INGEST_THREADS)]
+        for future in futures:
+            future.result()
+    client.close()
+    return _percentile(latencies, 0.5), _percentile(latencies, 0.99), uploads[0] / duration
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+    server = _Server(("127.0.0.1", 0), _SlowHandler)
+    server.capacity = threading.Semaphore(CAPACITY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    print(f"服务端容量 {CAPACITY}，对话 {CHAT_TIME * 1000:.0f} ms，上传 {UPLOAD_TIME * 1000:.0f} ms，"
+          f"{CHAT_THREADS} 个对话线程，{INGEST_THREADS} 个上传线程，运行 {duration:g} 秒")
+    print(f"{'场景':<22}{'对话 p50 ms':>12}{'对话 p99 ms':>12}{'上传/s':>10}")
+    for name, ingest, lanes in (
+        ("chat only", False, False),
+        ("+ ingestion", True, False),
+        ("+ ingestion, lanes", True, True),
+    ):
+        p50, p99, upload_rate = _run(base_url, duration, ingest, lanes)
+        print(f"{name:<22}{p50 * 1000:>12.1f}{p99 * 1000:>12.1f}{upload_rate:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
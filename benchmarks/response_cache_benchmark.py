@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+响应缓存基准测试
+
+本地服务器模拟变化较慢的元数据接口（每个请求处理 ``SERVICE_TIME`` 秒），与 Express
+一样为 JSON 响应生成 ETag，收到匹配的 ``If-None-Match`` 时返回 304。每一轮依次调用
+``system.get_settings``、``get_llm_models``、``get_embedding_models``、
+``get_vector_dbs``、``get_accepted_document_types``、``get_prompts``、
+``workspaces.list`` 和 ``openai.list_models``，对比以下配置下服务端收到的请求数、
+返回的响应体字节数和每轮耗时：
+
+- 不缓存
+- ``ResponseCache()``（默认缓存时间）
+- 缓存时间为 0（每次都向服务端重新验证）
+
+并检查：
+
+- 通过客户端写入（``update_settings``、``create_prompt``、``update_prompt``、
+  ``delete_prompt``、``workspaces.update``）后立即读到自己的写入
+- 修改返回值不影响缓存；不同凭据的响应不共享
+- 条目数和字节数不超过上限
+- 异步客户端的缓存命中和写入失效
+
+用法：python benchmarks/response_cache_benchmark.py [轮数]
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, AsyncAnythingLLMClient, ResponseCache
+from _server import _Server
+
+SERVICE_TIME = 0.002
+
+
+def _initial_state():
+    models = [{"id": f"model-{i}", "name": f"Model {i}", "contextWindow": 4096 * i} for i in range(40)]
+    return {
+        "settings": {"LLMProvider": "openai", "EmbeddingEngine": "native", "VectorDB": "lancedb"},
+        "llm-models": {"models": models},
+        "embedding-models": {"models": models[:10]},
+        "vector-databases": {"vectorDbs": ["lancedb", "chroma", "pinecone", "qdrant"]},
+        "accepted-document-types": {"types": {".pdf": "application/pdf", ".txt": "text/plain"}},
+        "prompts": [{"id": 1, "title": "默认", "content": "你是一个助手"}],
+        "workspaces": [{"id": i, "slug": f"ws-{i}", "name": f"工作区 {i}"} for i in range(20)],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _payload(self, path):
+        state = self.server.state
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if parts[1] == "system" and len(parts) == 3:
+            key = parts[2]
+            value = state.get(key)
+            if key == "prompts":
+                return {"prompts": value}
+            return {"settings": value} if key == "settings" else value
+        if parts[1] == "workspaces" and len(parts) == 2:
+            return {"workspaces": state["workspaces"]}
+        if parts[1:] == ["openai", "models"]:
+            return {"data": [{"id": ws["slug"], "name": ws["name"]} for ws in state["workspaces"]]}
+        return None
+
+    def _send(self, status, body=b"", etag=None):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            if etag is not None:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(SERVICE_TIME)
+        with server.lock:
+            payload = self._payload(self.path)
+        if payload is None:
+            self._send(404, b'{"message": "not found"}')
+            return
+        # 响应中带上凭据，用于检查不同凭据的响应不共享
+        body = json.dumps(dict(payload, key=self.headers.get("X-API-Key"))).encode("utf-8")
+        etag = f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+        with server.lock:
+            server.stats["requests"] += 1
+            if self.headers.get("If-None-Match") == etag:
+                server.stats["not_modified"] += 1
+            else:
+                server.stats["bytes"] += len(body)
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, etag=etag)
+        else:
+            self._send(200, body, etag)
+
+    def _write(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length)) if length else {}
+        parts = self.path.strip("/").split("/")
+        with server.lock:
+            server.stats["writes"] += 1
+            state = server.state
+            if parts[1:] == ["system", "settings"]:
+                state["settings"] = dict(state["settings"], **data)
+                result = {"success": True}
+            elif parts[1:3] == ["system", "prompts"]:
+                if self.command == "POST":
+                    result = dict(data, id=max([p["id"] for p in state["prompts"]] + [0]) + 1)
+                    state["prompts"] = state["prompts"] + [result]
+                else:
+                    prompt_id = int(parts[3])
+                    prompts = [p for p in state["prompts"] if p["id"] != prompt_id]
+                    result = {"success": True}
+                    if self.command == "PUT":
+                        result = dict(data, id=prompt_id)
+                        prompts.append(result)
+                    state["prompts"] = sorted(prompts, key=lambda p: p["id"])
+            elif parts[1] == "workspaces" and len(parts) == 3:
+                state["workspaces"] = [
+                    dict(ws, **data) if ws["slug"] == parts[2] else ws for ws in state["workspaces"]
+                ]
+                result = {"success": True}
+            else:
+                result = {"success": False}
+        self._send(200, json.dumps(result).encode("utf-8"))
+
+    do_POST = do_PUT = do_DELETE = _write
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _reset(server):
+    with server.lock:
+        server.stats = {"requests": 0, "not_modified": 0, "bytes": 0, "writes": 0}
+
+
+def _calls(client):
+    system = client.system
+    return [
+        system.get_settings,
+        system.get_llm_models,
+        system.get_embedding_models,
+        system.get_vector_dbs,
+        system.get_accepted_document_types,
+        system.get_prompts,
+        client.workspaces.list,
+        client.openai.list_models,
+    ]
+
+
+def _run(server, base_url, rounds, cache):
+    client = AnythingLLMClient(base_url=base_url, api_key="test", cache=cache)
+    calls = _calls(client)
+    expected = [call() for call in calls]
+    _reset(server)
+    started = time.perf_counter()
+    ok = True
+    for _ in range(rounds):
+        for call, value in zip(calls, expected):
+            ok = ok and call() == value
+    elapsed = time.perf_counter() - started
+    stats = client.http_client.cache_stats()
+    client.close()
+    return ok, elapsed, dict(server.stats), stats
+
+
+def _check_writes(base_url, failures):
+    """通过客户端写入后立即读到自己的写入"""
+    client = AnythingLLMClient(base_url=base_url, api_key="test", cache=ResponseCache())
+    system = client.system
+
+    system.get_settings()
+    system.update_settings({"LLMProvider": "anthropic"})
+    if system.get_settings()["settings"]["LLMProvider"] != "anthropic":
+        failures.append("update_settings 之后读到旧的系统设置")
+
+    before = len(system.get_prompts()["prompts"])
+    created = system.create_prompt("摘要", "总结下面的内容")
+    if len(system.get_prompts()["prompts"]) != before + 1:
+        failures.append("create_prompt 之后读到旧的提示词列表")
+    system.update_prompt(created["id"], content="用一句话总结")
+    if system.get_prompts()["prompts"][-1]["content"] != "用一句话总结":
+        failures.append("update_prompt 之后读到旧的提示词列表")
+    system.delete_prompt(created["id"])
+    if len(system.get_prompts()["prompts"]) != before:
+        failures.append("delete_prompt 之后读到旧的提示词列表")
+
+    client.workspaces.list()
+    client.openai.list_models()
+    client.workspaces.update("ws-3", name="销售")
+    if client.workspaces.list()["workspaces"][3]["name"] != "销售":
+        failures.append("workspaces.update 之后读到旧的工作区列表")
+    if client.openai.list_models()[3]["name"] != "销售":
+        failures.append("workspaces.update 之后读到旧的 OpenAI 模型列表")
+
+    # 修改返回值不影响缓存
+    client.system.get_llm_models()["models"].clear()
+    if not client.system.get_llm_models()["models"]:
+        failures.append("修改返回值影响了缓存")
+
+    # 不同凭据的响应不共享
+    other = AnythingLLMClient(base_url=base_url, api_key="other", cache=client.http_client.cache)
+    if other.system.get_llm_models()["key"] != "other":
+        failures.append("不同凭据共享了缓存的响应")
+    other.close()
+    client.close()
+
+
+def _check_bounds(base_url, failures):
+    """条目数和字节数不超过上限"""
+    cache = ResponseCache(ttls={"/v1/system/*": 60}, max_entries=3, max_bytes=8 * 1024)
+    client = AnythingLLMClient(base_url=base_url, api_key="test", cache=cache)
+    for page in range(20):
+        client.http_client.get("/v1/system/llm-models", params={"page": page})
+    stats = client.http_client.cache_stats()
+    if stats["entries"] > 3 or stats["bytes"] > 8 * 1024 or not stats["evictions"]:
+        failures.append(f"缓存超过了容量上限：{stats}")
+    client.close()
+
+
+def _check_async(server, base_url, failures):
+    async def run():
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", cache=ResponseCache())
+        try:
+            first = await client.system.get_prompts()
+            _reset(server)
+            for _ in range(10):
+                if await client.system.get_prompts() != first:
+                    failures.append("异步客户端返回的缓存结果不正确")
+            if server.stats["requests"]:
+                failures.append(f"异步客户端没有使用缓存：{server.stats}")
+            await client.system.create_prompt("翻译", "翻译成英文")
+            if len((await client.system.get_prompts())["prompts"]) != len(first["prompts"]) + 1:
+                failures.append("异步客户端写入后读到旧的提示词列表")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    except ImportError:
+        print("未安装 httpx，跳过异步客户端检查")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.state = _initial_state()
+    _reset(server)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    print(f"{rounds} 轮，每轮 8 个接口，服务端处理时间 {SERVICE_TIME * 1000:.0f} ms/请求")
+    print(f"{'配置':<18}{'服务端请求':>10}{'304':>8}{'响应体 KB':>12}{'每轮 ms':>10}{'命中率':>10}")
+    failures = []
+    configs = (
+        ("不缓存", None),
+        ("默认缓存时间", ResponseCache()),
+        ("缓存时间 0", ResponseCache(ttls={path: 0 for path in ResponseCache().ttls})),
+    )
+    results = {}
+    for label, cache in configs:
+        ok, elapsed, stats, cache_stats = _run(server, base_url, rounds, cache)
+        results[label] = stats
+        ratio = cache_stats.get("hit_ratio", 0.0)
+        print(f"{label:<18}{stats['requests']:>10}{stats['not_modified']:>8}"
+              f"{stats['bytes'] / 1024:>12.1f}{elapsed / rounds * 1000:>10.2f}{ratio:>10.1%}")
+        if not ok:
+            failures.append(f"{label}: 结果与服务端数据不一致")
+    if results["默认缓存时间"]["requests"]:
+        failures.append(f"缓存期内仍然请求了服务端：{results['默认缓存时间']}")
+    revalidated = results["缓存时间 0"]
+    if revalidated["not_modified"] != revalidated["requests"] or revalidated["bytes"]:
+        failures.append(f"过期后没有通过 304 重新验证：{revalidated}")
+
+    _check_writes(base_url, failures)
+    _check_bounds(base_url, failures)
+    _check_async(server, base_url, failures)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
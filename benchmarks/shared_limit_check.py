@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+跨进程共享限流检查
+
+多个工作进程各自创建 ``AnythingLLMClient``，用多个线程向同一个本地服务器发送
+请求。服务器在独立进程中运行，记录每个请求的到达时间和同时处理的请求数。分别在
+以下两种配置下运行：
+
+- 每个进程一个 ``RateLimiter``：总速率是单进程上限乘以进程数
+- 所有进程共用 ``SharedLimiter``：总速率和在途请求数都不超过设定的上限
+
+共享限流器的令牌桶容量为 ``BURST``，检查：
+
+- 服务端收到的请求扣除开头的突发后，持续速率不超过 ``rate`` 的 ``1 + EPSILON`` 倍
+- 令牌的发放时间（预订令牌的时间加上需要等待的秒数）在任何一秒内最多
+  ``rate + BURST`` 个。服务端的到达时间还包含线程唤醒和发送的抖动，单 CPU 上并发
+  线程很多时可以相差几十毫秒，一秒窗口的峰值只作参考
+- 服务端同时处理的请求数不超过 ``max_in_flight``
+
+任何一项超过上限时以非零状态退出。
+
+用法：python benchmarks/shared_limit_check.py [工作进程数] [运行秒数] [速率] [在途上限]
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, RateLimiter, SharedLimiter
+from _server import _Server
+
+THREADS_PER_WORKER = 4
+# 服务端处理每个请求的时间，使请求在服务端重叠
+SERVICE_TIME = 0.02
+# 共享限流器的令牌桶容量
+BURST = 5
+# 持续速率允许超出上限的比例
+EPSILON = 0.05
+
+
+class _RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/stats":
+            with server.lock:
+                body = json.dumps(
+                    {"arrivals": server.arrivals, "peak": server.peak}
+                ).encode()
+                server.arrivals = []
+                server.peak = 0
+        else:
+            with server.lock:
+                server.arrivals.append(time.monotonic())
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            time.sleep(SERVICE_TIME)
+            with server.lock:
+                server.active -= 1
+            body = b'{"online": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve_forever(conn):
+    server = _Server(("127.0.0.1", 0), _RecordingHandler)
+    server.lock = threading.Lock()
+    server.arrivals = []
+    server.active = 0
+    server.peak = 0
+    host, port = server.server_address
+    conn.send(f"http://{host}:{port}")
+    server.serve_forever()
+
+
+def _worker(base_url, mode, rate, max_in_flight, directory, duration, start, grants):
+    if mode == "shared":
+        limiter = SharedLimiter(
+            rate=rate, burst=BURST, max_in_flight=max_in_flight, directory=directory
+        )
+        reserve = limiter._reserve_token
+        scheduled = []
+
+        def recording(max_wait):
+            wait = reserve(max_wait)
+            scheduled.append(time.monotonic() + wait)
+            return wait
+
+        limiter._reserve_token = recording
+        options = {"shared_limiter": limiter}
+    else:
+        options = {"rate_limiter": RateLimiter(rate=rate)}
+    client = AnythingLLMClient(base_url=base_url, api_key="test", **options)
+    while time.time() < start:
+        time.sleep(0.001)
+    deadline = time.monotonic() + duration
+
+    def loop(_):
+        while time.monotonic() < deadline:
+            client.http_client.get("/v1/echo")
+
+    with ThreadPoolExecutor(THREADS_PER_WORKER) as pool:
+        list(pool.map(loop, range(THREADS_PER_WORKER)))
+    client.close()
+    if mode == "shared":
+        grants.put(scheduled)
+
+
+def _peak_per_second(arrivals):
+    """任意一秒窗口内的最大请求数"""
+    arrivals = sorted(arrivals)
+    peak = 0
+    left = 0
+    for right, at in enumerate(arrivals):
+        while at - arrivals[left] >= 1.0:
+            left += 1
+        peak = max(peak, right - left + 1)
+    return peak
+
+
+def _run(base_url, mode, workers, duration, rate, max_in_flight, directory):
+    start = time.time() + 0.5
+    grants = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_worker,
+            args=(base_url, mode, rate, max_in_flight, directory, duration, start, grants),
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    scheduled = []
+    if mode == "shared":
+        for _ in processes:
+            scheduled.extend(grants.get())
+    for process in processes:
+        process.join()
+
+    stats = AnythingLLMClient(base_url=base_url, api_key="test").http_client.get("/stats")
+    arrivals = stats["arrivals"]
+    elapsed = max(arrivals) - min(arrivals) if len(arrivals) > 1 else duration
+    # 扣除开头令牌桶中的突发，得到持续速率
+    sustained = max(0, len(arrivals) - BURST) / elapsed
+    granted = _peak_per_second(scheduled) if scheduled else None
+    return (
+        len(arrivals) / elapsed, sustained, _peak_per_second(arrivals), granted, stats["peak"]
+    )
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    max_in_flight = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve_forever, args=(child,), daemon=True)
+    server.start()
+    base_url = parent.recv()
+
+    print(f"{workers} 个工作进程 x {THREADS_PER_WORKER} 个线程，运行 {duration:g} 秒，"
+          f"速率上限 {rate:g}/s，在途上限 {max_in_flight}")
+    print(f"{'配置':<16}{'平均速率/s':>12}{'持续速率/s':>12}{'到达峰值(1s)':>14}"
+          f"{'发放峰值(1s)':>14}{'最大在途':>10}")
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("per-process", "shared"):
+            average, sustained, peak, granted, concurrent = _run(
+                base_url, mode, workers, duration, rate, max_in_flight, directory
+            )
+            print(f"{mode:<16}{average:>12.1f}{sustained:>12.1f}{peak:>14}"
+                  f"{granted if granted is not None else '-':>14}{concurrent:>10}")
+            if mode != "shared":
+                continue
+            if sustained > rate * (1 + EPSILON):
+                failures.append(f"持续速率 {sustained:.1f}/s 超过上限 {rate:g}/s")
+            if granted > rate + BURST:
+                failures.append(f"一秒内发放了 {granted} 个令牌，超过 {rate:g} + {BURST}")
+            if concurrent > max_in_flight:
+                failures.append(f"同时处理 {concurrent} 个请求，超过在途上限 {max_in_flight}")
+
+    if failures:
+        for failure in failures:
+            print(f"失败: {failure}")
+        print("共享限流未生效：总速率或在途请求数超过上限")
+        sys.exit(1)
+    print("共享限流生效：总速率和在途请求数均未超过上限")
+
+
+if __name__ == "__main__":
+    main()
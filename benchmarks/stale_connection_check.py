@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+失效长连接检查
+
+``http.client`` 传输层复用的长连接可能已被服务端关闭。本地服务器模拟两种情况：
+
+- ``close``：每个响应之后关闭连接，但不发送 ``Connection: close``。客户端应当在
+  复用之前发现连接已关闭，改用新连接，请求只发送一次
+- ``drop``：每个连接上的第二个请求读取之后直接断开，不返回响应（请求已经到达
+  服务端）。幂等请求（GET）在传输层用新连接重发一次；POST 不在传输层重发，
+  抛出 ``TransportError``，``RetryPolicy(total=0)`` 时服务端只收到一次
+- ``drop`` 下发送只能遍历一次的分块请求体（``stream_iterators`` 包装的生成器）：
+  即使是 PUT 也不能重发，应当抛出 ``TransportError``（而不是 ``ValueError``），
+  服务端只收到一次完整的请求体
+
+用法：python benchmarks/stale_connection_check.py
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import RetryPolicy
+from anythingllm_client.codec import stream_iterators
+from anythingllm_client.exceptions import TransportError
+from anythingllm_client.http_client import HttpClient
+from _server import _Server
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.served = 0
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";", 1)[0], 16)
+            if not size:
+                self.rfile.readline()
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _reply(self):
+        server = self.server
+        try:
+            body = self._read_body()
+        except ValueError:
+            # 分块请求体不完整
+            server.truncated += 1
+            self.close_connection = True
+            return
+        with server.lock:
+            server.bodies.append(body)
+            server.requests[(self.command, self.path)] = (
+                server.requests.get((self.command, self.path), 0) + 1
+            )
+        self.served += 1
+        if server.mode == "drop" and self.served > 1:
+            # 请求已经到达，不返回响应直接断开
+            self.close_connection = True
+            return
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if server.mode == "close":
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _client(base_url):
+    return HttpClient(base_url, "test", transport="http.client", retry=RetryPolicy(total=0))
+
+
+def _check_close(server, base_url, failures):
+    _reset(server, "close")
+    client = _client(base_url)
+    for i in range(3):
+        try:
+            client.post(f"/v1/close/{i}", json_data={"i": i})
+        except TransportError as e:
+            failures.append(f"close: 第 {i + 1} 个 POST 失败：{e}")
+        # 等待服务端关闭连接
+        time.sleep(0.05)
+    if any(count != 1 for count in server.requests.values()):
+        failures.append(f"close: 请求被发送了多次：{server.requests}")
+    client.close()
+
+
+def _reset(server, mode):
+    server.mode = mode
+    server.requests = {}
+    server.bodies = []
+    server.truncated = 0
+
+
+def _check_drop(server, base_url, failures):
+    _reset(server, "drop")
+    client = _client(base_url)
+    client.post("/v1/drop/first", json_data={})
+    try:
+        client.post("/v1/drop/second", json_data={})
+        failures.append("drop: 失效连接上的 POST 没有抛出 TransportError")
+    except TransportError:
+        pass
+    if server.requests.get(("POST", "/v1/drop/second")) != 1:
+        failures.append(f"drop: POST 在传输层被重发：{server.requests}")
+
+    client.get("/v1/drop/get-first")
+    try:
+        client.get("/v1/drop/get-second")
+    except TransportError as e:
+        failures.append(f"drop: 失效连接上的 GET 没有用新连接重发：{e}")
+    if server.requests.get(("GET", "/v1/drop/get-second")) != 2:
+        failures.append(f"drop: GET 的发送次数不正确：{server.requests}")
+    client.close()
+
+
+def _check_stream(server, base_url, failures):
+    _reset(server, "drop")
+    client = _client(base_url)
+    texts = [f"文本 {i}" for i in range(100)]
+    for method in ("POST", "PUT"):
+        path = f"/v1/stream/{method.lower()}"
+        call = client.post if method == "POST" else client.put
+        client.get(f"{path}/first")
+        try:
+            call(path, json_data=stream_iterators({"texts": (text for text in texts)}))
+            failures.append(f"stream: 失效连接上的 {method} 没有抛出 TransportError")
+        except TransportError:
+            pass
+        except Exception as e:
+            failures.append(f"stream: 失效连接上的 {method} 抛出了 {e.__class__.__name__}: {e}")
+        if server.requests.get((method, path)) != 1:
+            failures.append(f"stream: 分块请求体被重发：{server.requests}")
+    if server.truncated:
+        failures.append(f"stream: 服务端收到 {server.truncated} 个不完整的分块请求体")
+    if any(b'"texts"' in body and b"99" not in body for body in server.bodies):
+        failures.append("stream: 服务端收到的请求体不完整")
+    client.close()
+
+
+def main():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    _reset(server, "close")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+
+    failures = []
+    _check_close(server, base_url, failures)
+    _check_drop(server, base_url, failures)
+    _check_stream(server, base_url, failures)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    print("通过" if not failures else f"{len(failures)} 项失败")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+后台刷新（stale-while-revalidate）基准测试
+
+本地服务器模拟较慢的 ``/v1/system/prompts`` 和 ``/v1/workspaces`` 接口（每个请求处理
+``SERVICE_TIME`` 秒）。``THREADS`` 个线程在指定的秒数（默认 3 秒）内不断调用
+``system.get_prompts`` 和 ``workspaces.list``，缓存时间为 ``TTL`` 秒，对比以下配置下
+调用的延迟分布和服务端收到的请求数：
+
+- 只按缓存时间缓存：过期后碰上的调用方等待整个往返
+- ``stale_while_revalidate``：软过期后立即返回旧响应，后台刷新
+- 再加上 ``refresh_ahead``：热点条目在过期之前刷新
+
+并检查：
+
+- 后台刷新期间同一条目只发送一个刷新请求
+- 服务端数据变化后，调用方在一个缓存时间加一次刷新之内读到新数据
+- 超过硬过期时间后调用方等待请求完成
+- 刷新失败时继续返回旧响应，失败次数和原因出现在 ``cache_stats()`` 中
+- 异步客户端立即返回旧响应，后台刷新不受调用方 ``deadline`` 的限制
+
+用法：python benchmarks/stale_while_revalidate_benchmark.py [持续秒数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import (
+    AnythingLLMClient,
+    AsyncAnythingLLMClient,
+    ResponseCache,
+    RetryPolicy,
+    deadline,
+)
+from _server import _Server
+
+SERVICE_TIME = 0.05
+TTL = 0.3
+THREADS = 8
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            version = server.version
+            failing = server.failing
+        time.sleep(SERVICE_TIME)
+        if failing:
+            status, payload = 500, {"message": "数据库不可用"}
+        elif self.path.startswith("/v1/system/prompts"):
+            status, payload = 200, {"prompts": [{"id": 1, "version": version}]}
+        else:
+            status, payload = 200, {"workspaces": [{"slug": "sales", "version": version}]}
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def _load(server, base_url, duration, cache):
+    """多个线程不断读取，返回延迟列表和服务端请求数"""
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", pool_maxsize=THREADS, cache=cache
+    )
+    client.system.get_prompts()
+    client.workspaces.list()
+    server.requests = 0
+    stop = time.monotonic() + duration
+
+    def worker(i):
+        latencies = []
+        call = client.system.get_prompts if i % 2 else client.workspaces.list
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.002)
+        return latencies
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        latencies = [value for values in pool.map(worker, range(THREADS)) for value in values]
+    requests = server.requests
+    # 等待仍在进行的后台刷新
+    time.sleep(SERVICE_TIME * 2)
+    stats = client.http_client.cache_stats()
+    client.close()
+    return latencies, requests, stats
+
+
+def _check_freshness(server, base_url, failures):
+    """数据变化后读到新数据的时间，以及刷新期间只发送一个请求"""
+    cache = ResponseCache(ttls={"/v1/system/prompts": TTL}, stale_while_revalidate=60)
+    client = AnythingLLMClient(base_url=base_url, api_key="test", pool_maxsize=THREADS, cache=cache)
+    client.system.get_prompts()
+    with server.lock:
+        server.version += 1
+        version = server.version
+    changed = time.monotonic()
+    time.sleep(TTL)
+    server.requests = 0
+    # 软过期后多个线程同时读取，只触发一个刷新请求
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(lambda _: client.system.get_prompts(), range(THREADS * 4)))
+    if server.requests != 1:
+        failures.append(f"软过期后发送了 {server.requests} 个刷新请求")
+    while client.system.get_prompts()["prompts"][0]["version"] != version:
+        if time.monotonic() - changed > TTL + SERVICE_TIME * 10:
+            failures.append("数据变化后长时间读不到新数据")
+            break
+        time.sleep(0.005)
+    print(f"数据变化后 {(time.monotonic() - changed) * 1000:.0f} ms 读到新数据（缓存时间 {TTL * 1000:.0f} ms）")
+    client.close()
+
+
+def _check_hard_ttl(base_url, failures):
+    """超过硬过期时间后调用方等待请求完成"""
+    cache = ResponseCache(ttls={"/v1/system/prompts": 0.05}, stale_while_revalidate=0.05)
+    client = AnythingLLMClient(base_url=base_url, api_key="test", cache=cache)
+    client.system.get_prompts()
+    time.sleep(0.06)
+    started = time.perf_counter()
+    client.system.get_prompts()
+    if time.perf_counter() - started > SERVICE_TIME / 2:
+        failures.append("软过期后调用方等待了刷新请求")
+    # 等待后台刷新写入的条目也超过硬过期时间
+    time.sleep(0.3)
+    started = time.perf_counter()
+    client.system.get_prompts()
+    if time.perf_counter() - started < SERVICE_TIME:
+        failures.append("超过硬过期时间后调用方没有等待请求完成")
+    client.close()
+
+
+def _check_failures(server, base_url, failures):
+    """刷新失败时继续返回旧响应"""
+    cache = ResponseCache(ttls={"/v1/system/prompts": 0.05}, stale_while_revalidate=60)
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", retry=RetryPolicy(total=0), cache=cache
+    )
+    expected = client.system.get_prompts()
+    server.failing = True
+    try:
+        for _ in range(5):
+            time.sleep(0.06)
+            if client.system.get_prompts() != expected:
+                failures.append("刷新失败时没有返回旧响应")
+            # 等待后台刷新失败
+            time.sleep(SERVICE_TIME * 2)
+    finally:
+        server.failing = False
+    stats = client.http_client.cache_stats()
+    print(f"刷新失败 {stats['refresh_failures']} 次，最近的原因：{stats['last_refresh_error']}")
+    if stats["refresh_failures"] < 5 or "ApiError" not in (stats["last_refresh_error"] or ""):
+        failures.append(f"刷新失败没有记录在统计中：{stats}")
+    client.close()
+
+
+def _check_async(server, base_url, failures):
+    async def run():
+        cache = ResponseCache(ttls={"/v1/system/prompts": 0.05}, stale_while_revalidate=60)
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", cache=cache)
+        try:
+            await client.system.get_prompts()
+            with server.lock:
+                server.version += 1
+            await asyncio.sleep(0.06)
+            # 调用方的时间预算比服务端处理时间短，后台刷新不受影响
+            with deadline(SERVICE_TIME / 5):
+                started = time.perf_counter()
+                await client.system.get_prompts()
+                if time.perf_counter() - started > SERVICE_TIME / 2:
+                    failures.append("异步客户端软过期后等待了刷新请求")
+            await asyncio.sleep(SERVICE_TIME * 3)
+            result = await client.system.get_prompts()
+            if result["prompts"][0]["version"] != server.version:
+                failures.append(f"异步客户端后台刷新没有更新缓存：{cache.stats()}")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    except ImportError:
+        print("未安装 httpx，跳过异步客户端检查")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.version = 0
+    server.failing = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    base_url = f"http://{host}:{port}"
+    ttls = {"/v1/system/prompts": TTL, "/v1/workspaces": TTL}
+
+    print(f"{THREADS} 个线程，{duration:.0f} 秒，缓存时间 {TTL * 1000:.0f} ms，"
+          f"服务端处理时间 {SERVICE_TIME * 1000:.0f} ms")
+    print(f"{'配置':<28}{'调用数':>8}{'服务端请求':>10}{'p50 ms':>8}{'p99 ms':>8}{'最大 ms':>8}")
+    failures = []
+    configs = (
+        ("只按缓存时间", ResponseCache(ttls=ttls)),
+        ("stale_while_revalidate", ResponseCache(ttls=ttls, stale_while_revalidate=60)),
+        ("+ refresh_ahead=0.7", ResponseCache(ttls=ttls, stale_while_revalidate=60, refresh_ahead=0.7)),
+    )
+    for label, cache in configs:
+        latencies, requests, stats = _load(server, base_url, duration, cache)
+        p50, p99, worst = _percentile(latencies, 0.5), _percentile(latencies, 0.99), max(latencies)
+        print(f"{label:<28}{len(latencies):>8}{requests:>10}"
+              f"{p50 * 1000:>8.2f}{p99 * 1000:>8.2f}{worst * 1000:>8.1f}")
+        if cache.stale_while_revalidate:
+            if worst > SERVICE_TIME / 2:
+                failures.append(f"{label}: 有调用方等待了刷新请求（最大 {worst * 1000:.1f} ms）")
+            if stats["refreshes"] == 0 or stats["refresh_failures"]:
+                failures.append(f"{label}: 后台刷新没有成功：{stats}")
+            # 每个条目每个缓存期最多一个刷新请求
+            if requests > 2 * (duration / TTL + 2):
+                failures.append(f"{label}: 服务端请求过多：{requests}")
+        elif worst < SERVICE_TIME:
+            failures.append(f"{label}: 过期后调用方没有等待请求")
+
+    _check_freshness(server, base_url, failures)
+    _check_hard_ttl(base_url, failures)
+    _check_failures(server, base_url, failures)
+    _check_async(server, base_url, failures)
+    server.shutdown()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
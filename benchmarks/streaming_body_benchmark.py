@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+分块请求体基准测试
+
+子进程中的本地服务器模拟批量嵌入接口，解析分块传输（以及 gzip 压缩）的请求体并
+返回收到的文本数。分别以列表和生成器传入不同数量的文本调用
+``embed.get_batch_embeddings``，用 tracemalloc 统计调用期间客户端进程的内存峰值
+（列表本身在测量前创建，不计入）以及不开启 tracemalloc 时的耗时，并检查服务端收到的
+文本。
+
+用法：python benchmarks/streaming_body_benchmark.py
+"""
+
+import asyncio
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient, AsyncAnythingLLMClient, CompressionPolicy
+from anythingllm_client.transports import http2_available
+from _server import _Server
+
+SIZES = (10_000, 100_000)
+
+
+def _text(i):
+    return f"第 {i} 段：季度报告中的收入、成本和预算执行情况摘要，用于批量嵌入测试。"
+
+
+def _read_chunked(rfile):
+    parts = []
+    while True:
+        size = int(rfile.readline().split(b";")[0], 16)
+        if size == 0:
+            rfile.readline()
+            return b"".join(parts)
+        parts.append(rfile.read(size))
+        rfile.readline()
+
+
+class _BatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        chunked = self.headers.get("Transfer-Encoding") == "chunked"
+        if chunked:
+            body = _read_chunked(self.rfile)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        texts = json.loads(body)["texts"]
+        ok = all(text == _text(i) for i, text in enumerate(texts))
+        payload = json.dumps({"count": len(texts), "ok": ok, "chunked": chunked}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(queue):
+    server = _Server(("127.0.0.1", 0), _BatchHandler)
+    queue.put(server.server_address)
+    server.serve_forever()
+
+
+def _measure(call, payload):
+    # tracemalloc 明显拖慢分配，耗时另外测量
+    tracemalloc.start()
+    result = call(payload())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    call(payload())
+    return result, peak, time.perf_counter() - started
+
+
+def _sync_case(base_url, transport, compression):
+    client = AnythingLLMClient(
+        base_url=base_url, api_key="test", transport=transport, compression=compression
+    )
+    return client, client.embed.get_batch_embeddings, client.close
+
+
+def _async_case(base_url, compression):
+    def call(texts):
+        async def run():
+            client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", compression=compression)
+            try:
+                return await client.embed.get_batch_embeddings(texts)
+            finally:
+                await client.aclose()
+
+        return asyncio.run(run())
+
+    return None, call, lambda: None
+
+
+def main():
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(queue,), daemon=True)
+    server.start()
+    host, port = queue.get()
+    base_url = f"http://{host}:{port}"
+
+    cases = [("requests", None), ("http.client", None)]
+    if http2_available():
+        cases.append(("http2", None))
+    cases += [("async", None), ("http.client+gzip", CompressionPolicy(request_threshold=0))]
+
+    print(f"{'传输层':<20}{'文本数':>10}{'列表 峰值 MB':>16}{'生成器 峰值 MB':>18}{'列表 ms':>10}{'生成器 ms':>12}")
+    failures = []
+    for name, compression in cases:
+        for size in SIZES:
+            texts = [_text(i) for i in range(size)]
+            row = f"{name:<20}{size:>10}"
+            peaks, times = [], []
+            for streamed in (False, True):
+                if name == "async":
+                    _, call, close = _async_case(base_url, compression)
+                else:
+                    _, call, close = _sync_case(base_url, name.split("+")[0], compression)
+                if streamed:
+                    payload = lambda: (_text(i) for i in range(size))  # noqa: E731
+                else:
+                    payload = lambda: texts  # noqa: E731
+                result, peak, elapsed = _measure(call, payload)
+                close()
+                peaks.append(peak)
+                times.append(elapsed)
+                if (result["count"], result["ok"]) != (size, True):
+                    failures.append(f"{name} {size} {'生成器' if streamed else '列表'}: 服务端收到的文本不正确")
+                if streamed and not result["chunked"]:
+                    failures.append(f"{name} {size}: 生成器没有以分块传输发送")
+            row += f"{peaks[0] / 2**20:>16.1f}{peaks[1] / 2**20:>18.1f}"
+            row += f"{times[0] * 1000:>10.0f}{times[1] * 1000:>12.0f}"
+            print(row)
+            del texts
+    server.terminate()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
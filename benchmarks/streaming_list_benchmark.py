@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+流式列表解析基准测试
+
+子进程中的本地服务器模拟聊天历史接口，以分块传输返回包含大量消息的
+``{"history": [...]}``，客户端声明接受压缩时用 gzip 压缩。分别用 ``chat.get_history``
+和 ``chat.iter_history`` 读取，输出调用期间客户端进程的内存峰值（tracemalloc）、
+拿到第一条消息的时间和总耗时（不开启 tracemalloc 时测量），并检查收到的消息与
+服务端发送的一致、读完后连接被复用、提前结束迭代后客户端仍然可用。
+
+另外检查读取响应体期间一直占用 ``ConcurrencyLimiter`` 的在途名额，读完或提前结束
+迭代后才归还，记录的延迟包括读取响应体的时间。
+
+用法：python benchmarks/streaming_list_benchmark.py [消息数]
+"""
+
+import asyncio
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import (
+    AnythingLLMClient,
+    AsyncAnythingLLMClient,
+    CompressionPolicy,
+    ConcurrencyLimiter,
+)
+from anythingllm_client.transports import http2_available
+from _server import _Server
+
+CHUNK = 64 * 1024
+
+
+def _message(i):
+    return {
+        "id": str(i),
+        "role": "assistant" if i % 2 else "user",
+        "content": f"第 {i} 条消息：季度报告中的收入、成本和预算执行情况摘要。" * 8,
+        "sources": [{"title": f"report-{i % 97}.pdf", "chunk": "毛利率下降 2.1 个百分点"}],
+    }
+
+
+class _HistoryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.connections.get_lock():
+            self.server.connections.value += 1
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass
+
+    def do_GET(self):
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data, encoding = self.server.gzipped, "gzip"
+        else:
+            data, encoding = self.server.payload, None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(data), CHUNK):
+                chunk = data[start:start + CHUNK]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前结束迭代时关闭了连接
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(queue, connections, count):
+    server = _Server(("127.0.0.1", 0), _HistoryHandler)
+    server.payload = json.dumps(
+        {"history": [_message(i) for i in range(count)]}, ensure_ascii=False
+    ).encode("utf-8")
+    server.gzipped = gzip.compress(server.payload, 6)
+    server.connections = connections
+    queue.put((server.server_address, len(server.payload), len(server.gzipped)))
+    server.serve_forever()
+
+
+def _check(messages, count):
+    return len(messages) == count and all(m == _message(i) for i, m in enumerate(messages))
+
+
+def _consume(iterator, count):
+    """逐条检查消息，只保留计数，返回 (是否一致, 第一条消息的时间)"""
+    started = time.perf_counter()
+    first = None
+    ok = True
+    received = 0
+    for message in iterator:
+        if first is None:
+            first = time.perf_counter() - started
+        ok = ok and message == _message(received)
+        received += 1
+    return ok and received == count, first
+
+
+def _sync_run(client, streamed, count):
+    if streamed:
+        return _consume(client.chat.iter_history("bench"), count)
+    started = time.perf_counter()
+    history = client.chat.get_history("bench")["history"]
+    first = time.perf_counter() - started
+    return _check(history, count), first
+
+
+def _async_run(base_url, compression, streamed, count):
+    async def run():
+        client = AsyncAnythingLLMClient(base_url=base_url, api_key="test", compression=compression)
+        try:
+            started = time.perf_counter()
+            if not streamed:
+                history = (await client.chat.get_history("bench"))["history"]
+                return _check(history, count), time.perf_counter() - started
+            first = None
+            ok = True
+            received = 0
+            async for message in client.chat.iter_history("bench"):
+                if first is None:
+                    first = time.perf_counter() - started
+                ok = ok and message == _message(received)
+                received += 1
+            return ok and received == count, first
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def _in_flight(limiter):
+    return sum(state["in_flight"] for state in limiter.states().values())
+
+
+def _last_rtt(limiter):
+    return max(state["last_rtt"] for state in limiter.states().values())
+
+
+def _check_slots(base_url, failures):
+    """读取响应体期间占用在途名额"""
+    limiter = ConcurrencyLimiter(initial_limit=4)
+    client = AnythingLLMClient(base_url=base_url, api_key="test", concurrency_limiter=limiter)
+    started = time.monotonic()
+    for i, _ in enumerate(client.chat.iter_history("bench")):
+        if i == 0 and _in_flight(limiter) != 1:
+            failures.append("iter_history: 读取响应体期间没有占用在途名额")
+    elapsed = time.monotonic() - started
+    if _in_flight(limiter):
+        failures.append("iter_history: 读完响应体后没有归还在途名额")
+    if _last_rtt(limiter) < elapsed / 2:
+        failures.append(
+            f"iter_history: 记录的延迟 {_last_rtt(limiter) * 1000:.0f} ms 不包括读取响应体的时间"
+            f"（{elapsed * 1000:.0f} ms）"
+        )
+    for _ in client.chat.iter_history("bench"):
+        break
+    if _in_flight(limiter):
+        failures.append("iter_history: 提前结束迭代后没有归还在途名额")
+    client.close()
+
+    async def run():
+        limiter = ConcurrencyLimiter(initial_limit=4)
+        client = AsyncAnythingLLMClient(
+            base_url=base_url, api_key="test", concurrency_limiter=limiter
+        )
+        try:
+            received = 0
+            async for _ in client.chat.iter_history("bench"):
+                if received == 0 and _in_flight(limiter) != 1:
+                    failures.append("异步 iter_history: 读取响应体期间没有占用在途名额")
+                received += 1
+            if _in_flight(limiter):
+                failures.append("异步 iter_history: 读完响应体后没有归还在途名额")
+            iterator = client.chat.iter_history("bench")
+            async for _ in iterator:
+                break
+            await iterator.aclose()
+            if _in_flight(limiter):
+                failures.append("异步 iter_history: 提前结束迭代后没有归还在途名额")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def _measure(run):
+    # tracemalloc 明显拖慢分配，耗时另外测量
+    tracemalloc.start()
+    ok, _ = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    ok2, first = run()
+    return ok and ok2, peak, first, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    queue = multiprocessing.Queue()
+    connections = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=_serve, args=(queue, connections, count), daemon=True)
+    server.start()
+    (host, port), size, gzipped = queue.get()
+    base_url = f"http://{host}:{port}"
+
+    transports = ["requests", "http.client"]
+    if http2_available():
+        transports.append("http2")
+    configs = (("identity", CompressionPolicy(accept=False)), ("gzip", CompressionPolicy()))
+
+    print(f"{count} 条消息，响应体 {size / 2**20:.1f} MB，gzip 后 {gzipped / 2**20:.1f} MB")
+    print(f"{'传输层 / 编码 / 方式':<34}{'峰值 MB':>10}{'首条 ms':>10}{'总耗时 ms':>12}")
+    failures = []
+    for transport in transports + ["async"]:
+        for encoding, compression in configs:
+            for streamed in (False, True):
+                label = f"{transport} / {encoding} / {'iter' if streamed else 'list'}"
+                if transport == "async":
+                    ok, peak, first, elapsed = _measure(
+                        lambda: _async_run(base_url, compression, streamed, count)
+                    )
+                else:
+                    client = AnythingLLMClient(
+                        base_url=base_url, api_key="test", transport=transport,
+                        compression=compression,
+                    )
+                    before = connections.value
+                    ok, peak, first, elapsed = _measure(lambda: _sync_run(client, streamed, count))
+                    if streamed and connections.value - before != 1:
+                        failures.append(f"{label}: 读完响应体后连接没有被复用")
+                    # 提前结束迭代后连接被关闭，下一个请求使用新连接
+                    for message in client.chat.iter_history("bench"):
+                        break
+                    if not _check(client.chat.get_history("bench")["history"], count):
+                        failures.append(f"{label}: 提前结束迭代后的请求结果不正确")
+                    client.close()
+                print(f"{label:<34}{peak / 2**20:>10.1f}{first * 1000:>10.1f}{elapsed * 1000:>12.0f}")
+                if not ok:
+                    failures.append(f"{label}: 收到的消息与服务端发送的不一致")
+    _check_slots(base_url, failures)
+    server.terminate()
+    for failure in failures:
+        print(f"失败: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
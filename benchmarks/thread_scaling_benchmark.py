@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+多线程共享客户端的扩展性基准测试
+
+1 到 64 个线程共用同一个 ``AnythingLLMClient``，统计各线程数下的吞吐量和相对
+单线程的加速比，用来观察锁竞争从多少线程开始限制扩展。同时检查每个响应是否与
+请求匹配。
+
+- ``null`` 传输层不做网络 I/O，只测量客户端自身（URL 拼装、请求头、JSON 解析、
+  传输层计数）的竞争情况
+- 其他传输层请求独立进程中的本地服务器，避免服务器与客户端争用同一个 GIL
+
+在自由线程版本的 CPython（3.13t）上运行时，``null`` 传输层的结果直接反映
+客户端内部的锁竞争。
+
+用法：python benchmarks/thread_scaling_benchmark.py [每个线程数下的请求数] [传输层...]
+"""
+
+import multiprocessing
+import os
+import sys
+import sysconfig
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client import AnythingLLMClient
+from anythingllm_client.transports import Transport, TransportResponse
+from _server import start_server
+
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _NullTransport(Transport):
+    """不做网络 I/O，直接把请求路径作为响应返回"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def request(self, method, url, headers, body=None, timeout=None):
+        with self._lock:
+            self.requests += 1
+        path = url[url.find("/echo/"):]
+        return TransportResponse(200, "OK", {}, b'{"path": "%s"}' % path.encode())
+
+
+def _serve_forever(conn):
+    _, base_url = start_server()
+    conn.send(base_url)
+    threading.Event().wait()
+
+
+def _measure(client, threads, count):
+    mismatches = 0
+    lock = threading.Lock()
+    per_thread = count // threads
+
+    def worker(index):
+        nonlocal mismatches
+        bad = 0
+        for i in range(per_thread):
+            path = f"/echo/{index}/{i}"
+            if client.http_client.get(path).get("path") != path:
+                bad += 1
+        with lock:
+            mismatches += bad
+
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed, mismatches
+
+
+def _run(transport, base_url, count):
+    client = AnythingLLMClient(
+        base_url,
+        api_key="bench",
+        pool_maxsize=max(THREAD_COUNTS),
+        transport=_NullTransport() if transport == "null" else transport,
+    )
+    client.http_client.get("/echo/warmup")
+    baseline = None
+    for threads in THREAD_COUNTS:
+        throughput, mismatches = _measure(client, threads, count)
+        baseline = baseline or throughput
+        print(
+            f"{transport:<12} 线程={threads:<3} 吞吐量={throughput:9.0f} 请求/秒 "
+            f"加速比={throughput / baseline:5.2f} 错位={mismatches}"
+        )
+    client.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6400
+    transports = sys.argv[2:] or ["null", "http.client", "requests"]
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        f"Python {sys.version.split()[0]} "
+        f"自由线程构建={bool(sysconfig.get_config_var('Py_GIL_DISABLED'))} "
+        f"GIL={'启用' if gil else '禁用'} CPU={os.cpu_count()}"
+    )
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve_forever, args=(child,), daemon=True)
+    server.start()
+    base_url = parent.recv()
+
+    for transport in transports:
+        _run(transport, base_url, count)
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
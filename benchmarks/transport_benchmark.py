@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+传输层 CPU 开销基准测试
+
+对本地服务器分别使用 requests 和 http.client 传输层发送请求，统计客户端线程
+在每个请求上消耗的 CPU 时间（服务器线程的开销不计入）。
+
+用法：python benchmarks/transport_benchmark.py [请求次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client.http_client import HttpClient
+from _server import start_server
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    server, base_url = start_server({"id": 1, "name": "workspace", "documents": []})
+
+    for transport in ("requests", "http.client"):
+        with HttpClient(base_url, "bench", transport=transport) as client:
+            client.get("/v1/workspaces")
+            cpu_start = time.thread_time()
+            wall_start = time.perf_counter()
+            for _ in range(count):
+                client.post("/v1/workspaces/demo/chat", json_data={"message": "hi"})
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+        print(
+            f"{transport:<12} CPU/请求={cpu / count * 1e6:8.1f}us  "
+            f"墙钟/请求={wall / count * 1e6:8.1f}us"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unix 域套接字基准测试
+
+分别通过回环 TCP 和 Unix 域套接字向本地服务器发送请求，比较各传输层的
+p50 / p99 延迟和吞吐量。
+
+用法：python benchmarks/unix_socket_benchmark.py [请求次数]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anythingllm_client.http_client import HttpClient
+from _server import start_server, start_unix_server
+
+
+def _run(label, base_url, transport, count):
+    latencies = []
+    with HttpClient(base_url, "bench", transport=transport) as client:
+        client.get("/v1/system/health")
+        start = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            client.post("/v1/workspaces/demo/chat", json_data={"message": "hi"})
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:<28} p50={statistics.median(latencies) * 1e6:7.1f}us "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:7.1f}us "
+        f"吞吐量={count / elapsed:7.0f} 请求/秒"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tcp_server, tcp_url = start_server()
+    socket_path = os.path.join(tempfile.mkdtemp(), "anythingllm.sock")
+    unix_server, unix_url = start_unix_server(socket_path)
+
+    for transport in ("http.client", "requests"):
+        _run(f"{transport} 回环 TCP", tcp_url, transport, count)
+        _run(f"{transport} Unix 套接字", unix_url, transport, count)
+
+    tcp_server.shutdown()
+    unix_server.shutdown()
+    os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,12 @@ setup(
         "python-dotenv>=0.19.0",
         "tqdm>=4.62.0",
     ],
+    extras_require={
+        "async": ["httpx>=0.24.0"],
+        "http2": ["httpx[http2]>=0.24.0"],
+        "fast": ["orjson>=3.6"],
+        "brotli": ["brotli>=1.0"],
+    },
     author="Your Name",
     author_email="your.email@example.com",
     description="A Python client for AnythingLLM API",